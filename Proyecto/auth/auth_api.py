@@ -4,21 +4,24 @@ from auth.auth_service import (
     crear_hash_contraseña,
     verificar_contraseña,
     crear_token_acceso,
-    obtener_usuario_actual
+    obtener_usuario_actual,
+    invalidar_tokens_usuario
 )
 from models.user import UsuarioCrear, UsuarioPublico
-from db.usuarios.users_db import DataBaseUsuario
-from datetime import datetime, timedelta
+from db.usuarios.users_db import obtener_db_usuarios
+from datetime import datetime, timedelta, timezone
 from models.user import Session
+from auth.sesiones import almacen_sesiones
 from models.alerta import Alerta
 from models.instruments import PlazoFijo
 from models.dolar_subject import DolarSubject
 from utils.obtener_ultimo_valor_dolar import obtener_dolar_oficial
+from utils.datos_mercado import marcar_respuesta
 from utils.obtener_pf_usuario import obtener_plazos_fijos_por_usuario
 
 # Inicialización de variables
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
-db_usuarios = DataBaseUsuario()
+db_usuarios = obtener_db_usuarios()
 
 
 # -------------------------------
@@ -70,13 +73,15 @@ def iniciar_sesion(form_data: OAuth2PasswordRequestForm = Depends()):
     if not usuario_id:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
+    ahora = datetime.now(timezone.utc)
     sesion = Session(
         token=token,
         usuario_id=usuario_id,
-        fecha_inicio=str(datetime.now()),
-        fecha_expiracion=str(datetime.now() + timedelta(hours=2))
+        fecha_inicio=ahora,
+        fecha_expiracion=ahora + timedelta(hours=2)
     )
-    db_usuarios.guardar_sesion(sesion)
+    if not almacen_sesiones.registrar(sesion):
+        raise HTTPException(status_code=500, detail="No se pudo iniciar la sesión.")
 
 
     # ================= ALERTAS =================
@@ -99,14 +104,11 @@ def iniciar_sesion(form_data: OAuth2PasswordRequestForm = Depends()):
                 mensaje_ok="Todo bien compadre, el dólar sigue abajo 😎",
                 mensaje_alerta="Ojo compadre, el dólar superó tu equilibrio ⚠️"
             )
+            # Registrar alerta en el Subject
             subject.registrar(alerta_pf)
 
             datos_alerta = alerta_pf.update(subject, collect=True)
 
-
-            # Registrar alerta en el Subject
-            subject.registrar(alerta_pf)
-
             # Ejecutar update y guardar notificación
             if datos_alerta:
                 notificaciones.append(datos_alerta)
@@ -117,11 +119,12 @@ def iniciar_sesion(form_data: OAuth2PasswordRequestForm = Depends()):
     except Exception as e:
         print(f"[ERROR ALERTAS LOGIN] {e}")
 
-    return {
+    # Las alertas usan el dólar: se marcan si era el último conocido
+    return marcar_respuesta({
         "access_token": token,
         "token_type": "bearer",
         "alertas": notificaciones
-    }
+    })
 
 
 # -------------------------------
@@ -149,9 +152,9 @@ def cerrar_sesion(usuario_actual: UsuarioPublico = Depends(
     obtener_usuario_actual
 )):
     """Finaliza la sesión activa del usuario autenticado."""
-    exito = db_usuarios.eliminar_sesion_por_usuario(
-        usuario_actual.nombre_usuario
-    )
+    usuario_id = db_usuarios.obtener_id_usuario(usuario_actual.nombre_usuario)
+    exito = usuario_id is not None and almacen_sesiones.revocar_usuario(usuario_id)
+    invalidar_tokens_usuario(usuario_actual.nombre_usuario)
     if not exito:
         raise HTTPException(
             status_code=400,
@@ -190,6 +193,8 @@ def borrar_usuario(
             detail="No puedes eliminar tu propio usuario."
         )
 
+    almacen_sesiones.revocar_usuario(usuario_id)
+    invalidar_tokens_usuario(username)
     exito = db_usuarios.eliminar(usuario_id)
     if not exito:
         raise HTTPException(
@@ -1,10 +1,13 @@
+import time
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from db.usuarios.users_db import DataBaseUsuario
+from db.usuarios.users_db import obtener_db_usuarios
 from models.user import UsuarioPublico
+from auth.sesiones import almacen_sesiones
+from utils.cache_lru import CacheLRU
 
 # No debería compartirse la clave
 CLAVE_SECRETA = "perro_chancho_unsam_2025_!9xM4" 
@@ -12,6 +15,13 @@ CLAVE_SECRETA = "perro_chancho_unsam_2025_!9xM4"
 ALGORITMO = "HS256"
 MINUTOS_EXPIRACION_TOKEN = 60
 
+# Cache de tokens ya verificados: token -> UsuarioPublico.
+# Cada entrada vence con el claim "exp" del token, y como mucho a los
+# SEGUNDOS_MAX_CACHE_TOKEN para que los cambios del usuario se reflejen.
+CAPACIDAD_CACHE_TOKENS = 10_000
+SEGUNDOS_MAX_CACHE_TOKEN = 5 * 60
+cache_tokens = CacheLRU(CAPACIDAD_CACHE_TOKENS, nombre="tokens_verificados")
+
 # Configuración del sistema de hash
 contexto_hash = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -54,31 +64,68 @@ def crear_token_acceso(datos: dict, duracion: timedelta | None = None):
     return token_codificado
 
 
-async def obtener_usuario_actual(
-    token: str = Depends(esquema_oauth2)
-) -> UsuarioPublico:
-    """Valida el JWT recibido y devuelve el usuario autenticado."""
+def usuario_desde_token(token: str) -> UsuarioPublico:
+    """
+    Valida el JWT y devuelve el usuario autenticado.
+
+    Si el token ya fue verificado y no venció, se evita decodificarlo
+    y buscar el usuario en la base. La sesión se valida siempre
+    (en memoria en el caso común), así un cierre de sesión tiene
+    efecto inmediato.
+    """
     error_credenciales = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciales inválidas o token expirado.",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        # Decodificar el token con la clave y el algoritmo
-        carga_util = jwt.decode(token, CLAVE_SECRETA, algorithms=[ALGORITMO])
-        nombre_usuario: str = carga_util.get("sub")
-        if nombre_usuario is None:
+
+    usuario_publico = cache_tokens.obtener(token)
+    if usuario_publico is None:
+        try:
+            # Decodificar el token con la clave y el algoritmo
+            carga_util = jwt.decode(token, CLAVE_SECRETA, algorithms=[ALGORITMO])
+            nombre_usuario: str = carga_util.get("sub")
+            if nombre_usuario is None:
+                raise error_credenciales
+        except JWTError:
+            raise error_credenciales
+
+        usuario = obtener_db_usuarios().buscar_usuario_por_nombre(nombre_usuario)
+        if not usuario:
             raise error_credenciales
-    except JWTError:
-        raise error_credenciales
 
-    db_usuarios = DataBaseUsuario()
-    usuario = db_usuarios.buscar_usuario_por_nombre(nombre_usuario)
-    if not usuario:
+        usuario_publico = UsuarioPublico(
+            nombre_usuario=usuario["username"],
+            nombre_completo=usuario["full_name"],
+            tipo=usuario["tipo"]
+        )
+        restante = float(carga_util.get("exp", 0)) - time.time()
+        if restante > 0:
+            cache_tokens.guardar(
+                token, usuario_publico,
+                ttl=min(restante, SEGUNDOS_MAX_CACHE_TOKEN)
+            )
+
+    # El token tiene que pertenecer a una sesión vigente (no cerrada)
+    if almacen_sesiones.validar(token) is None:
+        cache_tokens.eliminar(token)
         raise error_credenciales
 
-    return UsuarioPublico(
-        nombre_usuario=usuario["username"],
-        nombre_completo=usuario["full_name"],
-        tipo=usuario["tipo"]
+    return usuario_publico
+
+
+def invalidar_tokens_usuario(nombre_usuario: str) -> int:
+    """
+    Quita del cache los tokens verificados de un usuario
+    (al cerrar sesión o al borrarlo). Devuelve la cantidad quitada.
+    """
+    return cache_tokens.eliminar_si(
+        lambda _, usuario: usuario.nombre_usuario == nombre_usuario
     )
+
+
+async def obtener_usuario_actual(
+    token: str = Depends(esquema_oauth2)
+) -> UsuarioPublico:
+    """Valida el JWT recibido y devuelve el usuario autenticado."""
+    return usuario_desde_token(token)
@@ -0,0 +1,142 @@
+"""
+Almacén de sesiones con cache en memoria.
+
+Las sesiones se persisten en usuarios.sesiones, pero la validación
+de un token se resuelve en memoria en el caso común:
+- cache LRU de sesiones activas, indexado por token
+- cache negativo de tokens revocados o inexistentes
+Además incluye la tarea periódica que purga las sesiones vencidas.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+from models.user import Session
+from utils.cache_lru import CacheLRU
+
+CAPACIDAD_SESIONES = 10_000
+# Tiempo que una sesión activa puede servirse desde memoria sin
+# volver a la base. Acota cuánto tarda en verse un cierre de sesión
+# hecho desde otro worker.
+TTL_SESIONES_ACTIVAS = 60
+TTL_TOKENS_REVOCADOS = 60 * 60
+INTERVALO_PURGA_SEGUNDOS = 15 * 60
+
+
+class AlmacenSesiones:
+    """
+    Maneja el ciclo de vida de las sesiones: alta, validación,
+    revocación y purga de vencidas.
+
+    Atributos:
+        activas (CacheLRU): token -> Session de sesiones vigentes.
+        revocadas (CacheLRU): token -> True (cache negativo).
+    """
+
+    def __init__(self, db=None, capacidad: int = CAPACIDAD_SESIONES):
+        """
+        :param db: instancia de DataBaseUsuario; si no se indica,
+                   se crea al primer uso
+        :param capacidad: cantidad máxima de tokens en cada cache
+        """
+        self._db = db
+        self.activas = CacheLRU(capacidad, ttl=TTL_SESIONES_ACTIVAS,
+                                nombre="sesiones_activas")
+        self.revocadas = CacheLRU(capacidad, ttl=TTL_TOKENS_REVOCADOS,
+                                  nombre="sesiones_revocadas")
+
+    @property
+    def db(self):
+        if self._db is None:
+            from db.usuarios.users_db import obtener_db_usuarios
+            self._db = obtener_db_usuarios()
+        return self._db
+
+    def registrar(self, sesion: Session) -> bool:
+        """Persiste una sesión nueva y la deja en el cache."""
+        if not self.db.guardar_sesion(sesion):
+            return False
+        self.revocadas.eliminar(sesion.token)
+        self._cachear(sesion)
+        return True
+
+    def validar(self, token: str) -> Optional[Session]:
+        """
+        Devuelve la sesión vigente del token o None si no existe,
+        fue revocada o venció. Solo consulta la base si el token no
+        está en ninguno de los dos caches.
+        """
+        sesion = self.activas.obtener(token)
+        if sesion is not None:
+            if not sesion.expirada():
+                return sesion
+            self.activas.eliminar(token)
+            return None
+
+        if self.revocadas.obtener(token):
+            return None
+
+        sesion = self.db.consultar_sesion(token)
+        if sesion is None or sesion.expirada():
+            self.revocadas.guardar(token, True)
+            return None
+        self._cachear(sesion)
+        return sesion
+
+    def revocar_usuario(self, usuario_id: int) -> bool:
+        """
+        Elimina todas las sesiones del usuario, en la base y en memoria.
+        Devuelve True si había alguna sesión.
+        """
+        tokens = self.db.eliminar_sesiones_de_usuario(usuario_id)
+        self.activas.eliminar_si(lambda _, s: s.usuario_id == usuario_id)
+        for token in tokens:
+            self.revocadas.guardar(token, True)
+        return len(tokens) > 0
+
+    def purgar_expiradas(self) -> int:
+        """
+        Elimina las sesiones vencidas de la base y de los caches.
+        Devuelve la cantidad eliminada de la base.
+        """
+        eliminadas = self.db.eliminar_sesiones_expiradas()
+        self.activas.eliminar_si(lambda _, s: s.expirada())
+        self.activas.purgar_vencidas()
+        self.revocadas.purgar_vencidas()
+        return eliminadas
+
+    def _cachear(self, sesion: Session):
+        # La entrada no debe sobrevivir a la sesión
+        restante = (
+            sesion.fecha_expiracion - datetime.now(timezone.utc)
+        ).total_seconds()
+        if restante > 0:
+            self.activas.guardar(
+                sesion.token, sesion, ttl=min(TTL_SESIONES_ACTIVAS, restante)
+            )
+
+
+async def purgar_sesiones_periodicamente(
+    almacen: AlmacenSesiones,
+    intervalo: float = INTERVALO_PURGA_SEGUNDOS
+):
+    """
+    Tarea en segundo plano: cada `intervalo` segundos elimina las
+    sesiones vencidas. La consulta corre en un thread para no
+    bloquear el event loop. Un error no detiene la tarea.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            eliminadas = await loop.run_in_executor(
+                None, almacen.purgar_expiradas
+            )
+            if eliminadas:
+                print(f"[SESIONES] {eliminadas} sesiones vencidas eliminadas")
+        except Exception as e:
+            print(f"[ERROR PURGA SESIONES] {e}")
+
+
+# Instancia compartida por auth_api y auth_service
+almacen_sesiones = AlmacenSesiones()
@@ -0,0 +1,91 @@
+"""
+Benchmark del costo de autenticación por request
+(auth_service.usuario_desde_token), sin y con el cache de tokens
+verificados.
+
+La base de usuarios se reemplaza por una en memoria, así se mide
+solo el costo de CPU (verificación HMAC + parseo del JWT + armado
+del usuario). Con --latencia-db-ms se simula además el round trip
+de la búsqueda del usuario en la base.
+
+Uso (desde la carpeta Proyecto):
+    python -m benchmarks.bench_auth
+    python -m benchmarks.bench_auth --latencia-db-ms 2 --guardar
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.comun import medir, imprimir_resultados, guardar_json
+from auth import auth_service
+from auth.sesiones import AlmacenSesiones
+from models.user import Session
+
+
+class _DBUsuariosEnMemoria:
+    def __init__(self, latencia_s: float):
+        self.latencia_s = latencia_s
+        self.sesiones = {}
+
+    def buscar_usuario_por_nombre(self, nombre_usuario):
+        if self.latencia_s:
+            time.sleep(self.latencia_s)
+        return {"username": nombre_usuario, "full_name": "Bench", "tipo": "normal"}
+
+    def guardar_sesion(self, sesion):
+        self.sesiones[sesion.token] = sesion
+        return True
+
+    def consultar_sesion(self, token):
+        return self.sesiones.get(token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latencia-db-ms", type=float, default=0.0)
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    parser.add_argument("--guardar", action="store_true",
+                        help="guarda los resultados en benchmarks/resultados/auth.json")
+    args = parser.parse_args()
+
+    db = _DBUsuariosEnMemoria(args.latencia_db_ms / 1000)
+    auth_service.obtener_db_usuarios = lambda: db
+    auth_service.almacen_sesiones = AlmacenSesiones(db)
+
+    token = auth_service.crear_token_acceso({"sub": "bench", "tipo": "normal"})
+    ahora = datetime.now(timezone.utc)
+    auth_service.almacen_sesiones.registrar(
+        Session(token, 1, ahora, ahora + timedelta(hours=1))
+    )
+
+    def sin_cache():
+        auth_service.cache_tokens.limpiar()
+        auth_service.usuario_desde_token(token)
+
+    def con_cache():
+        auth_service.usuario_desde_token(token)
+
+    repeticiones = args.repeticiones
+    if args.latencia_db_ms:
+        repeticiones = max(1, min(repeticiones, int(2000 / args.latencia_db_ms)))
+
+    resultados = {
+        "antes (decode + busqueda por request)": medir(sin_cache, repeticiones),
+        "despues (token verificado en cache)": medir(con_cache, repeticiones),
+    }
+    imprimir_resultados(
+        f"Autenticación por request (latencia DB simulada: {args.latencia_db_ms} ms)",
+        resultados
+    )
+
+    if args.guardar:
+        ruta = guardar_json("auth", {
+            "latencia_db_ms": args.latencia_db_ms,
+            "resultados": resultados,
+        })
+        print(f"\nResultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
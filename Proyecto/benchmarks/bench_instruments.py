@@ -0,0 +1,149 @@
+"""
+Microbenchmarks de la matemática de instrumentos (models/instruments.py).
+
+Mide, para universos de 1, 60 y 10.000 instrumentos:
+- PlazoFijo.calcular_rendimiento
+- PlazoFijo.rendimiento_vs_banda
+- Bono._estimacion_rend_anual
+- Bono.calcular_rendimiento
+- Bono.rendimiento_vs_banda
+- _mes_banda_de_salida
+Las consultas de banda cambiaria y dólar se reemplazan por valores
+fijos, así se mide solo el cálculo.
+
+Los tiempos se informan por universo completo. La línea base queda en
+benchmarks/resultados/instruments.json para comparar entre commits.
+
+Uso (desde la carpeta Proyecto):
+    python -m benchmarks.bench_instruments              # medir y comparar con la base
+    python -m benchmarks.bench_instruments --guardar    # actualizar la línea base
+"""
+
+import argparse
+import platform
+import random
+import subprocess
+from datetime import date
+from unittest.mock import patch
+
+from benchmarks.comun import medir, imprimir_resultados, guardar_json, cargar_json
+from models.instruments import PlazoFijo, Bono, _mes_banda_de_salida
+
+TAMANIOS = (1, 60, 10_000)
+NOMBRE_RESULTADOS = "instruments"
+BANDA_FIJA = (951.0, 1471.0)
+DOLAR_FIJO = 1450.0
+
+
+def _universo_plazos_fijos(n: int, rng: random.Random) -> list[PlazoFijo]:
+    plazos = []
+    for i in range(n):
+        pf = PlazoFijo(f"Banco {i}", tasa_tna=rng.uniform(20, 45), dias=rng.choice((30, 60, 90)))
+        pf.actualizar(DOLAR_FIJO)
+        plazos.append(pf)
+    return plazos
+
+
+def _universo_bonos(n: int, rng: random.Random) -> list[Bono]:
+    bonos = []
+    for i in range(n):
+        bono = Bono(
+            f"BONO{i}", rng.choice(("ARS", "USD")),
+            ultimo=rng.uniform(50, 1000),
+            dia_pct=rng.uniform(-2, 2),
+            mes_pct=rng.uniform(-5, 5),
+            anio_pct=rng.uniform(-10, 60),
+        )
+        bono.actualizar(DOLAR_FIJO)
+        bonos.append(bono)
+    return bonos
+
+
+def _casos(tamanio: int) -> dict:
+    rng = random.Random(42)
+    plazos = _universo_plazos_fijos(tamanio, rng)
+    bonos = _universo_bonos(tamanio, rng)
+    fechas = [date(2025, 11, 1 + i % 28) for i in range(tamanio)]
+    dias = [rng.choice((30, 45, 90, 180, 365)) for _ in range(tamanio)]
+
+    return {
+        "PlazoFijo.calcular_rendimiento":
+            lambda: [pf.calcular_rendimiento(10_000) for pf in plazos],
+        "PlazoFijo.rendimiento_vs_banda":
+            lambda: [pf.rendimiento_vs_banda(10_000) for pf in plazos],
+        "Bono._estimacion_rend_anual":
+            lambda: [b._estimacion_rend_anual() for b in bonos],
+        "Bono.calcular_rendimiento":
+            lambda: [b.calcular_rendimiento(10_000) for b in bonos],
+        "Bono.rendimiento_vs_banda":
+            lambda: [b.rendimiento_vs_banda(10_000, fecha_inicio=f) for b, f in zip(bonos, fechas)],
+        "_mes_banda_de_salida":
+            lambda: [_mes_banda_de_salida(None, f, d) for f, d in zip(fechas, dias)],
+    }
+
+
+def _commit_actual() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def ejecutar(rondas: int = 5) -> dict:
+    """Corre todos los casos y devuelve {tamaño: {caso: estadísticas}}."""
+    resultados = {}
+    # Funciones simples en lugar de MagicMock: el costo de un mock
+    # superaría al del cálculo que se quiere medir.
+    with patch("models.instruments.obtener_banda_cambiaria", new=lambda mes=None: BANDA_FIJA), \
+         patch("models.instruments.obtener_dolar_oficial", new=lambda: DOLAR_FIJO):
+        for tamanio in TAMANIOS:
+            repeticiones = max(1, 20_000 // (tamanio * 10))
+            resultados[str(tamanio)] = {
+                caso: medir(funcion, repeticiones, rondas)
+                for caso, funcion in _casos(tamanio).items()
+            }
+    return resultados
+
+
+def comparar(actual: dict, base: dict):
+    """Imprime la relación actual/base de la mediana de cada caso."""
+    print("\nComparación con la línea base (actual / base, < 1 es más rápido)")
+    for tamanio, casos in actual.items():
+        for caso, r in casos.items():
+            anterior = base.get(tamanio, {}).get(caso)
+            if not anterior:
+                continue
+            relacion = r["mediana_us"] / anterior["mediana_us"]
+            print(f"  n={tamanio:>6} {caso:<34} x{relacion:6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guardar", action="store_true",
+                        help=f"guarda los resultados como línea base en resultados/{NOMBRE_RESULTADOS}.json")
+    parser.add_argument("--rondas", type=int, default=5)
+    args = parser.parse_args()
+
+    resultados = ejecutar(args.rondas)
+    for tamanio, casos in resultados.items():
+        imprimir_resultados(f"Universo de {tamanio} instrumentos (tiempo por universo)", casos)
+
+    base = cargar_json(NOMBRE_RESULTADOS)
+    if base:
+        comparar(resultados, base["resultados"])
+
+    if args.guardar:
+        ruta = guardar_json(NOMBRE_RESULTADOS, {
+            "commit": _commit_actual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "resultados": resultados,
+        })
+        print(f"\nLínea base guardada en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
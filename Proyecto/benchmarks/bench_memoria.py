@@ -0,0 +1,120 @@
+"""
+Benchmark de memoria de los instrumentos (models/instruments.py).
+
+Crea 100.000 posiciones de cada tipo, como las que se tienen en memoria
+para las alertas (PlazoFijo.from_supabase_row con el dólar actual) y
+como los libros de bonos y letras, y mide con tracemalloc los bytes por
+objeto (incluye el objeto y sus atributos propios, no los valores
+compartidos) y el tiempo de creación.
+
+La línea base queda en benchmarks/resultados/memoria.json para comparar
+entre commits.
+
+Uso (desde la carpeta Proyecto):
+    python -m benchmarks.bench_memoria              # medir y comparar con la base
+    python -m benchmarks.bench_memoria --guardar    # actualizar la línea base
+"""
+
+import argparse
+import gc
+import platform
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks.comun import guardar_json, cargar_json
+from benchmarks.bench_instruments import _commit_actual
+from models.instruments import PlazoFijo, Bono, Letra
+
+POSICIONES = 100_000
+NOMBRE_RESULTADOS = "memoria"
+DOLAR_FIJO = 1450.0
+
+
+def _plazos_fijos(n: int) -> list:
+    filas = [
+        {"banco": f"Banco {i % 40}", "tasa_pct": 30.0 + i % 15, "monto_inicial": 1000.0 + i,
+         "dolar_equilibrio": 1500.0 + i % 100, "dolar_actual": DOLAR_FIJO}
+        for i in range(n)
+    ]
+    posiciones = []
+    for fila in filas:
+        pf = PlazoFijo.from_supabase_row(fila)
+        pf.valor_dolar = DOLAR_FIJO
+        posiciones.append(pf)
+    return posiciones
+
+
+def _bonos(n: int) -> list:
+    bonos = []
+    for i in range(n):
+        bono = Bono(f"BONO{i % 60}", "ARS", ultimo=100.0 + i % 50,
+                    dia_pct=0.1, mes_pct=1.5, anio_pct=25.0)
+        bono.actualizar(DOLAR_FIJO)
+        bonos.append(bono)
+    return bonos
+
+
+def _letras(n: int) -> list:
+    vencimiento = date(2026, 12, 31)
+    return [
+        Letra(f"S{i % 30}", "ARS", ultimo=950.0 + i % 40,
+              fecha_vencimiento=vencimiento + timedelta(days=i % 200))
+        for i in range(n)
+    ]
+
+
+CASOS = {"PlazoFijo": _plazos_fijos, "Bono": _bonos, "Letra": _letras}
+
+
+def medir_memoria(crear, n: int) -> dict:
+    """Bytes por objeto y tiempo de creación de `n` objetos."""
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    objetos = crear(n)
+    segundos = time.perf_counter() - inicio
+    bytes_totales, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objetos
+    return {
+        "bytes_por_objeto": round(bytes_totales / n, 1),
+        "mb_totales": round(bytes_totales / 2 ** 20, 2),
+        "segundos_creacion": round(segundos, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guardar", action="store_true",
+                        help=f"guarda los resultados como línea base en resultados/{NOMBRE_RESULTADOS}.json")
+    parser.add_argument("--posiciones", type=int, default=POSICIONES)
+    args = parser.parse_args()
+
+    resultados = {caso: medir_memoria(crear, args.posiciones) for caso, crear in CASOS.items()}
+    print(f"\nMemoria con {args.posiciones} objetos por tipo")
+    for caso, r in resultados.items():
+        print(f"  {caso:<10} {r['bytes_por_objeto']:>8.1f} B/objeto  "
+              f"{r['mb_totales']:>7.2f} MB  creación {r['segundos_creacion']:.3f} s")
+
+    base = cargar_json(NOMBRE_RESULTADOS)
+    if base:
+        print("\nComparación con la línea base (actual / base, < 1 es menos memoria)")
+        for caso, r in resultados.items():
+            anterior = base["resultados"].get(caso)
+            if anterior:
+                print(f"  {caso:<10} x{r['bytes_por_objeto'] / anterior['bytes_por_objeto']:5.2f}")
+
+    if args.guardar:
+        ruta = guardar_json(NOMBRE_RESULTADOS, {
+            "commit": _commit_actual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "posiciones": args.posiciones,
+            "resultados": resultados,
+        })
+        print(f"\nLínea base guardada en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark de serialización de la respuesta de /bonos/calcular
+con 60 y 5000 instrumentos.
+
+Compara:
+- jsonable_encoder + JSONResponse: lo que hace FastAPI cuando el
+  endpoint devuelve dicts sin response_model (versión anterior).
+- response_model: validación + dump_python(mode="json") + json.dumps,
+  lo que hace FastAPI cuando el endpoint declara response_model.
+- TypeAdapter.dump_json: models/respuestas.serializar_resultados_bonos
+  (validación + serialización en pydantic-core), lo que usa ahora el
+  endpoint en cada fallo del cache.
+
+Uso (desde la carpeta Proyecto):
+    python -m benchmarks.bench_serializacion
+    python -m benchmarks.bench_serializacion --guardar
+"""
+
+import argparse
+import json
+import random
+
+from benchmarks.comun import medir, imprimir_resultados, guardar_json
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from models.respuestas import ADAPTADOR_RESULTADOS_BONOS, serializar_resultados_bonos
+
+TAMANIOS = (60, 5000)
+
+
+def resultados_sinteticos(n: int, semilla: int = 42) -> list[dict]:
+    """Resultados con la misma forma que arma calcular_bonos."""
+    rng = random.Random(semilla)
+    resultados = []
+    for i in range(n):
+        moneda = rng.choice(("ARS", "USD"))
+        rendimiento = {
+            "r_mensual_pct": round(rng.uniform(-1, 5), 2),
+            "r_anual_pct": round(rng.uniform(-10, 60), 2),
+        }
+        if moneda == "ARS":
+            rendimiento["usd_invertidos"] = round(rng.uniform(5, 10), 2)
+        resultados.append({
+            "bono": f"BONO{i}",
+            "moneda": moneda,
+            "monto_inicial": 10000.0,
+            "moneda_inversion": "ARS",
+            "monto_convertido": round(rng.uniform(5, 10000), 2),
+            "rendimiento": rendimiento,
+            "vs_banda": {
+                "monto_final_pesos": round(rng.uniform(9000, 11000), 2),
+                "factor_ars": round(rng.uniform(0.9, 1.1), 6),
+                "monto_final_usd_techo": round(rng.uniform(5, 8), 2),
+                "dolar_equilibrio": round(rng.uniform(1400, 1600), 2),
+                "dias_considerados": 30,
+                "mes_banda_usado": "2025-12",
+            } if i % 10 else {},
+        })
+    return resultados
+
+
+def _jsonable_encoder(resultados):
+    return JSONResponse(jsonable_encoder(resultados)).body
+
+
+def _response_model(resultados):
+    modelos = ADAPTADOR_RESULTADOS_BONOS.validate_python(resultados)
+    contenido = ADAPTADOR_RESULTADOS_BONOS.dump_python(modelos, mode="json", exclude_none=True)
+    return JSONResponse(contenido).body
+
+
+def ejecutar(rondas: int = 5) -> dict:
+    resultados = {}
+    for tamanio in TAMANIOS:
+        datos = resultados_sinteticos(tamanio)
+        # Las tres variantes tienen que producir el mismo JSON
+        esperado = json.loads(_jsonable_encoder(datos))
+        assert json.loads(_response_model(datos)) == esperado
+        assert json.loads(serializar_resultados_bonos(datos)) == esperado
+
+        repeticiones = max(1, 5000 // tamanio)
+        resultados[str(tamanio)] = {
+            "jsonable_encoder": medir(lambda: _jsonable_encoder(datos), repeticiones, rondas),
+            "response_model": medir(lambda: _response_model(datos), repeticiones, rondas),
+            "TypeAdapter.dump_json": medir(lambda: serializar_resultados_bonos(datos), repeticiones, rondas),
+        }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rondas", type=int, default=5)
+    parser.add_argument("--guardar", action="store_true",
+                        help="guarda los resultados en resultados/serializacion.json")
+    args = parser.parse_args()
+
+    resultados = ejecutar(args.rondas)
+    for tamanio, casos in resultados.items():
+        imprimir_resultados(f"Respuesta de {tamanio} bonos (tiempo por respuesta)", casos)
+        base = casos["jsonable_encoder"]["mediana_us"]
+        print(f"  TypeAdapter.dump_json es x{base / casos['TypeAdapter.dump_json']['mediana_us']:.1f} "
+              "más rápido que jsonable_encoder")
+
+    if args.guardar:
+        print(f"\nResultados guardados en {guardar_json('serializacion', resultados)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+"""
+Prueba de carga local de la API CotizAR.
+
+Arma una base SQLite que imita los esquemas de Supabase (ver
+utils/conexion_db.py), la carga con datasets/*.csv más cotizaciones,
+tasas de plazo fijo y usuarios sintéticos, levanta `main:cotizar` con
+uvicorn y la recorre con N usuarios virtuales concurrentes.
+
+Cada usuario virtual inicia sesión con su propia cuenta y repite una
+mezcla de requests parecida al uso real (MEZCLA) hasta que termina la
+prueba; al final cierra su sesión. Se informa por ruta: requests,
+throughput, p50/p95/p99 y tasa de errores (estado >= 400 o excepción).
+
+Uso (desde la carpeta Proyecto):
+    python -m benchmarks.prueba_carga --concurrencia 20 --duracion 30
+    python -m benchmarks.prueba_carga --workers 2 --guardar
+    python -m benchmarks.prueba_carga --en-proceso     # sin uvicorn (ASGI directo)
+    python -m benchmarks.prueba_carga --url http://host:8000 --sin-sembrar
+"""
+
+import argparse
+import asyncio
+import csv
+import glob
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.comun import guardar_json, CARPETA_RESULTADOS
+
+PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASETS = os.path.join(PROYECTO, "datasets")
+BASE_POR_DEFECTO = os.path.join(CARPETA_RESULTADOS, "carga", "cotizar.db")
+
+CONTRASENIA = "carga1234"
+BANCOS = 25
+PF_POR_USUARIO = 3
+CUANTILES = (0.5, 0.95, 0.99)
+
+DOLARES = [
+    ("DÓLAR OFICIAL", 1400.0, 1450.0, 0.35),
+    ("DÓLAR BLUE", 1420.0, 1440.0, -0.69),
+    ("DÓLAR MEP", 1445.3, 1452.1, 0.12),
+    ("DÓLAR CCL", 1470.2, 1478.9, 0.25),
+    ("DÓLAR CRIPTO", 1475.0, 1490.0, 0.40),
+    ("DÓLAR TARJETA", 1820.0, 1885.0, 0.35),
+]
+
+# (peso, nombre de la ruta); los requests concretos se arman en _request()
+MEZCLA = [
+    (30, "GET /dolar/"),
+    (20, "GET /dolar/cotizaciones"),
+    (15, "GET /plazo fijo/instrumentos/plazos-fijos/bancos"),
+    (5, "POST /plazo fijo/instrumentos/plazos-fijos/crear"),
+    (20, "GET /bonos/calcular"),
+    (8, "GET /auth/usuario_actual"),
+    (2, "POST /auth/iniciar_sesion"),
+]
+
+
+# -------------------------------
+# BASE LOCAL
+# -------------------------------
+
+TABLAS = [
+    """CREATE TABLE usuarios.usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE,
+        hashed_password TEXT, full_name TEXT, tipo TEXT,
+        email TEXT UNIQUE, telefono INTEGER
+    )""",
+    """CREATE TABLE usuarios.sesiones (
+        token TEXT PRIMARY KEY, usuario_id INTEGER,
+        fecha_inicio TEXT, fecha_expiracion TEXT
+    )""",
+    "CREATE INDEX usuarios.sesiones_fecha_expiracion_idx ON sesiones (fecha_expiracion)",
+    "CREATE INDEX usuarios.sesiones_usuario_id_idx ON sesiones (usuario_id)",
+    """CREATE TABLE datos_financieros.dolar (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT,
+        compra REAL, venta REAL, variacion REAL
+    )""",
+    """CREATE TABLE datos_financieros.plazos_fijos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, banco TEXT, plazo TEXT, tasa_pct REAL
+    )""",
+    """CREATE TABLE datos_financieros.bonos (
+        nombre TEXT, moneda TEXT, ultimo REAL, dia_pct REAL,
+        mes_pct REAL, anio_pct REAL, fecha_vencimiento TEXT
+    )""",
+    """CREATE TABLE datos_financieros.letras (
+        nombre TEXT, moneda TEXT, ultimo REAL, dia_pct REAL,
+        mes_pct REAL, anio_pct REAL, fecha_vencimiento TEXT
+    )""",
+    """CREATE TABLE datos_financieros.bandas_cambiarias (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, fecha TEXT,
+        banda_inferior REAL, banda_superior REAL, ancho REAL
+    )""",
+    """CREATE TABLE instrumentos_usuarios.plazos_fijos_usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, usuario_username TEXT, banco TEXT,
+        monto_inicial REAL, tasa_pct REAL, monto_final_pesos REAL,
+        dolar_actual REAL, dolar_equilibrio REAL, fecha_calculo TEXT
+    )""",
+    """CREATE TABLE instrumentos_usuarios.bonos_usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, usuario_username TEXT, bono TEXT,
+        moneda_bono TEXT, monto_inicial REAL, moneda_inversion TEXT,
+        monto_convertido REAL, r_mensual_pct REAL, r_anual_pct REAL,
+        monto_final_pesos REAL, factor_ars REAL, vs_banda_techo_usd REAL,
+        dolar_actual REAL, dolar_equilibrio REAL,
+        dias_considerados INTEGER, mes_banda_usado TEXT
+    )""",
+]
+
+
+def _leer_csv(nombre: str) -> list[dict]:
+    with open(os.path.join(DATASETS, nombre), encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def _borrar_base(ruta: str):
+    raiz, _ = os.path.splitext(ruta)
+    for archivo in glob.glob(f"{glob.escape(raiz)}*.db*"):
+        os.remove(archivo)
+
+
+def sembrar_base(ruta: str, usuarios: int, semilla: int = 42):
+    """
+    Crea la base SQLite de prueba desde cero y la carga con datos
+    realistas. Devuelve la lista de bancos sembrados.
+    """
+    # utils.conexion_db lee DB_URL al importarse
+    os.environ["DB_URL"] = f"sqlite:///{ruta}"
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    _borrar_base(ruta)
+
+    from sqlalchemy import text
+    from utils.conexion_db import engine
+    from utils.version_mercado import FUENTES, incrementar_version
+    from utils.analitica_instrumentos import TABLAS_ORIGEN, recalcular_analitica
+    from auth.auth_service import crear_hash_contraseña
+
+    rng = random.Random(semilla)
+    bancos = [f"Banco Carga {i:02d}" for i in range(BANCOS)]
+    tasas = {banco: round(rng.uniform(20, 40), 2) for banco in bancos}
+    # bcrypt es lento a propósito: se hashea una vez para todas las cuentas
+    contrasenia_hash = crear_hash_contraseña(CONTRASENIA)
+
+    columnas_bono = ("nombre", "moneda", "ultimo", "dia_pct", "mes_pct", "anio_pct", "fecha_vencimiento")
+
+    with engine.begin() as conn:
+        for tabla in TABLAS:
+            conn.execute(text(tabla))
+
+        conn.execute(
+            text("INSERT INTO datos_financieros.dolar (tipo, compra, venta, variacion) "
+                 "VALUES (:tipo, :compra, :venta, :variacion)"),
+            [dict(zip(("tipo", "compra", "venta", "variacion"), fila)) for fila in DOLARES]
+        )
+        conn.execute(
+            text("INSERT INTO datos_financieros.plazos_fijos (banco, plazo, tasa_pct) "
+                 "VALUES (:banco, '30 días', :tasa_pct)"),
+            [{"banco": b, "tasa_pct": t} for b, t in tasas.items()]
+        )
+        for tabla, archivo in (("bonos", "bonos_argentinos_vencimiento.csv"),
+                               ("letras", "letras_argentinas_vencimiento.csv")):
+            conn.execute(
+                text(f"INSERT INTO datos_financieros.{tabla} ({', '.join(columnas_bono)}) "
+                     f"VALUES ({', '.join(':' + c for c in columnas_bono)})"),
+                [{c: fila[c] or None for c in columnas_bono} for fila in _leer_csv(archivo)]
+            )
+        conn.execute(
+            text("INSERT INTO datos_financieros.bandas_cambiarias "
+                 "(fecha, banda_inferior, banda_superior, ancho) "
+                 "VALUES (:fecha, :banda_inferior, :banda_superior, :ancho)"),
+            _leer_csv("bandas_nov2025_dic2028.csv")
+        )
+
+        conn.execute(
+            text("INSERT INTO usuarios.usuarios (username, hashed_password, full_name, tipo, email, telefono) "
+                 "VALUES (:username, :hashed_password, :full_name, :tipo, :email, :telefono)"),
+            [{
+                "username": f"carga{i}",
+                "hashed_password": contrasenia_hash,
+                "full_name": f"Usuario Carga {i}",
+                "tipo": "normal",
+                "email": f"carga{i}@cotizar.test",
+                "telefono": 1100000000 + i,
+            } for i in range(usuarios)]
+        )
+        # Algunos plazos fijos por usuario, para que el login arme alertas
+        filas_pf = []
+        for i in range(usuarios):
+            for _ in range(PF_POR_USUARIO):
+                banco = rng.choice(bancos)
+                monto = rng.choice((100_000, 500_000, 1_000_000))
+                final = monto * (1 + tasas[banco] / 100 * 30 / 365)
+                filas_pf.append({
+                    "usuario_username": f"carga{i}", "banco": banco,
+                    "monto_inicial": monto, "tasa_pct": tasas[banco],
+                    "monto_final_pesos": round(final, 2), "dolar_actual": 1450.0,
+                    "dolar_equilibrio": round(final * 1450.0 / monto, 2),
+                })
+        conn.execute(
+            text("INSERT INTO instrumentos_usuarios.plazos_fijos_usuarios "
+                 "(usuario_username, banco, monto_inicial, tasa_pct, monto_final_pesos, "
+                 "dolar_actual, dolar_equilibrio, fecha_calculo) "
+                 "VALUES (:usuario_username, :banco, :monto_inicial, :tasa_pct, "
+                 ":monto_final_pesos, :dolar_actual, :dolar_equilibrio, NOW())"),
+            filas_pf
+        )
+        for fuente in FUENTES:
+            incrementar_version(conn, fuente)
+        # Como después de correr los scrapers
+        for tipo in TABLAS_ORIGEN:
+            recalcular_analitica(conn, tipo)
+
+    engine.dispose()
+    print(f"Base de prueba sembrada en {ruta} ({usuarios} usuarios, {BANCOS} bancos)")
+    return bancos
+
+
+# -------------------------------
+# SERVIDOR
+# -------------------------------
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_uvicorn(ruta_base: str, workers: int) -> tuple[subprocess.Popen, str]:
+    """Levanta `uvicorn main:cotizar` contra la base de prueba."""
+    puerto = _puerto_libre()
+    entorno = {**os.environ, "DB_URL": f"sqlite:///{ruta_base}"}
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:cotizar",
+         "--host", "127.0.0.1", "--port", str(puerto),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=PROYECTO, env=entorno,
+        # Las notificaciones de alertas del login ensucian el reporte
+        stdout=subprocess.DEVNULL,
+    )
+    return proceso, f"http://127.0.0.1:{puerto}"
+
+
+async def esperar_servidor(cliente, proceso=None, espera: float = 30.0):
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        if proceso is not None and proceso.poll() is not None:
+            raise RuntimeError("uvicorn terminó antes de aceptar requests.")
+        try:
+            if (await cliente.get("/")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"El servidor no respondió en {espera} segundos.")
+
+
+# -------------------------------
+# USUARIOS VIRTUALES
+# -------------------------------
+
+class Resultados:
+    """Latencias y errores por ruta."""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.estados = defaultdict(lambda: defaultdict(int))
+
+    def registrar(self, ruta: str, duracion: float, estado: int | None):
+        self.latencias[ruta].append(duracion)
+        self.estados[ruta][estado or "excepción"] += 1
+        if estado is None or estado >= 400:
+            self.errores[ruta] += 1
+
+    def resumen(self, duracion_total: float) -> dict:
+        resumen = {}
+        for ruta in sorted(self.latencias):
+            latencias = sorted(self.latencias[ruta])
+            n = len(latencias)
+            resumen[ruta] = {
+                "requests": n,
+                "rps": round(n / duracion_total, 2),
+                **{f"p{int(q * 100)}_ms": round(latencias[min(n - 1, int(q * n))] * 1000, 2)
+                   for q in CUANTILES},
+                "errores_pct": round(100 * self.errores[ruta] / n, 2),
+                "estados": {str(e): c for e, c in self.estados[ruta].items()},
+            }
+        return resumen
+
+
+async def _medir(resultados: Resultados, ruta: str, llamada):
+    inicio = time.perf_counter()
+    estado = None
+    respuesta = None
+    try:
+        respuesta = await llamada
+        estado = respuesta.status_code
+    except Exception as e:
+        print(f"[ERROR CARGA] {ruta}: {e!r}")
+    resultados.registrar(ruta, time.perf_counter() - inicio, estado)
+    return respuesta
+
+
+async def _iniciar_sesion(cliente, resultados, usuario: str) -> dict:
+    respuesta = await _medir(
+        resultados, "POST /auth/iniciar_sesion",
+        cliente.post("/auth/iniciar_sesion", data={"username": usuario, "password": CONTRASENIA})
+    )
+    if respuesta is not None and respuesta.status_code == 200:
+        return {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+    return {}
+
+
+def _request(cliente, ruta: str, usuario: str, bancos: list[str], headers: dict,
+             rng: random.Random):
+    """Arma el request concreto de una ruta de MEZCLA."""
+    if ruta == "GET /dolar/":
+        return cliente.get("/dolar/")
+    if ruta == "GET /dolar/cotizaciones":
+        return cliente.get("/dolar/cotizaciones")
+    if ruta == "GET /plazo fijo/instrumentos/plazos-fijos/bancos":
+        return cliente.get("/plazo fijo/instrumentos/plazos-fijos/bancos")
+    if ruta == "POST /plazo fijo/instrumentos/plazos-fijos/crear":
+        return cliente.post("/plazo fijo/instrumentos/plazos-fijos/crear", json={
+            "usuario_username": usuario,
+            "banco": rng.choice(bancos),
+            "monto_inicial": rng.choice((50_000, 250_000, 1_000_000)),
+            "dias": rng.choice((30, 60, 90)),
+        })
+    if ruta == "GET /bonos/calcular":
+        return cliente.get("/bonos/calcular", params={
+            "monto": rng.choice((10_000, 100_000, 1_000)),
+            "moneda_inversion": rng.choice(("ARS", "USD")),
+            "usuario_username": usuario,
+        })
+    if ruta == "GET /auth/usuario_actual":
+        return cliente.get("/auth/usuario_actual", headers=headers)
+    raise ValueError(f"Ruta desconocida: {ruta}")
+
+
+async def usuario_virtual(cliente, numero: int, bancos: list[str], fin: float,
+                          resultados: Resultados, pausa: float, semilla: int):
+    rng = random.Random(semilla + numero)
+    usuario = f"carga{numero}"
+    rutas = [ruta for _, ruta in MEZCLA]
+    pesos = [peso for peso, _ in MEZCLA]
+
+    headers = await _iniciar_sesion(cliente, resultados, usuario)
+    while time.monotonic() < fin:
+        ruta = rng.choices(rutas, pesos)[0]
+        if ruta == "POST /auth/iniciar_sesion":
+            headers = await _iniciar_sesion(cliente, resultados, usuario) or headers
+        else:
+            await _medir(resultados, ruta, _request(cliente, ruta, usuario, bancos, headers, rng))
+        if pausa:
+            await asyncio.sleep(rng.expovariate(1 / pausa))
+
+    await _medir(resultados, "POST /auth/cerrar_sesion",
+                 cliente.post("/auth/cerrar_sesion", headers=headers))
+
+
+async def ejecutar_carga(cliente, concurrencia: int, duracion: float,
+                         bancos: list[str], pausa: float = 0.0,
+                         semilla: int = 42) -> dict:
+    """Corre `concurrencia` usuarios virtuales durante `duracion` segundos."""
+    resultados = Resultados()
+    inicio = time.monotonic()
+    fin = inicio + duracion
+    await asyncio.gather(*(
+        usuario_virtual(cliente, i, bancos, fin, resultados, pausa, semilla)
+        for i in range(concurrencia)
+    ))
+    total = time.monotonic() - inicio
+    return {"duracion_s": round(total, 2), "rutas": resultados.resumen(total)}
+
+
+# -------------------------------
+# REPORTE
+# -------------------------------
+
+def imprimir_reporte(reporte: dict):
+    rutas = reporte["rutas"]
+    total = sum(r["requests"] for r in rutas.values())
+    print(f"\nPrueba de carga: {reporte['concurrencia']} usuarios, "
+          f"{reporte['duracion_s']} s, {total} requests "
+          f"({total / reporte['duracion_s']:.1f} req/s)")
+    ancho = max(len(ruta) for ruta in rutas)
+    print(f"{'ruta':<{ancho}}  {'req':>6} {'req/s':>8} {'p50 ms':>9} "
+          f"{'p95 ms':>9} {'p99 ms':>9} {'error %':>8}")
+    for ruta, r in rutas.items():
+        print(f"{ruta:<{ancho}}  {r['requests']:>6} {r['rps']:>8.1f} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['errores_pct']:>8.2f}")
+
+
+async def principal(args):
+    import httpx
+
+    bancos = [f"Banco Carga {i:02d}" for i in range(BANCOS)]
+    if not args.sin_sembrar:
+        bancos = sembrar_base(args.base, args.concurrencia, args.semilla)
+
+    proceso = None
+    if args.url:
+        transporte, url = None, args.url
+    elif args.en_proceso:
+        os.environ["DB_URL"] = f"sqlite:///{args.base}"
+        from main import cotizar
+        transporte, url = httpx.ASGITransport(app=cotizar), "http://cotizar"
+    else:
+        proceso, url = iniciar_uvicorn(args.base, args.workers)
+        transporte = None
+
+    limites = httpx.Limits(max_connections=args.concurrencia,
+                           max_keepalive_connections=args.concurrencia)
+    try:
+        async with httpx.AsyncClient(base_url=url, transport=transporte,
+                                     limits=limites, timeout=30) as cliente:
+            await esperar_servidor(cliente, proceso)
+            reporte = await ejecutar_carga(cliente, args.concurrencia, args.duracion,
+                                           bancos, args.pausa, args.semilla)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=10)
+
+    reporte.update({
+        "concurrencia": args.concurrencia,
+        "workers": None if (args.url or args.en_proceso) else args.workers,
+        "modo": "url" if args.url else "en_proceso" if args.en_proceso else "uvicorn",
+    })
+    imprimir_reporte(reporte)
+    if args.guardar:
+        print(f"\nResultados guardados en {guardar_json('prueba_carga', reporte)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrencia", type=int, default=10,
+                        help="usuarios virtuales simultáneos (uno por cuenta)")
+    parser.add_argument("--duracion", type=float, default=20.0, help="segundos de carga")
+    parser.add_argument("--pausa", type=float, default=0.0,
+                        help="pausa media entre requests de un usuario, en segundos")
+    parser.add_argument("--workers", type=int, default=1, help="workers de uvicorn")
+    parser.add_argument("--base", default=BASE_POR_DEFECTO, help="archivo SQLite de prueba")
+    parser.add_argument("--url", help="usar un servidor ya levantado en lugar de uvicorn")
+    parser.add_argument("--en-proceso", action="store_true",
+                        help="llamar a la app por ASGI en este proceso (sin red ni uvicorn)")
+    parser.add_argument("--sin-sembrar", action="store_true",
+                        help="no recrear la base de prueba")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--guardar", action="store_true",
+                        help="guarda el reporte en resultados/prueba_carga.json")
+    asyncio.run(principal(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
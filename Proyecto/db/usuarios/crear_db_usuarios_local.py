@@ -34,6 +34,10 @@ with sqlite3.connect(RUTA_DB) as conn:
             FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
         )
     """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS sesiones_fecha_expiracion_idx
+        ON sesiones (fecha_expiracion)
+    """)
     conn.commit()
     
 print("Base de datos creada vacía:", RUTA_DB)
\ No newline at end of file
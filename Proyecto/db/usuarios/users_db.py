@@ -6,6 +6,7 @@ from sqlalchemy.exc import IntegrityError
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.conexion_db import engine
+from utils.paginacion import LIMITE_POR_DEFECTO, consulta_paginada
 
 
 class DataBaseUsuario(AbstractDatabase):
@@ -15,12 +16,17 @@ class DataBaseUsuario(AbstractDatabase):
     """
 
     def __init__(self):
+        # No toca la base: las tablas se crean con crear_tablas(),
+        # que se llama al iniciar la API (ver main.py)
         self.engine = engine
-        self._crear_tablas()
     
-    def _crear_tablas(self):
+    def crear_tablas(self):
         """Crea las tablas, si no existen en Supabase"""
-       
+        # La base SQLite de pruebas locales ya trae sus tablas
+        # (ver benchmarks/prueba_carga.py) y no entiende el bloque DO $$
+        if self.engine.dialect.name == "sqlite":
+            return
+
         with self.engine.begin() as conn:
             conn.execute(text("""
                 CREATE TABLE IF NOT EXISTS usuarios.usuarios (
@@ -37,10 +43,39 @@ class DataBaseUsuario(AbstractDatabase):
                 CREATE TABLE IF NOT EXISTS usuarios.sesiones (
                     token TEXT PRIMARY KEY,
                     usuario_id INTEGER REFERENCES usuarios(id),
-                    fecha_inicio TEXT,
-                    fecha_expiracion TEXT
+                    fecha_inicio TIMESTAMPTZ,
+                    fecha_expiracion TIMESTAMPTZ
                 )
             """))
+            # Las tablas creadas antes guardaban las fechas como TEXT
+            conn.execute(text("""
+                DO $$
+                BEGIN
+                    IF EXISTS (
+                        SELECT FROM information_schema.columns
+                        WHERE table_schema = 'usuarios'
+                        AND table_name = 'sesiones'
+                        AND column_name = 'fecha_expiracion'
+                        AND data_type = 'text'
+                    ) THEN
+                        ALTER TABLE usuarios.sesiones
+                            ALTER COLUMN fecha_inicio TYPE TIMESTAMPTZ
+                                USING fecha_inicio::timestamptz,
+                            ALTER COLUMN fecha_expiracion TYPE TIMESTAMPTZ
+                                USING fecha_expiracion::timestamptz;
+                    END IF;
+                END
+                $$;
+            """))
+            # Índices para la purga de vencidas y el cierre de sesión
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS sesiones_fecha_expiracion_idx
+                ON usuarios.sesiones (fecha_expiracion)
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS sesiones_usuario_id_idx
+                ON usuarios.sesiones (usuario_id)
+            """))
 
 
     # -------------------------------
@@ -118,19 +153,41 @@ class DataBaseUsuario(AbstractDatabase):
             conn.execute(text("DELETE FROM usuarios.usuarios WHERE id = :id"), {"id": id})
         return True
     
-    def consultar(self, campo: Optional[str] = None, valor: Optional[str] = None) -> List[User]:
-        """Devuelve los usuarios, opcionalmente filtrados."""
+    def consultar(self, campo: Optional[str] = None, valor: Optional[str] = None,
+                  cursor: Optional[int] = None, limite: Optional[int] = LIMITE_POR_DEFECTO,
+                  campos: Optional[List[str]] = None) -> List[User]:
+        """
+        Devuelve los usuarios, opcionalmente filtrados, de a `limite`
+        (todos si es None) ordenados por id. Para la página siguiente se pasa como
+        `cursor` el id del último usuario recibido.
+        Con `campos` solo se leen esas columnas (el id siempre).
+        """
+        columnas_validas = ("id", "username", "full_name", "tipo", "email", "telefono")
+        if campos:
+            invalidos = [c for c in campos if c not in columnas_validas]
+            if invalidos:
+                raise ValueError(f"Campos no válidos: {invalidos}")
+        columnas = list(campos or columnas_validas)
+
+        where, parametros = None, {}
+        if campo and valor:
+            if campo not in columnas_validas:
+                raise ValueError(f"Campo no válido: {campo}")
+            where, parametros = f"{campo} = :valor", {"valor": valor}
+        consulta, parametros = consulta_paginada(
+            "usuarios.usuarios", columnas, cursor=cursor, limite=limite,
+            where=where, parametros=parametros
+        )
+        with self.engine.connect() as conn:
+            filas = conn.execute(text(consulta), parametros).mappings().all()
+
         usuarios_encontrados = []
-        with self.engine.begin() as conn:
-            if campo and valor:
-                if campo not in {"id", "username", "full_name", "tipo", "email", "telefono"}:
-                    raise ValueError(f"Campo no válido: {campo}")
-                consulta = text(f"SELECT id, username, full_name, tipo, email, telefono FROM usuarios.usuarios WHERE {campo} = :valor")
-                filas = conn.execute(consulta, {"valor": valor}).mappings().all()
-            else:
-                filas = conn.execute(text("SELECT id, username, full_name, tipo, email, telefono FROM usuarios.usuarios")).mappings().all()
-        for fila in filas:
-            usuarios_encontrados.append(User(email=fila["email"], nombre=fila["full_name"], tipo=fila["tipo"]))
+        for fila in filas[:limite]:
+            usuario = User(email=fila.get("email"), nombre=fila.get("full_name"),
+                           tipo=fila.get("tipo") or "normal")
+            usuario.id = fila["id"]
+            usuario.telefono = fila.get("telefono")
+            usuarios_encontrados.append(usuario)
         return usuarios_encontrados
     
 
@@ -156,21 +213,27 @@ class DataBaseUsuario(AbstractDatabase):
 
     def actualizar_completo(self, usuario: User) -> bool:
         """
-        Actualiza todos los campos de un usuario (solo los no None).
+        Actualiza todos los campos de un usuario (solo los no None)
+        con un único UPDATE.
         :param usuario: instancia de User con id y valores nuevos
         """
-        campos_actualizados = 0
-
-        if usuario.nombre and self.actualizar_campo(usuario.id, "username", usuario.nombre):
-            campos_actualizados += 1
-        if usuario.email and self.actualizar_campo(usuario.id, "email", usuario.email):
-            campos_actualizados += 1
-        if usuario.tipo and self.actualizar_campo(usuario.id, "tipo", usuario.tipo):
-            campos_actualizados += 1
-        if usuario.telefono and self.actualizar_campo(usuario.id, "telefono", usuario.telefono):
-            campos_actualizados += 1
+        valores = {
+            "username": usuario.nombre,
+            "email": usuario.email,
+            "tipo": usuario.tipo,
+            "telefono": getattr(usuario, "telefono", None),
+        }
+        valores = {campo: valor for campo, valor in valores.items() if valor}
+        if not valores:
+            return False
 
-        return campos_actualizados > 0
+        asignaciones = ", ".join(f"{campo} = :{campo}" for campo in valores)
+        with self.engine.begin() as conn:
+            res = conn.execute(
+                text(f"UPDATE usuarios.usuarios SET {asignaciones} WHERE id = :id"),
+                {**valores, "id": getattr(usuario, "id", None)}
+            )
+            return res.rowcount > 0
 
 
     # -------------------------------
@@ -189,8 +252,8 @@ class DataBaseUsuario(AbstractDatabase):
                     {
                         "token": sesion.token,
                         "usuario_id": sesion.usuario_id,
-                        "fecha_inicio": str(sesion.fecha_inicio),
-                        "fecha_expiracion": str(sesion.fecha_expiracion)
+                        "fecha_inicio": sesion.fecha_inicio,
+                        "fecha_expiracion": sesion.fecha_expiracion
                     }
                 )
             return True
@@ -232,9 +295,46 @@ class DataBaseUsuario(AbstractDatabase):
         usuario_id = self.obtener_id_usuario(nombre_usuario)
         if not usuario_id:
             return False
+        return len(self.eliminar_sesiones_de_usuario(usuario_id)) > 0
+
+    def eliminar_sesiones_de_usuario(self, usuario_id: int) -> List[str]:
+        """
+        Elimina todas las sesiones de un usuario.
+        :return: tokens de las sesiones eliminadas
+        """
         with self.engine.begin() as conn:
             res = conn.execute(
-                text("DELETE FROM usuarios.sesiones WHERE usuario_id = :usuario_id"),
+                text("""
+                    DELETE FROM usuarios.sesiones
+                    WHERE usuario_id = :usuario_id
+                    RETURNING token
+                """),
                 {"usuario_id": usuario_id}
             )
-            return res.rowcount > 0
\ No newline at end of file
+            return [fila[0] for fila in res]
+
+    def eliminar_sesiones_expiradas(self) -> int:
+        """
+        Elimina las sesiones cuya fecha de expiración ya pasó.
+        Usa el índice sobre fecha_expiracion.
+        :return: cantidad de sesiones eliminadas
+        """
+        with self.engine.begin() as conn:
+            res = conn.execute(
+                text("DELETE FROM usuarios.sesiones WHERE fecha_expiracion < NOW()")
+            )
+            return res.rowcount
+
+
+_db_usuarios: Optional[DataBaseUsuario] = None
+
+
+def obtener_db_usuarios() -> DataBaseUsuario:
+    """
+    Devuelve la instancia compartida de DataBaseUsuario,
+    creándola al primer uso.
+    """
+    global _db_usuarios
+    if _db_usuarios is None:
+        _db_usuarios = DataBaseUsuario()
+    return _db_usuarios
@@ -5,7 +5,7 @@ financieros de renta fija.
 """
 
 from abc import ABC, abstractmethod
-from models.instruments import FixedIncomeInstrument, Bono, PlazoFijo
+from models.instruments import FixedIncomeInstrument, Bono, Letra, PlazoFijo
 from typing import Optional
 
 
@@ -52,9 +52,8 @@ class FixedIncomeInstrumentFactory(FinancialInstrumentFactory):
         tipo = tipo.lower()
         if tipo == "bono":
             return Bono(nombre=nombre, moneda=moneda, **kwargs)
-        # A futuro
-        # elif tipo == "letra": 
-        #     return Letra(nombre=nombre, moneda=moneda, **kwargs) 
+        elif tipo == "letra":
+            return Letra(nombre=nombre, moneda=moneda, **kwargs)
         elif tipo == "plazo_fijo":
             return PlazoFijo(nombre=nombre, moneda=moneda, **kwargs)
         else:
@@ -5,18 +5,37 @@ Configura los routers para:
 - autenticación
 - plazos fijos
 - bonos
+- letras
 - dólar
+- simulaciones de escenarios
+
+y publica métricas de uso en formato Prometheus en /metrics.
 
 La API expone servicios para cotizaciones financieras.
 """
 
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import PlainTextResponse, FileResponse
+from auth.sesiones import almacen_sesiones, purgar_sesiones_periodicamente
+from db.usuarios.users_db import obtener_db_usuarios
 from auth.auth_api import router as auth_router
 from routers.crear_plazo_fijo import router as plazo_fijo_router
 from routers.crear_bono import router as bonos_router
+from routers.letras import router as letras_router
 from routers.dolar import router as dolar_router
+from routers.simulaciones import router as simulaciones_router
+from utils.conexion_db import engine
+from utils.metricas import MiddlewareMetricas, instrumentar_engine, registro_metricas
+from utils import trazador_sql
+from utils.perfilador import MiddlewarePerfilador, ruta_perfil
+from utils.datos_mercado import MiddlewareDatosMercado
+from utils.procesos_escenarios import cerrar_pool_escenarios, iniciar_pool_escenarios
+from auth.auth_service import obtener_usuario_actual
+from models.user import UsuarioPublico
 
 """
 API CotizAR
@@ -28,15 +47,96 @@ Para iniciar el servidor localmente:
 http://127.0.0.1:8000/docs
 """
 
-cotizar = FastAPI(title="CotizAR API")
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    """
+    Tareas de arranque y cierre de la API.
+    - Crea las tablas de usuarios si no existen. Si la base no está
+      disponible la API arranca igual y lo informa por consola.
+    - Lanza la purga periódica de sesiones vencidas.
+    - Crea el pool de procesos de /simulaciones/escenarios (si
+      PROCESOS_ESCENARIOS > 1) y lo cierra al apagar.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, obtener_db_usuarios().crear_tablas)
+    except Exception as e:
+        print(f"[ERROR INICIO] No se pudieron crear las tablas de usuarios: {e}")
+
+    tarea_purga = asyncio.create_task(
+        purgar_sesiones_periodicamente(almacen_sesiones)
+    )
+    iniciar_pool_escenarios()
+    yield
+    tarea_purga.cancel()
+    cerrar_pool_escenarios()
+
+
+cotizar = FastAPI(title="CotizAR API", lifespan=ciclo_de_vida)
+
+# Métricas por ruta y de la base de datos (ver /metrics)
+instrumentar_engine(engine)
+trazador_sql.instrumentar_engine(engine)
+cotizar.add_middleware(trazador_sql.MiddlewareTrazaSQL)
+cotizar.add_middleware(MiddlewareMetricas)
+# Perfilado de requests a pedido (solo admin, ver utils/perfilador.py)
+cotizar.add_middleware(MiddlewarePerfilador)
+# Headers X-Datos-Stale / X-Edad-Datos con la base caída (ver utils/datos_mercado.py)
+cotizar.add_middleware(MiddlewareDatosMercado)
 
 # Routers
 cotizar.include_router(auth_router)
 cotizar.include_router(plazo_fijo_router)
 cotizar.include_router(bonos_router)
+cotizar.include_router(letras_router)
 cotizar.include_router(dolar_router)
+cotizar.include_router(simulaciones_router)
 
 
 @cotizar.get("/")
 async def inicio():
     return {"mensaje": "API CotizAR funcionando correctamente"}
+
+
+@cotizar.get("/metrics", include_in_schema=False)
+async def metricas():
+    """Métricas de la API en formato Prometheus."""
+    return PlainTextResponse(
+        registro_metricas.exportar_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@cotizar.get("/metrics/consultas", include_in_schema=False)
+async def consultas_sql(
+    usuario_actual: UsuarioPublico = Depends(obtener_usuario_actual)
+):
+    """
+    Muestras de consultas lentas (parámetros redactados) y de
+    consultas repetidas dentro de un mismo request (posibles N+1).
+    Solo administradores: muestran tablas, columnas y consultas.
+    """
+    if usuario_actual.tipo != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="Solo los administradores pueden ver las consultas."
+        )
+    return trazador_sql.trazador_sql.muestras()
+
+
+@cotizar.get("/metrics/perfiles/{nombre}", include_in_schema=False)
+async def descargar_perfil(
+    nombre: str,
+    usuario_actual: UsuarioPublico = Depends(obtener_usuario_actual)
+):
+    """Descarga un perfil guardado por el perfilador (solo administradores)."""
+    if usuario_actual.tipo != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="Solo los administradores pueden descargar perfiles."
+        )
+    ruta = ruta_perfil(nombre)
+    if ruta is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado.")
+    return FileResponse(ruta, filename=nombre)
@@ -0,0 +1,140 @@
+"""
+Flujos de fondos (cupones y amortizaciones) de los bonos.
+
+Para los Bonares (AL) y Globales (GD, AE) de la reestructuración 2020
+se usan las condiciones de emisión: cupones semestrales el 9 de enero
+y el 9 de julio, con tasas escalonadas sobre el saldo, y amortizaciones
+en cuotas semestrales iguales. Las especies D y C (MEP y cable) son el
+mismo bono. Los montos son por cada 100 de valor nominal original,
+que es como cotizan.
+
+El resto de los bonos se modela como bullet: un único pago del valor
+nominal al vencimiento.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from models.instruments import valor_nominal_por_precio
+
+
+@dataclass(frozen=True)
+class CondicionesEmision:
+    """
+    Condiciones de un bono amortizable.
+
+    Atributos:
+        tasas: [(fecha_hasta, tasa anual %)]: la tasa del cupón que se
+            paga en una fecha es la del primer tramo que la incluye.
+        primera_amortizacion, ultima_amortizacion: rango de fechas de
+            las cuotas semestrales iguales.
+        amortizaciones_extra: {fecha: % del VN} fuera de ese rango.
+    """
+    tasas: tuple[tuple[date, float], ...]
+    primera_amortizacion: date
+    ultima_amortizacion: date
+    amortizaciones_extra: tuple[tuple[date, float], ...] = ()
+    primer_cupon: date = date(2021, 7, 9)
+
+
+def _d(anio: int, mes: int) -> date:
+    return date(anio, mes, 9)
+
+
+CONDICIONES = {
+    "29": CondicionesEmision(
+        tasas=((_d(2029, 7), 1.0),),
+        primera_amortizacion=_d(2025, 1), ultima_amortizacion=_d(2029, 7),
+    ),
+    "30": CondicionesEmision(
+        tasas=((_d(2021, 7), 0.125), (_d(2023, 7), 0.5), (_d(2027, 7), 0.75),
+               (_d(2030, 7), 1.75)),
+        primera_amortizacion=_d(2025, 1), ultima_amortizacion=_d(2030, 7),
+        amortizaciones_extra=((_d(2024, 7), 4.0),),
+    ),
+    "35": CondicionesEmision(
+        tasas=((_d(2021, 7), 0.125), (_d(2022, 7), 1.125), (_d(2023, 7), 1.5),
+               (_d(2024, 7), 3.625), (_d(2027, 7), 4.125), (_d(2028, 7), 4.75),
+               (_d(2035, 7), 5.0)),
+        primera_amortizacion=_d(2031, 1), ultima_amortizacion=_d(2035, 7),
+    ),
+    "38": CondicionesEmision(
+        tasas=((_d(2021, 7), 0.125), (_d(2022, 7), 2.0), (_d(2023, 7), 3.875),
+               (_d(2024, 7), 4.25), (_d(2038, 1), 5.0)),
+        primera_amortizacion=_d(2027, 7), ultima_amortizacion=_d(2038, 1),
+    ),
+    "41": CondicionesEmision(
+        tasas=((_d(2021, 7), 0.125), (_d(2022, 7), 2.5), (_d(2029, 7), 3.5),
+               (_d(2041, 7), 4.875)),
+        primera_amortizacion=_d(2028, 1), ultima_amortizacion=_d(2041, 7),
+    ),
+    "46": CondicionesEmision(
+        tasas=((_d(2021, 7), 0.125), (_d(2022, 7), 1.125), (_d(2023, 7), 1.5),
+               (_d(2024, 7), 3.625), (_d(2027, 7), 4.125), (_d(2028, 7), 4.375),
+               (_d(2046, 7), 5.0)),
+        primera_amortizacion=_d(2025, 1), ultima_amortizacion=_d(2046, 7),
+    ),
+}
+
+PREFIJOS_REESTRUCTURADOS = ("AL", "GD", "AE")
+
+
+def condiciones_de(nombre: str) -> CondicionesEmision | None:
+    """
+    Condiciones de emisión de un bono por su ticker (AL30, GD30D,
+    AE38, ...). None si no es uno de los bonos conocidos.
+    """
+    nombre = (nombre or "").upper()
+    if len(nombre) < 4 or nombre[:2] not in PREFIJOS_REESTRUCTURADOS:
+        return None
+    if len(nombre) > 5 or (len(nombre) == 5 and nombre[4] not in "DC"):
+        return None
+    return CONDICIONES.get(nombre[2:4])
+
+
+def _fechas_semestrales(desde: date, hasta: date) -> list[date]:
+    """Fechas de pago (9 de enero y 9 de julio) entre desde y hasta inclusive."""
+    fechas = []
+    anio, mes = desde.year, desde.month
+    while True:
+        fecha = date(anio, mes, 9)
+        if fecha > hasta:
+            return fechas
+        if fecha >= desde:
+            fechas.append(fecha)
+        anio, mes = (anio, 7) if mes == 1 else (anio + 1, 1)
+
+
+def flujos_condiciones(condiciones: CondicionesEmision) -> list[tuple[date, float]]:
+    """Todos los pagos (cupón + amortización) desde la emisión, por 100 de VN."""
+    cuotas = _fechas_semestrales(condiciones.primera_amortizacion,
+                                 condiciones.ultima_amortizacion)
+    amortizaciones = dict(condiciones.amortizaciones_extra)
+    restante = 100.0 - sum(amortizaciones.values())
+    for fecha in cuotas:
+        amortizaciones[fecha] = amortizaciones.get(fecha, 0.0) + restante / len(cuotas)
+
+    flujos = []
+    saldo = 100.0
+    for fecha in _fechas_semestrales(condiciones.primer_cupon, condiciones.ultima_amortizacion):
+        tasa = next(t for hasta, t in condiciones.tasas if fecha <= hasta)
+        amortizacion = amortizaciones.get(fecha, 0.0)
+        flujos.append((fecha, saldo * tasa / 100 / 2 + amortizacion))
+        saldo -= amortizacion
+    return flujos
+
+
+def flujos_de_fondos(nombre: str, fecha_vencimiento: date | None,
+                     precio: float | None, desde: date) -> tuple[list[tuple[date, float]], str]:
+    """
+    Pagos futuros (posteriores a `desde`) de un bono.
+
+    Returns:
+        (flujos, metodo): flujos [(fecha, monto)] y "condiciones" si
+        se usaron las condiciones de emisión o "bullet" si no.
+    """
+    condiciones = condiciones_de(nombre)
+    if condiciones is not None:
+        return [(f, m) for f, m in flujos_condiciones(condiciones) if f > desde], "condiciones"
+    if fecha_vencimiento is None or fecha_vencimiento <= desde:
+        return [], "bullet"
+    return [(fecha_vencimiento, valor_nominal_por_precio(precio))], "bullet"
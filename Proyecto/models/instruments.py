@@ -41,8 +41,14 @@ class FixedIncomeInstrument(ABC):
         nombre (str): Nombre del instrumento.
         moneda (str): Moneda del instrumento.
         valor_dolar (float | None): Último valor conocido del dólar.
+
+    Las clases de instrumentos declaran sus atributos en __slots__ (sin
+    __dict__ por instancia), porque se llegan a tener en memoria todas
+    las posiciones de los usuarios a la vez (ver alertas).
     """
 
+    __slots__ = ("nombre", "moneda", "valor_dolar")
+
     def __init__(self, nombre: str, moneda: str):
         self.nombre = nombre
         self.moneda = moneda
@@ -95,7 +101,11 @@ class FixedIncomeInstrument(ABC):
 class PlazoFijo(FixedIncomeInstrument):
     """Instrumento Plazo Fijo."""
 
-    def __init__(self, banco: str, tasa_tna: float, dias: int = 30):
+    __slots__ = ("dias", "tasa_tna", "monto_inicial", "dolar_equilibrio")
+
+    def __init__(self, banco: str, tasa_tna: float, dias: int = 30,
+                 monto_inicial: float | None = None,
+                 dolar_equilibrio: float | None = None):
         """
         Inicializa un Plazo Fijo.
 
@@ -104,10 +114,16 @@ class PlazoFijo(FixedIncomeInstrument):
             moneda (str): Moneda ('ARS' normalmente).
             dias (int): Plazo en días.
             tasa_tna (float): Tasa nominal anual en porcentaje.
+            monto_inicial (float | None): Monto invertido, si es una
+              posición de un usuario.
+            dolar_equilibrio (float | None): Dólar de equilibrio
+              guardado al crear la posición.
         """
         super().__init__(nombre=banco, moneda="ARS")
         self.dias = dias
         self.tasa_tna = tasa_tna
+        self.monto_inicial = monto_inicial
+        self.dolar_equilibrio = dolar_equilibrio
 
     def calcular_rendimiento(
             self, monto_inicial: float, tipo_cambio_actual: float = None
@@ -205,16 +221,15 @@ class PlazoFijo(FixedIncomeInstrument):
         
         # Al usar el decorador classmethod, 
         # cls representa la misma clase "PlazoFijo" 
+        # Convertir todo lo que venga como Decimal → float
         instancia = cls(
             banco=row["banco"],
             tasa_tna=float(row["tasa_pct"]),   # 👈 A float sí o sí
-            dias=30
-        )
-
-        # Convertir todo lo que venga como Decimal → float
-        instancia.monto_inicial = float(row["monto_inicial"])
-        instancia.dolar_equilibrio = (
-            float(row["dolar_equilibrio"]) if row.get("dolar_equilibrio") else None
+            dias=30,
+            monto_inicial=float(row["monto_inicial"]),
+            dolar_equilibrio=(
+                float(row["dolar_equilibrio"]) if row.get("dolar_equilibrio") else None
+            ),
         )
         instancia.valor_dolar = (
             float(row["dolar_actual"]) if row.get("dolar_actual") else None
@@ -228,6 +243,8 @@ class PlazoFijo(FixedIncomeInstrument):
 class Bono(FixedIncomeInstrument):
     """Instrumento Bono."""
 
+    __slots__ = ("ultimo", "dia_pct", "mes_pct", "anio_pct")
+
     def __init__(self, nombre: str, moneda: str, ultimo=None, dia_pct=None,
                  mes_pct=None, anio_pct=None):
         """
@@ -363,3 +380,174 @@ class Bono(FixedIncomeInstrument):
             "dias_considerados": dias,
             "mes_banda_usado": mes_salida,
         }
+
+
+# -------------------- Letra --------------------
+
+def valor_nominal_por_precio(precio: float | None) -> float:
+    """
+    Valor nominal al que está expresado el precio de una letra: las
+    LEDE/LELITE cotizan cada 1000 de VN y las LECAP/letras en USD
+    cada 100.
+    """
+    return 1000.0 if precio and precio > 500 else 100.0
+
+
+class Letra(Bono):
+    """
+    Instrumento Letra del Tesoro (LECAP, LEDE, letras en USD).
+
+    Se compra con descuento y paga el valor nominal al vencimiento,
+    así que el rendimiento sale del precio: factor = VN / precio.
+    Si la letra capitaliza (precio >= VN, el pago final no se conoce)
+    o no tiene precio, se estima con los rendimientos informados,
+    igual que un Bono.
+    """
+
+    __slots__ = ("fecha_vencimiento", "valor_nominal")
+
+    def __init__(self, nombre: str, moneda: str, ultimo=None,
+                 fecha_vencimiento: date | str | None = None,
+                 valor_nominal: float | None = None,
+                 dia_pct=None, mes_pct=None, anio_pct=None):
+        """
+        Inicializa una Letra.
+
+        Args:
+            nombre (str): Nombre de la letra.
+            moneda (str): Moneda ('ARS' o 'USD').
+            ultimo (float | str | None): Último precio.
+            fecha_vencimiento (date | str | None): Vencimiento
+              (date o 'YYYY-MM-DD').
+            valor_nominal (float | None): VN al que está expresado
+              el precio. Si no se indica, se deduce del precio.
+            dia_pct, mes_pct, anio_pct (float | str | None):
+            Rendimientos informados (para estimar si no hay precio).
+        """
+        super().__init__(nombre, moneda, ultimo, dia_pct, mes_pct, anio_pct)
+        if isinstance(fecha_vencimiento, str):
+            try:
+                fecha_vencimiento = date.fromisoformat(fecha_vencimiento)
+            except ValueError:
+                fecha_vencimiento = None
+        self.fecha_vencimiento = fecha_vencimiento
+        self.valor_nominal = valor_nominal or valor_nominal_por_precio(self.ultimo)
+
+    def dias_al_vencimiento(self, hoy: date | None = None) -> int | None:
+        """Días hasta el vencimiento (None si no hay fecha)."""
+        if not self.fecha_vencimiento:
+            return None
+        return (self.fecha_vencimiento - (hoy or date.today())).days
+
+    def tasas(self, hoy: date | None = None) -> dict | None:
+        """
+        Tasas de la letra manteniéndola hasta el vencimiento.
+
+        Returns:
+            dict | None: {'dias_al_vencimiento', 'metodo', 'factor',
+            'tna_pct', 'tea_pct', 'tem_pct', 'tasa_descuento_pct'}
+            o None si la letra ya venció o no tiene vencimiento.
+        """
+        dias = self.dias_al_vencimiento(hoy)
+        if not dias or dias <= 0:
+            return None
+
+        if self.ultimo and 0 < self.ultimo < self.valor_nominal:
+            metodo = "descuento"
+            factor = self.valor_nominal / self.ultimo
+            tasa_descuento = (1 - self.ultimo / self.valor_nominal) * 365 / dias
+        else:
+            metodo = "estimado"
+            factor = (1.0 + self._estimacion_rend_anual()) ** (dias / 365.0)
+            tasa_descuento = None
+
+        return {
+            "dias_al_vencimiento": dias,
+            "metodo": metodo,
+            "factor": factor,
+            "tna_pct": round((factor - 1) * 365 / dias * 100, 2),
+            "tea_pct": round((factor ** (365 / dias) - 1) * 100, 2),
+            "tem_pct": round((factor ** (30 / dias) - 1) * 100, 2),
+            "tasa_descuento_pct": round(tasa_descuento * 100, 2) if tasa_descuento is not None else None,
+        }
+
+    def calcular_rendimiento(self, monto_inicial: float,
+                             tipo_cambio_actual: float = None,
+                             hoy: date | None = None):
+        """
+        Calcula el rendimiento de la letra hasta el vencimiento.
+
+        Args:
+            monto_inicial (float): Monto invertido, en la moneda de la letra.
+            tipo_cambio_actual (float, opcional): Para 'usd_invertidos'
+              de las letras en ARS.
+            hoy (date, opcional): Fecha de compra (hoy por defecto).
+
+        Returns:
+            dict | None: tasas de tasas() (sin el factor) más
+            'monto_final' y 'ganancia', y 'usd_invertidos' si aplica.
+            None si la letra ya venció.
+        """
+        tasas = self.tasas(hoy)
+        if tasas is None:
+            return None
+
+        factor = tasas.pop("factor")
+        monto_final = monto_inicial * factor
+        resultado = {
+            **tasas,
+            "monto_final": round(monto_final, 2),
+            "ganancia": round(monto_final - monto_inicial, 2),
+        }
+        if self.moneda == "ARS":
+            tc = tipo_cambio_actual or getattr(self, "valor_dolar", None)
+            if tc:
+                resultado["usd_invertidos"] = round(monto_inicial / float(tc), 2)
+        return resultado
+
+    def rendimiento_vs_banda(
+            self, monto_inicial: float, mes: str | None = None,
+            dias: int = None, fecha_inicio: date | None = None
+            ):
+        """
+        Calcula métricas de la letra vs banda cambiaria, manteniéndola
+        hasta el vencimiento (se usa la banda del mes de vencimiento).
+
+        Args:
+            monto_inicial (float): Monto invertido, en la moneda de la letra.
+            mes, dias: ignorados, el plazo es el del vencimiento.
+            fecha_inicio (date | None, opcional): Fecha de compra
+              (hoy por defecto).
+
+        Returns:
+            dict | None: Métricas vs banda o None si no se puede calcular.
+        """
+        tasas = self.tasas(fecha_inicio)
+        if tasas is None:
+            return None
+        factor = tasas["factor"]
+
+        dolar_oficial = (
+            getattr(self, "valor_dolar", None) or obtener_dolar_oficial()
+        )
+        if self.moneda == "USD" and dolar_oficial:
+            monto_inicial_ars = monto_inicial * float(dolar_oficial)
+        else:
+            monto_inicial_ars = monto_inicial
+        monto_final_pesos = monto_inicial_ars * factor
+
+        mes_salida = f"{self.fecha_vencimiento.year:04d}-{self.fecha_vencimiento.month:02d}"
+        piso, techo = obtener_banda_cambiaria(mes_salida)
+        if not techo or techo <= 0:
+            piso, techo = obtener_banda_cambiaria(None)
+            if not techo or techo <= 0:
+                return None
+
+        return {
+            "monto_final_pesos": round(monto_final_pesos, 2),
+            "factor_ars": round(factor, 6),
+            "monto_final_usd_techo": round(monto_final_pesos / techo, 2),
+            "dolar_equilibrio": round(factor * techo, 2),
+            "dias_considerados": tasas["dias_al_vencimiento"],
+            "mes_banda_usado": mes_salida,
+        }
@@ -0,0 +1,57 @@
+"""
+Modelos Pydantic de las respuestas de los endpoints de analítica.
+
+Además de documentar la respuesta en /docs, permiten serializar con
+un TypeAdapter armado una sola vez (pydantic-core), que es bastante
+más rápido que el recorrido genérico de jsonable_encoder cuando la
+respuesta tiene miles de instrumentos.
+"""
+
+from typing import Optional
+from pydantic import BaseModel, TypeAdapter
+
+
+class RendimientoBono(BaseModel):
+    """Resultado de Bono.calcular_rendimiento."""
+    r_mensual_pct: float
+    r_anual_pct: float
+    usd_invertidos: Optional[float] = None  # solo bonos en ARS
+
+
+class BonoVsBanda(BaseModel):
+    """
+    Resultado de Bono.rendimiento_vs_banda. Sin banda disponible
+    todos los campos quedan en None (se serializa como {}).
+    """
+    monto_final_pesos: Optional[float] = None
+    factor_ars: Optional[float] = None
+    monto_final_usd_techo: Optional[float] = None
+    dolar_equilibrio: Optional[float] = None
+    dias_considerados: Optional[int] = None
+    mes_banda_usado: Optional[str] = None
+
+
+class ResultadoBono(BaseModel):
+    """Un elemento de la respuesta de /bonos/calcular."""
+    bono: str
+    moneda: str
+    monto_inicial: float
+    moneda_inversion: str
+    monto_convertido: float
+    rendimiento: RendimientoBono
+    vs_banda: BonoVsBanda
+    # Solo si se calculó con datos de mercado desactualizados
+    stale: Optional[bool] = None
+    edad_datos_segundos: Optional[int] = None
+
+
+ADAPTADOR_RESULTADOS_BONOS = TypeAdapter(list[ResultadoBono])
+
+
+def serializar_resultados_bonos(resultados: list[dict]) -> bytes:
+    """
+    Valida y serializa a JSON la lista de resultados de bonos.
+    Los campos en None se omiten, igual que en los dicts originales.
+    """
+    modelos = ADAPTADOR_RESULTADOS_BONOS.validate_python(resultados)
+    return ADAPTADOR_RESULTADOS_BONOS.dump_json(modelos, exclude_none=True)
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 from pydantic import BaseModel, Field, EmailStr
 
@@ -64,8 +64,31 @@ class Session:
         """
         self.token = token
         self.usuario_id = usuario_id
-        self.fecha_inicio = fecha_inicio
-        self.fecha_expiracion = fecha_expiracion
+        self.fecha_inicio = _a_datetime_utc(fecha_inicio)
+        self.fecha_expiracion = _a_datetime_utc(fecha_expiracion)
+
+    def expirada(self, ahora: Optional[datetime] = None) -> bool:
+        """
+        Indica si la sesión ya venció.
+
+        :param ahora: instante de referencia (por defecto, ahora en UTC)
+        :return: True si la fecha de expiración ya pasó
+        """
+        ahora = ahora or datetime.now(timezone.utc)
+        return self.fecha_expiracion <= ahora
+
+
+def _a_datetime_utc(valor) -> datetime:
+    """
+    Convierte una fecha (datetime o texto ISO, como las que se
+    guardaban antes en la tabla de sesiones, o un TIMESTAMPTZ en otra
+    zona) a datetime en UTC. Las fechas sin zona se asumen en UTC.
+    """
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    if valor.tzinfo is None:
+        valor = valor.replace(tzinfo=timezone.utc)
+    return valor.astimezone(timezone.utc)
 
 
 # -------------------------------
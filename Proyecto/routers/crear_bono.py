@@ -5,29 +5,240 @@ Calcula el rendimiento en función del monto invertido y la
 moneda seleccionada, y guarda los resultados en la base de datos.
 """
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Depends, Response, HTTPException
 from datetime import date
 from typing import List, Dict
 from sqlalchemy import text
-from models.instruments import Bono
-from utils.obtener_bonos import obtener_bonos_desde_bd, obtener_tipo_cambio
+from sqlalchemy.exc import SQLAlchemyError
+from models.instruments import Bono, _mes_banda_de_salida
+from models.respuestas import ResultadoBono, serializar_resultados_bonos
+from utils.obtener_bonos import fuente_bonos, fuente_tipo_cambio
 from utils.obtener_banda_cambiaria import obtener_banda_cambiaria
 from utils.conexion_db import engine  
+from utils.cache_lru import CacheLRU
+from utils.datos_mercado import datos_desactualizados, marcar_respuesta
+from utils.version_mercado import obtener_versiones
+from utils.analitica_instrumentos import obtener_analitica
+from utils.exportacion import consulta_historial, respuesta_exportacion
+from auth.auth_service import obtener_usuario_actual
+from models.user import UsuarioPublico
 
 router = APIRouter(prefix="/bonos", tags=["Bonos"])
 
+# Resultados de /bonos/calcular por (monto, moneda, día, versiones de
+# mercado). El TTL cubre el caso de que la tabla de versiones no exista.
+FUENTES_CALCULO_BONOS = ("dolar", "bonos", "bandas_cambiarias")
+cache_calculo_bonos = CacheLRU(512, ttl=10 * 60, nombre="calculo_bonos")
+DIAS_VS_BANDA = 30
 
-@router.get("/calcular", summary="Calcular rendimiento de bonos")
-async def calcular_bonos(
+INSERT_BONO_USUARIO = text("""
+    INSERT INTO instrumentos_usuarios.bonos_usuarios (
+        usuario_username, bono, moneda_bono, monto_inicial, moneda_inversion,
+        monto_convertido, r_mensual_pct, r_anual_pct,
+        monto_final_pesos, factor_ars, vs_banda_techo_usd,
+        dolar_actual, dolar_equilibrio,
+        dias_considerados, mes_banda_usado
+    ) VALUES (
+        :usuario_username, :bono, :moneda_bono, :monto_inicial, :moneda_inversion,
+        :monto_convertido, :r_mensual_pct, :r_anual_pct,
+        :monto_final_pesos, :factor_ars, :vs_banda_techo_usd,
+        :dolar_actual, :dolar_equilibrio,
+        :dias_considerados, :mes_banda_usado
+    )
+""")
+
+
+@router.get("/calcular", summary="Calcular rendimiento de bonos",
+            response_model=list[ResultadoBono])
+def calcular_bonos(
     monto: float = Query(10000, description="Monto a invertir"),
     moneda_inversion: str = Query("ARS", description="Moneda de la inversión: 'ARS' o 'USD'"),
     usuario_username: str = Query(..., description="Usuario que realiza la inversión")
 ):
-    bonos_data: List[Dict] = obtener_bonos_desde_bd()
-    tipos_cambio = obtener_tipo_cambio()
+    # Sincrónico: las lecturas de mercado bloquean, así que corre en el
+    # pool de threads y los requests simultáneos comparten la consulta
+    # (utils/coalescencia.py) en lugar de hacer cola en el event loop.
+    # La analítica es la misma para todos los usuarios con el mismo
+    # monto y moneda mientras no cambien los datos de mercado; solo se
+    # guarda aparte el registro de cada usuario.
+    versiones = obtener_versiones()
+    clave = (
+        monto,
+        moneda_inversion.upper(),
+        date.today(),  # los bonos sin vencimiento cuentan días desde hoy
+        tuple(versiones.get(fuente, (0, None))[0] for fuente in FUENTES_CALCULO_BONOS),
+    )
+    # Se cachea la respuesta ya serializada: en un acierto no se vuelve
+    # a recorrer la lista de resultados
+    calculo = cache_calculo_bonos.obtener(clave)
+    if calculo is None:
+        resultados, filas_db = _calcular_analitica_bonos(monto, moneda_inversion)
+        # Con la base caída los bonos pueden venir del último listado
+        # conocido: cada bono lleva stale y la edad, y no se cachea
+        resultados = [marcar_respuesta(resultado) for resultado in resultados]
+        calculo = (serializar_resultados_bonos(resultados), filas_db)
+        if not datos_desactualizados():
+            cache_calculo_bonos.guardar(clave, calculo)
+    cuerpo, filas_db = calculo
+
+    # Insertar en DB: una sola transacción para todos los bonos. Si el
+    # cálculo salió de datos desactualizados la base está caída: se
+    # devuelve igual, sin el registro del usuario.
+    if filas_db:
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    INSERT_BONO_USUARIO,
+                    [{**fila, "usuario_username": usuario_username} for fila in filas_db]
+                )
+        except SQLAlchemyError as e:
+            if not datos_desactualizados():
+                raise
+            print(f"[ERROR crear_bono] No se guardó el cálculo de {usuario_username}: {e}")
+
+    return Response(content=cuerpo, media_type="application/json")
+
+
+@router.get("/tir", summary="TIR y duration de los bonos")
+def tir_bonos():
+    """
+    Devuelve la TIR (efectiva anual, a partir de los flujos de fondos y
+    el último precio) y la duration de cada bono. Los bonos vencidos o
+    sin una TIR razonable para su precio se informan con None.
+    """
+    # La curva de TIR (numpy) se importa recién acá para no cargarla al iniciar la API
+    from utils.tir_bonos import obtener_curva_tir, filas_curva_tir
+    try:
+        curva = obtener_curva_tir()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculando TIR de bonos: {e}")
+    return filas_curva_tir(curva)
+
+
+@router.get("/historial/exportar", summary="Exportar historial de cálculos de bonos")
+def exportar_historial_bonos(
+    formato: str = Query("csv", description="csv, parquet o arrow"),
+    todos: bool = Query(False, description="Solo admin: historial de todos los usuarios"),
+    usuario_actual: UsuarioPublico = Depends(obtener_usuario_actual)
+):
+    """Exporta en streaming los cálculos de bonos guardados del usuario."""
+    consulta, parametros = consulta_historial("bonos_usuarios", usuario_actual, todos)
+    return respuesta_exportacion(consulta, parametros, formato, "historial_bonos")
+
+
+def _calcular_analitica_bonos(monto: float, moneda_inversion: str) -> tuple[list, list]:
+    """
+    Calcula el rendimiento de todos los bonos para un monto y moneda.
+    Usa la analítica precalculada al cargar los bonos
+    (utils/analitica_instrumentos.py) y, si no está, calcula bono
+    por bono.
+
+    Returns:
+        tuple[list, list]: (resultados para la respuesta,
+        filas para bonos_usuarios sin el usuario).
+    """
+    tipos_cambio = fuente_tipo_cambio.obtener().valor
     dolar_oficial = tipos_cambio.get("DÓLAR OFICIAL", None)
+    moneda_inversion = moneda_inversion.upper()
+
+    analitica = obtener_analitica("bono", DIAS_VS_BANDA)
+    if analitica:
+        calculos = _escalar_analitica(analitica, monto, moneda_inversion, dolar_oficial)
+    else:
+        calculos = _calcular_por_bono(monto, moneda_inversion, dolar_oficial)
 
     resultados = []
+    filas_db = []
+
+    for nombre, moneda, monto_convertido, rendimiento, vs_banda in calculos:
+        # Fila a insertar en DB (el usuario se agrega al insertar)
+        filas_db.append({
+            "bono": nombre,
+            "moneda_bono": moneda,
+            "monto_inicial": monto,
+            "moneda_inversion": moneda_inversion,
+            "monto_convertido": round(monto_convertido, 6),
+            "r_mensual_pct": round(rendimiento.get("r_mensual_pct", 0), 2),
+            "r_anual_pct": round(rendimiento.get("r_anual_pct", 0), 2),
+            "monto_final_pesos": round(vs_banda.get("monto_final_pesos", 0), 2),
+            "factor_ars": round(vs_banda.get("factor_ars", 0), 6),
+            "vs_banda_techo_usd": round(vs_banda.get("monto_final_usd_techo", 0), 6),
+            "dolar_actual": round(dolar_oficial or 0, 2),
+            "dolar_equilibrio": round(vs_banda.get("dolar_equilibrio", 0), 2),
+            "dias_considerados": vs_banda.get("dias_considerados", DIAS_VS_BANDA),
+            "mes_banda_usado": vs_banda.get("mes_banda_usado", "")
+        })
+
+        resultados.append({
+            "bono": nombre,
+            "moneda": moneda,
+            "monto_inicial": monto,
+            "moneda_inversion": moneda_inversion,
+            "monto_convertido": round(monto_convertido, 2),
+            "rendimiento": rendimiento,
+            "vs_banda": vs_banda
+        })
+
+    return resultados, filas_db
+
+
+def _convertir_monto(monto: float, moneda_bono: str, moneda_inversion: str,
+                     dolar_oficial: float | None) -> float:
+    """Convierte el monto invertido a la moneda del bono."""
+    if moneda_bono == "ARS" and moneda_inversion == "USD" and dolar_oficial:
+        return monto * dolar_oficial
+    if moneda_bono == "USD" and moneda_inversion == "ARS" and dolar_oficial:
+        return monto / dolar_oficial
+    return monto
+
+
+def _escalar_analitica(analitica: list[dict], monto: float, moneda_inversion: str,
+                       dolar_oficial: float | None):
+    """
+    Arma los mismos dicts que Bono.calcular_rendimiento y
+    Bono.rendimiento_vs_banda a partir de la analítica guardada:
+    solo falta multiplicar por el monto.
+    """
+    hoy = date.today()
+    for fila in analitica:
+        monto_convertido = _convertir_monto(monto, fila["moneda"], moneda_inversion, dolar_oficial)
+
+        rendimiento = {
+            "r_mensual_pct": round(fila["tasa_mensual_pct"], 2),
+            "r_anual_pct": round(fila["tea_pct"], 2),
+        }
+        if fila["moneda"] == "ARS" and dolar_oficial:
+            rendimiento["usd_invertidos"] = round(monto_convertido / float(dolar_oficial), 2)
+
+        # Los bonos sin vencimiento cuentan los días desde hoy, no desde
+        # el día en que se calculó la analítica
+        mes, techo = fila["mes_banda_usado"], fila["techo_banda"]
+        if not fila["fecha_vencimiento"]:
+            mes = _mes_banda_de_salida(None, hoy, DIAS_VS_BANDA)
+            techo = obtener_banda_cambiaria(mes)[1] or obtener_banda_cambiaria(None)[1]
+
+        vs_banda = {}
+        if techo and techo > 0:
+            factor = fila["factor_ars"]
+            monto_ars = monto_convertido
+            if fila["moneda"] == "USD" and dolar_oficial:
+                monto_ars = monto_convertido * float(dolar_oficial)
+            monto_final_pesos = monto_ars * factor
+            vs_banda = {
+                "monto_final_pesos": round(monto_final_pesos, 2),
+                "factor_ars": round(factor, 6),
+                "monto_final_usd_techo": round(monto_final_pesos / techo, 2),
+                "dolar_equilibrio": round(factor * techo, 2),
+                "dias_considerados": DIAS_VS_BANDA,
+                "mes_banda_usado": mes,
+            }
+
+        yield fila["nombre"], fila["moneda"], monto_convertido, rendimiento, vs_banda
+
+
+def _calcular_por_bono(monto: float, moneda_inversion: str, dolar_oficial: float | None):
+    """Calcula cada bono con los métodos de Bono (sin analítica guardada)."""
+    bonos_data: List[Dict] = fuente_bonos.obtener().valor
 
     for data in bonos_data:
         bono = Bono(
@@ -48,14 +259,11 @@ async def calcular_bonos(
                 fecha_venc_dt = None
 
         # Convertir monto según moneda de inversión
-        monto_convertido = monto
-        if bono.moneda == "ARS" and moneda_inversion.upper() == "USD" and dolar_oficial:
-            monto_convertido = monto * dolar_oficial
-        elif bono.moneda == "USD" and moneda_inversion.upper() == "ARS" and dolar_oficial:
-            monto_convertido = monto / dolar_oficial
-
-        # Actualizar valor de dólar del bono si aplica
-        if bono.moneda == "ARS" and dolar_oficial:
+        monto_convertido = _convertir_monto(monto, bono.moneda, moneda_inversion, dolar_oficial)
+
+        # Actualizar valor de dólar del bono (los bonos en USD también lo
+        # usan para pasar a pesos, así no lo consultan uno por uno)
+        if dolar_oficial:
             bono.actualizar(dolar_oficial)
 
         # Calcular rendimiento
@@ -68,52 +276,7 @@ async def calcular_bonos(
         vs_banda = bono.rendimiento_vs_banda(
             monto_convertido,
             fecha_inicio=fecha_venc_dt,
-            dias=30
+            dias=DIAS_VS_BANDA
         ) or {}
 
-        # Insertar en DB
-        with engine.begin() as conn:
-            insert_stmt = text("""
-                INSERT INTO instrumentos_usuarios.bonos_usuarios (
-                    usuario_username, bono, moneda_bono, monto_inicial, moneda_inversion,
-                    monto_convertido, r_mensual_pct, r_anual_pct,
-                    monto_final_pesos, factor_ars, vs_banda_techo_usd,
-                    dolar_actual, dolar_equilibrio,
-                    dias_considerados, mes_banda_usado
-                ) VALUES (
-                    :usuario_username, :bono, :moneda_bono, :monto_inicial, :moneda_inversion,
-                    :monto_convertido, :r_mensual_pct, :r_anual_pct,
-                    :monto_final_pesos, :factor_ars, :vs_banda_techo_usd,
-                    :dolar_actual, :dolar_equilibrio,
-                    :dias_considerados, :mes_banda_usado
-                )
-            """)
-            conn.execute(insert_stmt, {
-                "usuario_username": usuario_username,
-                "bono": bono.nombre,
-                "moneda_bono": bono.moneda,
-                "monto_inicial": monto,
-                "moneda_inversion": moneda_inversion.upper(),
-                "monto_convertido": round(monto_convertido, 6),
-                "r_mensual_pct": round(rendimiento.get("mensual_pct", 0), 2),
-                "r_anual_pct": round(rendimiento.get("anual_pct", 0), 2),
-                "monto_final_pesos": round(vs_banda.get("monto_final_pesos", 0), 2),
-                "factor_ars": round(vs_banda.get("factor_ars", 0), 6),
-                "vs_banda_techo_usd": round(vs_banda.get("vs_techo_usd", 0), 6),
-                "dolar_actual": round(dolar_oficial or 0, 2),
-                "dolar_equilibrio": round(vs_banda.get("dolar_equilibrio", 0), 2),
-                "dias_considerados": vs_banda.get("dias", 30),
-                "mes_banda_usado": vs_banda.get("mes", "")
-            })
-
-        resultados.append({
-            "bono": bono.nombre,
-            "moneda": bono.moneda,
-            "monto_inicial": monto,
-            "moneda_inversion": moneda_inversion.upper(),
-            "monto_convertido": round(monto_convertido, 2),
-            "rendimiento": rendimiento,
-            "vs_banda": vs_banda
-        })
-
-    return resultados
+        yield bono.nombre, bono.moneda, monto_convertido, rendimiento, vs_banda
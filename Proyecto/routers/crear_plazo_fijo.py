@@ -10,11 +10,22 @@ import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.conexion_db import engine
 from utils.obtener_ultimo_valor_dolar import obtener_dolar_oficial
+from utils.datos_mercado import marcar_respuesta
 from sqlalchemy import text
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response, Query, Depends
+from auth.auth_service import obtener_usuario_actual
+from models.user import UsuarioPublico
+from utils.exportacion import consulta_historial, respuesta_exportacion
+from utils.paginacion import (
+    LIMITE_POR_DEFECTO, LIMITE_MAXIMO, columnas_pedidas, consulta_paginada, pagina
+)
+from utils.http_cache import cabeceras_mercado, no_modificado, respuesta_no_modificada
+from utils.analitica_instrumentos import obtener_analitica
+from datetime import date, timedelta
 
 # Inicialización de Variables
 router = APIRouter(prefix="/plazo fijo", tags=["Plazos Fijos"])
+COLUMNAS_BANCOS = ("id", "banco", "plazo", "tasa_pct")
 
 # Modelo para trabajar con los datos
 class PlazoFijoInput(BaseModel):
@@ -30,14 +41,36 @@ class PlazoFijoInput(BaseModel):
 
 
 @router.get("/instrumentos/plazos-fijos/bancos")
-def obtener_bancos():
+def obtener_bancos(
+    request: Request,
+    response: Response,
+    cursor: int | None = Query(None, description="'siguiente_cursor' de la página anterior"),
+    limit: int | None = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO,
+                              description="Filas por página (sin limit, todas)"),
+    fields: str | None = Query(None, description="Columnas separadas por coma (ej. banco,tasa_pct)")
+):
+    """
+    Devuelve los bancos y sus tasas de a `limit` por página, junto con
+    el cursor de la página siguiente (`siguiente_cursor`, None en la
+    última), igual que /dolar/cotizaciones.
+    """
+    columnas = columnas_pedidas(fields, COLUMNAS_BANCOS, ("banco", "tasa_pct"))
+    # Las tasas cambian solo cuando corre el scraper: 304 si el
+    # cliente ya tiene la última versión
+    cabeceras = cabeceras_mercado("plazos_fijos")
+    if no_modificado(request, cabeceras):
+        return respuesta_no_modificada(cabeceras)
+
+    consulta, parametros = consulta_paginada(
+        "datos_financieros.plazos_fijos", columnas, cursor=cursor, limite=limit
+    )
     try:
         with engine.connect() as conn:
-            result = conn.execute(
-                text("SELECT banco, tasa_pct FROM datos_financieros.plazos_fijos")
-            )
+            result = conn.execute(text(consulta), parametros)
             bancos = [dict(row._mapping) for row in result]
-        return bancos
+        bancos, siguiente = pagina(bancos, columnas, limit)
+        response.headers.update(cabeceras)
+        return {"bancos": bancos, "siguiente_cursor": siguiente}
     except Exception as e:
         # loguealo si querés; por ahora devolvemos 500
         raise HTTPException(status_code=500, detail=f"Error obteniendo bancos: {e}")
@@ -45,35 +78,25 @@ def obtener_bancos():
 
 @router.post("/instrumentos/plazos-fijos/crear")
 def crear_plazo_fijo(data: PlazoFijoInput):
-    # 1) Obtener la tasa del banco desde la tabla de datos_financieros
-    try:
-        with engine.connect() as conn:
-            row = conn.execute(
-                text("""
-                    SELECT tasa_pct
-                    FROM datos_financieros.plazos_fijos
-                    WHERE banco = :b
-                """),
-                {"b": data.banco}
-            ).fetchone()
+    dias = data.dias if data.dias and data.dias > 0 else 30
 
-        if not row:
-            raise HTTPException(status_code=404, detail=f"No existe el banco '{data.banco}'")
-        tasa_tna = row[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error consultando tasa: {e}")
+    # 1) Para los plazos estándar la TEA y el factor ya están calculados
+    # desde la carga de tasas: solo se escala por el monto
+    analitica = obtener_analitica("plazo_fijo", dias, data.banco)
+    if analitica:
+        tasa_tna = analitica[0]["tna_pct"]
+        resultado = _escalar_plazo_fijo(analitica[0], data.monto_inicial)
+    else:
+        tasa_tna = _obtener_tasa(data.banco)
 
-    # 2) Crear objeto PlazoFijo con la tasa y (opcional) días
-    dias = data.dias if data.dias and data.dias > 0 else 30
-    pf = PlazoFijo(banco=data.banco, tasa_tna=tasa_tna, dias=dias)
+        # 2) Crear objeto PlazoFijo con la tasa y (opcional) días
+        pf = PlazoFijo(banco=data.banco, tasa_tna=tasa_tna, dias=dias)
 
-    # 3) Calcular rendimiento usando tu método real
-    try:
-        resultado = pf.calcular_rendimiento(data.monto_inicial)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calculando rendimiento: {e}")
+        # 3) Calcular rendimiento usando tu método real
+        try:
+            resultado = pf.calcular_rendimiento(data.monto_inicial)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error calculando rendimiento: {e}")
     
     dolar_actual = obtener_dolar_oficial()
     if dolar_actual:
@@ -106,8 +129,18 @@ def crear_plazo_fijo(data: PlazoFijoInput):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error guardando en la DB: {e}")
 
-    # 5) Devolver el resultado completo del cálculo (útil para el frontend)
-    return {
+    # 5) Techo de la banda el día del vencimiento (no el del mes redondeado)
+    # La curva (numpy) se importa recién acá para no cargarla al iniciar la API
+    from utils.curva_bandas import obtener_curva_bandas
+    try:
+        _, techo = obtener_curva_bandas().banda(date.today() + timedelta(days=dias))
+    except Exception as e:
+        print(f"[ERROR crear_plazo_fijo] No se pudo obtener la banda: {e}")
+        techo = None
+
+    # 6) Devolver el resultado completo del cálculo (útil para el frontend),
+    # marcado como desactualizado si el dólar salió del último valor conocido
+    return marcar_respuesta({
         "banco": data.banco,
         "tna": resultado.get("tna"),
         "tea": resultado.get("tea"),
@@ -115,5 +148,51 @@ def crear_plazo_fijo(data: PlazoFijoInput):
         "monto_inicial": data.monto_inicial,
         "monto_final_pesos": resultado.get("monto_final_pesos"),
         "ganancia_pesos": resultado.get("ganancia_pesos"),
-        "dólar equilibrio": dolar_equilibrio
-    }
\ No newline at end of file
+        "dólar equilibrio": dolar_equilibrio,
+        "techo_banda_vencimiento": round(techo, 2) if techo else None,
+        "monto_final_usd_techo": round(resultado["monto_final_pesos"] / techo, 2) if techo else None
+    })
+
+
+def _obtener_tasa(banco: str) -> float:
+    """Obtiene la tasa del banco desde la tabla de datos_financieros."""
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(
+                text("""
+                    SELECT tasa_pct
+                    FROM datos_financieros.plazos_fijos
+                    WHERE banco = :b
+                """),
+                {"b": banco}
+            ).fetchone()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error consultando tasa: {e}")
+
+    if not row:
+        raise HTTPException(status_code=404, detail=f"No existe el banco '{banco}'")
+    return row[0]
+
+
+def _escalar_plazo_fijo(analitica: dict, monto_inicial: float) -> dict:
+    """Mismo resultado que PlazoFijo.calcular_rendimiento, desde la analítica guardada."""
+    monto_final = monto_inicial * analitica["factor_ars"]
+    return {
+        "tna": analitica["tna_pct"],
+        "tea": round(analitica["tea_pct"], 2),
+        "monto_final_pesos": round(monto_final, 2),
+        "ganancia_pesos": round(monto_final - monto_inicial, 2),
+    }
+
+
+@router.get("/instrumentos/plazos-fijos/historial/exportar")
+def exportar_historial_plazos_fijos(
+    formato: str = Query("csv", description="csv, parquet o arrow"),
+    todos: bool = Query(False, description="Solo admin: historial de todos los usuarios"),
+    usuario_actual: UsuarioPublico = Depends(obtener_usuario_actual)
+):
+    """Exporta en streaming los plazos fijos calculados por el usuario."""
+    consulta, parametros = consulta_historial(
+        "plazos_fijos_usuarios", usuario_actual, todos, orden="fecha_calculo"
+    )
+    return respuesta_exportacion(consulta, parametros, formato, "historial_plazos_fijos")
@@ -2,21 +2,29 @@
 Rutas para obtener información sobre el valor del dólar, incluyendo:
 - Dólar oficial actual.
 - Cotizaciones históricas almacenadas en la base de datos.
-- Exportación de cotizaciones históricas a un archivo CSV.
+- Exportación de cotizaciones históricas a CSV, Parquet o Arrow.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request, Response
 from utils.obtener_ultimo_valor_dolar import obtener_ultimo_valor_dolar
-from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from utils.conexion_db import engine
-import pandas as pd
-import asyncio
-from io import StringIO
+from utils.http_cache import cabeceras_mercado, no_modificado, respuesta_no_modificada
+from utils.exportacion import respuesta_exportacion
+from utils.coalescencia import Coalescedor
+from utils.paginacion import (
+    LIMITE_POR_DEFECTO, LIMITE_MAXIMO, columnas_pedidas, consulta_paginada, pagina
+)
 
 router = APIRouter(prefix="/dolar", tags=["Dólar"])
 
+COLUMNAS_DOLAR = ("id", "tipo", "compra", "venta", "variacion")
+
+# Los requests simultáneos a la misma página comparten la consulta
+coalescedor_cotizaciones = Coalescedor("cotizaciones_dolar")
+
 
 # -------------------------------
 # Endpoints 
@@ -24,66 +32,75 @@ router = APIRouter(prefix="/dolar", tags=["Dólar"])
 
 
 @router.get("/")
-async def mostrar_dolar_oficial_hoy():
+async def mostrar_dolar_oficial_hoy(request: Request, response: Response):
     """
     Obtiene el valor del dólar oficial actual.
+    Responde 304 si el cliente ya tiene la última versión (ETag).
     """
-    
-    loop = asyncio.get_running_loop()
+    cabeceras = await run_in_threadpool(cabeceras_mercado, "dolar")
+    if no_modificado(request, cabeceras):
+        return respuesta_no_modificada(cabeceras)
+
     try:
-        valor = await loop.run_in_executor(None, obtener_ultimo_valor_dolar)
+        valor = await run_in_threadpool(obtener_ultimo_valor_dolar)
+        response.headers.update(cabeceras)
         return {"Dólar hoy": valor}
     except Exception as e:
         return {"error": str(e)}
 
 
 @router.get("/cotizaciones")
-async def mostrar_cotizaciones():
+async def mostrar_cotizaciones(
+    request: Request,
+    response: Response,
+    cursor: int | None = Query(None, description="'siguiente_cursor' de la página anterior"),
+    limit: int | None = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO,
+                              description="Filas por página (sin limit, todas)"),
+    fields: str | None = Query(None, description="Columnas separadas por coma (ej. tipo,venta)")
+):
     """
-    Obtiene todas las cotizaciones actuales de distintos 
+    Obtiene las cotizaciones actuales de distintos 
     tipos de dólares almacenados en la base de datos y 
-    los devuelve como diccionarios.
+    los devuelve como diccionarios, de a `limit` por página.
+    Responde 304 si el cliente ya tiene la última versión (ETag).
     """
+    columnas = columnas_pedidas(fields, COLUMNAS_DOLAR, COLUMNAS_DOLAR)
+    cabeceras = await run_in_threadpool(cabeceras_mercado, "dolar")
+    if no_modificado(request, cabeceras):
+        return respuesta_no_modificada(cabeceras)
     
-    loop = asyncio.get_running_loop()
     def obtener_datos():
+        consulta, parametros = consulta_paginada(
+            "datos_financieros.dolar", columnas, cursor=cursor, limite=limit
+        )
         try:
             with engine.connect() as conn:
-                result = conn.execute(text("SELECT * FROM datos_financieros.dolar"))
+                result = conn.execute(text(consulta), parametros)
                 return [dict(row._mapping) for row in result]
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener datos del dolar: {e}")
 
     try:
-        data = await loop.run_in_executor(None, obtener_datos)
-        return {"cotizaciones": data}
+        data = await run_in_threadpool(
+            coalescedor_cotizaciones.ejecutar, (cursor, limit, tuple(columnas)), obtener_datos
+        )
+        data, siguiente = pagina(data, columnas, limit)
+        response.headers.update(cabeceras)
+        return {"cotizaciones": data, "siguiente_cursor": siguiente}
     except Exception as e:
         return {"error": str(e)}
 
 
 @router.get("/exportar")
-async def exportar_csv():
+async def exportar_csv(
+    formato: str = Query("csv", description="csv, parquet o arrow")
+):
     """
-    Exporta las cotizaciones de distintos actuales de 
-    distintos tipos de dólares desde la base de datos a
-    un archivo CSV y lo devuelv para ser descargado.
+    Exporta las cotizaciones de los distintos tipos de dólares
+    desde la base de datos para ser descargadas (CSV por defecto).
+    Las filas se envían a medida que se leen de la base.
     """
-
-    loop = asyncio.get_running_loop()
-    def exportar():
-        try:
-            with engine.connect() as conn:
-                df = pd.read_sql("SELECT * FROM datos_financieros.dolar", conn)
-            stream = StringIO()
-            df.to_csv(stream, index=False)
-            stream.seek(0)
-            return stream
-        except SQLAlchemyError as e:
-            raise Exception(f"Error al exportar dolar como CSV: {e}")
-
-    stream = await loop.run_in_executor(None, exportar)
-    return StreamingResponse(
-        stream,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=cotizaciones.csv"},
+    return respuesta_exportacion(
+        "SELECT * FROM datos_financieros.dolar ORDER BY id",
+        None, formato, "cotizaciones"
     )
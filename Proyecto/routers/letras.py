@@ -0,0 +1,41 @@
+"""
+Rutas de letras del Tesoro (LECAP, LEDE, letras en USD): rendimiento
+hasta el vencimiento y comparación con la banda cambiaria.
+
+Las tasas de todas las letras (la curva) se calculan de una vez con
+numpy y se cachean hasta que cambien los datos de mercado o el día;
+cada request solo escala la curva por el monto (utils/curva_letras.py,
+que se importa en el endpoint para no cargar numpy al iniciar la API).
+"""
+
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query
+from utils.datos_mercado import marcar_respuesta
+
+router = APIRouter(prefix="/letras", tags=["Letras"])
+
+
+@router.get("/calcular", summary="Calcular rendimiento de letras hasta el vencimiento")
+def calcular_letras(
+    monto: float = Query(10000, gt=0, description="Monto a invertir"),
+    moneda_inversion: Literal["ARS", "USD"] = Query("ARS", description="Moneda de la inversión")
+):
+    """
+    Devuelve, para cada letra vigente, las tasas (TNA, TEA, TEM y de
+    descuento), el monto al vencimiento y la comparación con la banda
+    cambiaria del mes de vencimiento. Con datos de mercado
+    desactualizados agrega stale y edad_datos_segundos.
+    """
+    from utils.curva_letras import filas_letras, obtener_curva
+
+    try:
+        curva = obtener_curva()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo letras: {e}")
+
+    return marcar_respuesta({
+        "monto_inicial": monto,
+        "moneda_inversion": moneda_inversion,
+        "dolar_oficial": curva.dolar_oficial,
+        "letras": filas_letras(curva, monto, moneda_inversion),
+    })
@@ -0,0 +1,302 @@
+"""
+Rutas para simular muchos escenarios (montos × plazos × monedas) de
+plazos fijos y bonos en un solo request.
+
+Todos los escenarios se calculan sobre la misma foto de mercado
+(utils/snapshot_mercado.py) y con operaciones de numpy sobre todos los
+instrumentos a la vez (utils/calculo_simulaciones.py). Es de solo
+lectura: no guarda nada salvo que se pida con `guardar`.
+
+Los cálculos y la foto se importan dentro de cada endpoint: numpy y la
+curva de bandas se cargan con el primer request, no al iniciar la API.
+
+/simulaciones/escenarios simula trayectorias del dólar dentro de la
+banda cambiaria (utils/escenarios_dolar.py) y responde qué tan
+probable es que cada instrumento en pesos le gane al dólar, y
+/simulaciones/sensibilidad arma la grilla de dólar de equilibrio (o
+resultado en USD) por plazo y tasa o dólar de un instrumento.
+"""
+
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field, field_validator
+from sqlalchemy import text
+from routers.crear_bono import INSERT_BONO_USUARIO
+from utils.conexion_db import engine
+from utils.http_cache import cabeceras_calculo, no_modificado, respuesta_no_modificada
+
+router = APIRouter(prefix="/simulaciones", tags=["Simulaciones"])
+
+MAXIMO_VALORES = 50       # por lista (montos, dias)
+MAXIMO_ESCENARIOS = 500   # montos × dias × monedas
+MAXIMO_RANKING = 50
+# /escenarios es público: los límites acotan el CPU de cada request
+MAXIMO_TRAYECTORIAS = 100_000
+MAXIMO_DIAS_ESCENARIOS = 365
+MAXIMO_PUNTOS_SENSIBILIDAD = 60  # por eje
+
+INSERT_PLAZO_FIJO_USUARIO = text("""
+    INSERT INTO instrumentos_usuarios.plazos_fijos_usuarios
+    (usuario_username, banco, monto_inicial, tasa_pct,
+    monto_final_pesos, dolar_actual, dolar_equilibrio, fecha_calculo)
+    VALUES (:usuario_username, :banco, :monto_inicial, :tasa_pct, :monto_final_pesos,
+            :dolar_actual, :dolar_equilibrio, NOW())
+""")
+
+
+class SimulacionInput(BaseModel):
+    montos: list[float] = Field(..., min_length=1, max_length=MAXIMO_VALORES)
+    dias: list[int] = Field([30], min_length=1, max_length=MAXIMO_VALORES)
+    monedas: list[str] = Field(["ARS"], min_length=1, max_length=2,
+                               description="Monedas de inversión para los bonos: ARS y/o USD")
+    instrumentos: list[Literal["plazos_fijos", "bonos"]] = ["plazos_fijos", "bonos"]
+    guardar: bool = False
+    usuario_username: str | None = None
+
+    @field_validator("montos")
+    @classmethod
+    def _montos_positivos(cls, montos):
+        if any(m <= 0 for m in montos):
+            raise ValueError("Los montos deben ser positivos.")
+        return montos
+
+    @field_validator("dias")
+    @classmethod
+    def _dias_positivos(cls, dias):
+        if any(d <= 0 for d in dias):
+            raise ValueError("Los días deben ser positivos.")
+        return dias
+
+    @field_validator("monedas")
+    @classmethod
+    def _monedas_validas(cls, monedas):
+        monedas = list(dict.fromkeys(m.upper() for m in monedas))
+        if any(m not in ("ARS", "USD") for m in monedas):
+            raise ValueError("Las monedas válidas son 'ARS' y 'USD'.")
+        return monedas
+
+
+# -------------------------------
+# Endpoints
+# -------------------------------
+
+
+@router.post("/calcular", summary="Simular plazos fijos y bonos para muchos escenarios")
+def simular(data: SimulacionInput):
+    """
+    Calcula plazos fijos (por monto y plazo) y bonos (por monto, moneda
+    de inversión y plazo) para todas las combinaciones pedidas.
+
+    La respuesta es por columnas: los nombres de bancos y bonos van una
+    sola vez y cada escenario trae listas alineadas con esos nombres.
+    """
+    cantidad = len(data.montos) * len(data.dias) * len(data.monedas)
+    if cantidad > MAXIMO_ESCENARIOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Demasiados escenarios ({cantidad}). Máximo: {MAXIMO_ESCENARIOS}."
+        )
+    if data.guardar and not data.usuario_username:
+        raise HTTPException(
+            status_code=400,
+            detail="Para guardar la simulación hay que indicar usuario_username."
+        )
+
+    from utils.calculo_simulaciones import simular_instrumentos
+    from utils.snapshot_mercado import obtener_snapshot
+
+    try:
+        snapshot = obtener_snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo datos de mercado: {e}")
+
+    respuesta, filas_pf, filas_bonos = simular_instrumentos(
+        snapshot, data.montos, data.dias, data.monedas, data.instrumentos, data.guardar
+    )
+
+    if data.guardar:
+        usuario = {"usuario_username": data.usuario_username}
+        try:
+            with engine.begin() as conn:
+                if filas_pf:
+                    conn.execute(INSERT_PLAZO_FIJO_USUARIO, [{**f, **usuario} for f in filas_pf])
+                if filas_bonos:
+                    conn.execute(INSERT_BONO_USUARIO, [{**f, **usuario} for f in filas_bonos])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error guardando en la DB: {e}")
+
+    return respuesta
+
+
+@router.get("/ranking", summary="Mejores plazos fijos y bonos para un monto y plazo")
+def ranking(
+    monto: float = Query(10000, gt=0, description="Monto a invertir"),
+    dias: int = Query(30, gt=0, le=3650, description="Plazo en días"),
+    moneda_inversion: Literal["ARS", "USD"] = Query("ARS", description="Moneda del monto"),
+    criterio: Literal["rendimiento", "dolar_equilibrio"] = Query(
+        "rendimiento", description="Ordenar por rendimiento o por dólar de equilibrio"),
+    instrumentos: Literal["todos", "plazos_fijos", "bonos"] = Query("todos"),
+    k: int = Query(5, ge=1, le=MAXIMO_RANKING, description="Cantidad de resultados")
+):
+    """
+    Devuelve los K instrumentos con mayor rendimiento en pesos (o mayor
+    dólar de equilibrio) a `dias` días, sin armar la lista completa.
+    """
+    from utils.ranking import top_k
+    from utils.snapshot_mercado import obtener_snapshot
+
+    try:
+        snapshot = obtener_snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo datos de mercado: {e}")
+
+    dolar = snapshot.dolar_oficial
+    if moneda_inversion == "USD" and not dolar:
+        raise HTTPException(status_code=503, detail="No hay cotización del dólar oficial.")
+    monto_pesos = monto * dolar if moneda_inversion == "USD" else monto
+
+    tipos = ("plazos_fijos", "bonos") if instrumentos == "todos" else (instrumentos,)
+    resultados = []
+    for c in top_k(snapshot, dias, k, criterio, tipos):
+        es_bono = c.tipo == "bono"
+        monto_final = monto_pesos * c.factor
+        resultado = {
+            "tipo": c.tipo,
+            "nombre": snapshot.bonos[c.indice] if es_bono else snapshot.bancos[c.indice],
+            "moneda": snapshot.monedas_bonos[c.indice] if es_bono else "ARS",
+            "rendimiento_pct": round((c.factor - 1) * 100, 2),
+            "monto_final_pesos": round(monto_final, 2),
+            "ganancia_pesos": round(monto_final - monto_pesos, 2),
+            "dolar_equilibrio": round(c.dolar_equilibrio, 2) if c.dolar_equilibrio else None,
+        }
+        if es_bono:
+            resultado["mes_banda_usado"] = c.mes_banda_usado
+        else:
+            resultado["tna"] = float(snapshot.tasas_tna[c.indice])
+        resultados.append(resultado)
+
+    return {
+        "criterio": criterio,
+        "monto_inicial": monto,
+        "moneda_inversion": moneda_inversion,
+        "dias": dias,
+        "resultados": resultados,
+    }
+
+
+@router.get("/escenarios", summary="Probabilidad de ganarle al dólar (Monte Carlo)")
+def escenarios(
+    monto: float = Query(10000, gt=0, description="Monto a invertir"),
+    moneda_inversion: Literal["ARS", "USD"] = Query("ARS", description="Moneda del monto"),
+    dias: int = Query(30, gt=0, le=MAXIMO_DIAS_ESCENARIOS, description="Plazo en días"),
+    trayectorias: int = Query(10_000, ge=100, le=MAXIMO_TRAYECTORIAS,
+                              description="Cantidad de trayectorias simuladas"),
+    volatilidad: float = Query(0.2, gt=0, le=3, description="Volatilidad anual del dólar"),
+    deriva: float = Query(0.0, ge=-1, le=5, description="Deriva anual del dólar"),
+    semilla: int | None = Query(None, ge=0, description="Semilla para repetir la simulación"),
+    instrumentos: Literal["todos", "plazos_fijos", "bonos"] = Query("todos")
+):
+    """
+    Simula el dólar oficial a `dias` días dentro de la banda cambiaria
+    y, para cada plazo fijo y bono en pesos, devuelve los percentiles
+    del resultado en USD y la probabilidad de terminar con más dólares
+    que los que se compran hoy con el monto. Los bonos en USD no
+    dependen del dólar y no se incluyen.
+    """
+    from utils.calculo_simulaciones import simular_escenarios
+    from utils.snapshot_mercado import obtener_snapshot
+
+    try:
+        snapshot = obtener_snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo datos de mercado: {e}")
+    if not snapshot.dolar_oficial:
+        raise HTTPException(status_code=503, detail="No hay cotización del dólar oficial.")
+
+    return {
+        "monto_inicial": monto,
+        "moneda_inversion": moneda_inversion,
+        "dias": dias,
+        "trayectorias": trayectorias,
+        "volatilidad": volatilidad,
+        "deriva": deriva,
+        "semilla": semilla,
+        **simular_escenarios(snapshot, monto, moneda_inversion, dias, trayectorias,
+                             volatilidad, deriva, semilla, instrumentos),
+    }
+
+
+@router.get("/sensibilidad", summary="Grilla de dólar de equilibrio por plazo y tasa o dólar")
+def sensibilidad(
+    request: Request,
+    response: Response,
+    tipo: Literal["plazo_fijo", "bono"] = Query(..., description="Tipo de instrumento"),
+    nombre: str = Query(..., description="Banco o bono"),
+    eje: Literal["tna", "dolar"] = Query(
+        "tna", description="Segundo eje: tasa del instrumento o dólar al vencimiento"),
+    monto: float = Query(10000, gt=0, description="Monto a invertir"),
+    moneda_inversion: Literal["ARS", "USD"] = Query("ARS", description="Moneda del monto"),
+    dias_desde: int = Query(30, gt=0, le=3650),
+    dias_hasta: int = Query(360, gt=0, le=3650),
+    dias_paso: int = Query(30, gt=0),
+    desde: float | None = Query(None, ge=0, description="Inicio del segundo eje (tasa % o dólar)"),
+    hasta: float | None = Query(None, ge=0, description="Fin del segundo eje (tasa % o dólar)"),
+    puntos: int = Query(21, ge=2, le=MAXIMO_PUNTOS_SENSIBILIDAD, description="Puntos del segundo eje")
+):
+    """
+    Devuelve, para un plazo fijo o un bono, una grilla plazo × tasa con
+    el dólar de equilibrio y el monto final en pesos (eje "tna": TNA
+    para plazos fijos, TEA para bonos), o una grilla plazo × dólar al
+    vencimiento con el resultado en USD (eje "dolar"). Reemplaza probar
+    combinaciones una por una con /plazo fijo/, que además guarda cada
+    prueba.
+
+    Responde con ETag según las versiones de mercado y los parámetros:
+    con If-None-Match y sin cambios devuelve 304.
+    """
+    dias = list(range(dias_desde, dias_hasta + 1, dias_paso))
+    if len(dias) == 0 or len(dias) > MAXIMO_PUNTOS_SENSIBILIDAD:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El rango de días debe tener entre 1 y {MAXIMO_PUNTOS_SENSIBILIDAD} plazos."
+        )
+    if desde is not None and hasta is not None and hasta <= desde:
+        raise HTTPException(status_code=400, detail="'hasta' debe ser mayor que 'desde'.")
+
+    fuentes = ("dolar", "plazos_fijos" if tipo == "plazo_fijo" else "bonos")
+    if eje == "dolar":
+        fuentes += ("bandas_cambiarias",)
+    parametros = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    # Sin rango de dólar, la grilla sale de la banda al último plazo
+    # contado desde hoy: cambia cada día aunque no cambie el mercado
+    rango_del_dia = eje == "dolar" and (desde is None or hasta is None)
+    if rango_del_dia:
+        parametros += f"&hoy={date.today().isoformat()}"
+    cabeceras = cabeceras_calculo(fuentes, parametros)
+    if rango_del_dia:
+        cabeceras.pop("Last-Modified", None)
+    if no_modificado(request, cabeceras):
+        return respuesta_no_modificada(cabeceras)
+
+    from utils.calculo_simulaciones import grilla_sensibilidad
+    from utils.snapshot_mercado import obtener_snapshot
+
+    try:
+        snapshot = obtener_snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo datos de mercado: {e}")
+    if not snapshot.dolar_oficial:
+        raise HTTPException(status_code=503, detail="No hay cotización del dólar oficial.")
+    nombres = snapshot.bancos if tipo == "plazo_fijo" else snapshot.bonos
+    if nombre not in nombres:
+        raise HTTPException(status_code=404, detail=f"No existe el instrumento '{nombre}'")
+
+    try:
+        resultado = grilla_sensibilidad(snapshot, tipo, nombre, eje, monto, moneda_inversion,
+                                        dias, desde, hasta, puntos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response.headers.update(cabeceras)
+    return resultado
@@ -11,6 +11,8 @@ from sqlalchemy import text
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.conexion_db import engine
+from utils.version_mercado import incrementar_version
+from utils.analitica_instrumentos import recalcular_analitica
 
 
 def _to_float(val):
@@ -125,6 +127,10 @@ def reemplazar_tabla_bandas_con_csv(
             index=False,
             method="multi"
         )
+        incrementar_version(conn, "bandas_cambiarias")
+        # El techo de la banda entra en la analítica de bonos y letras
+        recalcular_analitica(conn, "bono")
+        recalcular_analitica(conn, "letra")
 
 
     return {
@@ -10,6 +10,8 @@ from sqlalchemy import text
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.conexion_db import engine
+from utils.version_mercado import incrementar_version
+from utils.analitica_instrumentos import recalcular_analitica
 
 
 def _to_float(val):
@@ -99,6 +101,8 @@ def reemplazar_tabla_bonos_con_csv(
             if_exists="append", 
             index=False
         )
+        incrementar_version(conn, "bonos")
+        recalcular_analitica(conn, "bono")
     
     return {
         "tabla": tabla,
@@ -18,6 +18,7 @@ import shutil
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.conexion_db import engine
+from utils.version_mercado import incrementar_version
 
 print("Iniciando scraping de dólar...")
 
@@ -125,5 +126,6 @@ with engine.begin() as conn:
         text("INSERT INTO datos_financieros.dolar (tipo, compra, venta, variacion) VALUES (:tipo, :compra, :venta, :variacion)"),
         [{"tipo": t, "compra": c, "venta": v, "variacion": var} for (t, c, v, var) in data]
     )
+    incrementar_version(conn, "dolar")
 
 print("✅ Tabla 'dolar' reemplazada y datos guardados en Supabase.")
\ No newline at end of file
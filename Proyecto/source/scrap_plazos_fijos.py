@@ -18,6 +18,8 @@ import shutil
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.conexion_db import engine
+from utils.version_mercado import incrementar_version
+from utils.analitica_instrumentos import recalcular_analitica
 
 print("Inicio del scraping de plazos fijos...")
 
@@ -102,6 +104,8 @@ with engine.begin() as conn:
         """),
         [{"banco": b, "plazo": p, "tasa_pct": t} for (b, p, t) in data]
     )
+    incrementar_version(conn, "plazos_fijos")
+    recalcular_analitica(conn, "plazo_fijo")
 
 print("✅ Tabla 'plazos_fijos' reemplazada y datos guardados en Supabase.")
 print("Fin del scraping de plazos fijos.")
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Pruebas de la coalescencia de lecturas concurrentes: una sola
+ejecución por clave en curso, errores compartidos y métricas.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import threading
+import time
+import pytest
+from utils.coalescencia import Coalescedor, coalescer
+from utils.metricas import RegistroMetricas
+
+HILOS = 8
+
+
+def _esperar(condicion, segundos=5.0):
+    limite = time.monotonic() + segundos
+    while not condicion():
+        assert time.monotonic() < limite, "timeout esperando a los threads"
+        time.sleep(0.001)
+
+
+def _llamar_en_paralelo(funcion, *args):
+    resultados, errores = [], []
+
+    def correr():
+        try:
+            resultados.append(funcion(*args))
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=correr) for _ in range(HILOS)]
+    for hilo in hilos:
+        hilo.start()
+    return hilos, resultados, errores
+
+
+def test_llamadas_concurrentes_comparten_una_ejecucion():
+    liberar = threading.Event()
+    ejecuciones = []
+
+    @coalescer("prueba_concurrentes", copiar=list)
+    def leer(tipo):
+        ejecuciones.append(tipo)
+        liberar.wait(5)
+        return [tipo, 1450.0]
+
+    hilos, resultados, errores = _llamar_en_paralelo(leer, "DÓLAR OFICIAL")
+    c = leer.coalescedor
+    _esperar(lambda: c.coalescidas == HILOS - 1)
+    assert c.en_curso() == 1
+    liberar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert ejecuciones == ["DÓLAR OFICIAL"]
+    assert not errores
+    assert resultados == [["DÓLAR OFICIAL", 1450.0]] * HILOS
+    # Los seguidores reciben copias, no el mismo objeto
+    assert len({id(r) for r in resultados}) == HILOS
+    assert (c.llamadas, c.ejecuciones) == (HILOS, 1)
+    assert c.ratio_coalescencia() == pytest.approx((HILOS - 1) / HILOS)
+
+    # Terminada la consulta, la siguiente llamada vuelve a ejecutar
+    assert leer("DÓLAR OFICIAL") == ["DÓLAR OFICIAL", 1450.0]
+    assert len(ejecuciones) == 2 and c.en_curso() == 0
+
+
+def test_claves_distintas_no_se_coalescen():
+    c = Coalescedor()
+    assert c.ejecutar("ARS", lambda: 1) == 1
+    assert c.ejecutar("USD", lambda: 2) == 2
+    assert (c.llamadas, c.ejecuciones, c.coalescidas) == (2, 2, 0)
+
+
+def test_el_error_se_propaga_a_todos():
+    liberar = threading.Event()
+
+    @coalescer("prueba_errores")
+    def leer():
+        liberar.wait(5)
+        raise ValueError("sin conexión")
+
+    hilos, resultados, errores = _llamar_en_paralelo(leer)
+    _esperar(lambda: leer.coalescedor.coalescidas == HILOS - 1)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert not resultados
+    assert len(errores) == HILOS
+    assert all(str(e) == "sin conexión" for e in errores)
+    assert leer.coalescedor.en_curso() == 0
+
+
+def test_metricas_de_coalescencia():
+    @coalescer("prueba_metricas")
+    def leer():
+        return 1
+
+    leer()
+    texto = RegistroMetricas().exportar_prometheus()
+    assert 'cotizar_coalescencia_llamadas_total{lectura="prueba_metricas"} 1' in texto
+    assert 'cotizar_coalescencia_ratio{lectura="prueba_metricas"} 0.000000' in texto
@@ -0,0 +1,55 @@
+"""
+Pruebas de la curva diaria de bandas: coincide con el cronograma el
+día 1 de cada mes, interpola en el medio y la versión vectorizada da
+lo mismo que la de a una fecha.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import csv
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from utils.curva_bandas import armar_curva_bandas
+
+RUTA_BANDAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "datasets", "bandas_nov2025_dic2028.csv")
+
+
+@pytest.fixture(scope="module")
+def cronograma():
+    with open(RUTA_BANDAS, encoding="utf-8") as archivo:
+        return {f["fecha"]: (float(f["banda_inferior"]), float(f["banda_superior"]))
+                for f in csv.DictReader(archivo)}
+
+
+def test_curva_sigue_el_cronograma(cronograma):
+    ultima = cronograma["2028-12"]
+    curva = armar_curva_bandas(cronograma, ultima)
+    assert curva.inicio == date(2025, 11, 1)
+    assert len(curva.techos) == (date(2029, 1, 1) - date(2025, 11, 1)).days
+
+    for mes, banda in cronograma.items():
+        assert curva.banda(date.fromisoformat(mes + "-01")) == pytest.approx(banda)
+
+    # 28 de noviembre de 2025: casi en la banda de diciembre
+    piso, techo = curva.banda(date(2025, 11, 28))
+    nov, dic = cronograma["2025-11"], cronograma["2025-12"]
+    assert techo == pytest.approx(nov[1] + (dic[1] - nov[1]) * 27 / 30)
+    assert dic[0] < piso < nov[0]
+
+    # Fuera del cronograma: la última banda
+    assert curva.banda(date(2030, 5, 1)) == ultima
+    assert curva.banda(date(2020, 1, 1)) == ultima
+
+
+def test_bandas_de_fechas_coincide_con_banda(cronograma):
+    curva = armar_curva_bandas(cronograma, cronograma["2028-12"])
+    fechas = [date(2025, 10, 1) + timedelta(days=d) for d in range(0, 1300, 7)]
+    pisos, techos = curva.bandas_de_fechas(fechas)
+    for fecha, piso, techo in zip(fechas, pisos, techos):
+        assert (piso, techo) == curva.banda(fecha)
+
+    vacia = armar_curva_bandas({})
+    pisos, techos = vacia.bandas_de_fechas(np.array(["2026-01-01"], dtype="datetime64[D]"))
+    assert np.isnan(pisos).all() and np.isnan(techos).all()
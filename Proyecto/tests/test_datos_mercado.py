@@ -0,0 +1,342 @@
+"""
+Pruebas del acceso a datos de mercado con la base caída: circuito,
+último valor conocido, refresco en segundo plano y headers.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.pool import StaticPool
+from utils.datos_mercado import (
+    CircuitoAbierto, CircuitoBreaker, FuenteMercado, MiddlewareDatosMercado,
+    circuito_bd, es_falla_de_conexion, marcar_respuesta
+)
+
+HILOS_CONCURRENTES = 8
+
+
+class BaseFalsa:
+    """Lectura que devuelve valores o falla como una base caída."""
+
+    def __init__(self, valor=1450.0):
+        self.valor = valor
+        self.caida = False
+        self.llamadas = 0
+
+    def __call__(self, tipo="DÓLAR OFICIAL"):
+        self.llamadas += 1
+        if self.caida:
+            raise OperationalError("SELECT venta", {}, Exception("canceling statement due to statement timeout"))
+        return self.valor
+
+
+def test_circuito_se_abre_y_prueba_despues_del_plazo():
+    ahora = [0.0]
+    circuito = CircuitoBreaker(fallos_para_abrir=2, segundos_abierto=30, reloj=lambda: ahora[0])
+    circuito.registrar_fallo()
+    assert circuito.cerrado()
+    circuito.registrar_fallo()
+    assert not circuito.permitir() and circuito.aperturas == 1
+
+    ahora[0] = 30.0
+    assert circuito.permitir()          # consulta de prueba
+    assert not circuito.permitir()      # una sola a la vez
+    circuito.registrar_fallo()          # la prueba falla: se vuelve a abrir
+    assert circuito.segundos_para_reintento() == 30
+
+    ahora[0] = 60.0
+    assert circuito.permitir()
+    circuito.registrar_exito()
+    assert circuito.cerrado() and circuito.fallos == 0
+
+
+def test_sirve_el_ultimo_valor_conocido_sin_consultar_la_base():
+    base = BaseFalsa()
+    circuito = CircuitoBreaker(fallos_para_abrir=1, segundos_abierto=60)
+    fuente = FuenteMercado("dolar_prueba", base, circuito)
+
+    lectura = fuente.obtener("DÓLAR OFICIAL")
+    assert (lectura.valor, lectura.stale) == (1450.0, False)
+
+    base.caida = True
+    lectura = fuente.obtener("DÓLAR OFICIAL")
+    assert (lectura.valor, lectura.stale) == (1450.0, True)
+    assert not circuito.cerrado()
+
+    # Con el circuito abierto no se vuelve a consultar la base
+    llamadas = base.llamadas
+    for _ in range(10):
+        assert fuente.obtener("DÓLAR OFICIAL").stale
+    assert base.llamadas == llamadas
+
+    # Sin valor conocido para la clave no hay nada para servir
+    with pytest.raises(CircuitoAbierto):
+        fuente.obtener("DÓLAR BLUE")
+
+
+def test_sin_valor_conocido_propaga_el_error():
+    base = BaseFalsa()
+    base.caida = True
+    fuente = FuenteMercado("dolar_prueba", base, CircuitoBreaker(fallos_para_abrir=3))
+    with pytest.raises(OperationalError):
+        fuente.obtener()
+
+
+def test_solo_las_fallas_de_conexion_cuentan():
+    timeout = OperationalError("SELECT 1", {}, Exception("canceling statement due to statement timeout"))
+    sin_conexion = OperationalError(None, None, Exception("connection refused"))
+    tabla = ProgrammingError("SELECT * FROM x", {}, Exception('relation "x" does not exist'))
+    assert es_falla_de_conexion(timeout) and es_falla_de_conexion(sin_conexion)
+    assert es_falla_de_conexion(ConnectionResetError())
+    assert not es_falla_de_conexion(tabla)
+    assert not es_falla_de_conexion(OperationalError("SELECT * FROM x", {}, Exception("no such table: x")))
+    assert not es_falla_de_conexion(ValueError("sin datos"))
+
+
+def test_una_consulta_rota_no_abre_el_circuito():
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE dolar (tipo TEXT, venta REAL)"))
+        conn.execute(text("INSERT INTO dolar VALUES ('DÓLAR OFICIAL', 1450)"))
+
+    def leer(tabla):
+        with engine.connect() as conn:
+            return conn.execute(text(f"SELECT venta FROM {tabla}")).scalar_one()
+
+    def leer_letras():
+        raise ProgrammingError("SELECT * FROM letras", {}, Exception('relation "letras" does not exist'))
+
+    circuito = CircuitoBreaker(fallos_para_abrir=3, segundos_abierto=60)
+    dolar = FuenteMercado("dolar_prueba", leer, circuito)
+    letras = FuenteMercado("letras_prueba", leer_letras, circuito)
+    tabla_faltante = FuenteMercado("tabla_prueba", leer, circuito)
+    for _ in range(5):
+        with pytest.raises(ProgrammingError):
+            letras.obtener()
+        with pytest.raises(OperationalError):
+            tabla_faltante.obtener("no_existe")
+    assert circuito.cerrado() and circuito.aperturas == 0
+    lectura = dolar.obtener("dolar")
+    assert (lectura.valor, lectura.stale) == (1450.0, False)
+
+
+def test_base_lenta_sirve_el_ultimo_valor_y_revalida():
+    liberar = threading.Event()
+    valores = iter([1450.0, 1500.0])
+    lenta = [False]
+
+    def leer():
+        if lenta[0]:
+            liberar.wait(5)
+        return next(valores)
+
+    circuito = CircuitoBreaker()
+    fuente = FuenteMercado("dolar_prueba", leer, circuito, espera=0.05)
+    assert fuente.obtener().valor == 1450.0
+
+    lenta[0] = True
+    inicio = time.monotonic()
+    lectura = fuente.obtener()
+    assert (lectura.valor, lectura.stale) == (1450.0, True)
+    assert time.monotonic() - inicio < 1
+    assert circuito.cerrado()
+
+    # La lectura lenta sigue y actualiza el valor al terminar
+    lenta[0] = False
+    liberar.set()
+    limite = time.monotonic() + 5
+    while fuente._en_curso:
+        assert time.monotonic() < limite, "la lectura no terminó"
+        time.sleep(0.01)
+    assert fuente._ultimos[()].valor == 1500.0
+
+
+def test_refresco_en_segundo_plano_cierra_el_circuito():
+    base = BaseFalsa()
+    circuito = CircuitoBreaker(fallos_para_abrir=1, segundos_abierto=0.05)
+    fuente = FuenteMercado("dolar_prueba", base, circuito)
+    fuente.obtener()
+    base.caida = True
+    assert fuente.obtener().stale
+
+    base.caida, base.valor = False, 1500.0
+    limite = time.monotonic() + 5
+    while not circuito.cerrado():
+        assert time.monotonic() < limite, "el refresco no cerró el circuito"
+        time.sleep(0.01)
+
+    lectura = fuente.obtener()
+    assert (lectura.valor, lectura.stale) == (1500.0, False)
+
+
+def test_headers_y_campos_de_datos_desactualizados():
+    base = BaseFalsa()
+    fuente = FuenteMercado("dolar_prueba", base, CircuitoBreaker(fallos_para_abrir=1, segundos_abierto=60))
+
+    app = FastAPI()
+    app.add_middleware(MiddlewareDatosMercado)
+
+    @app.get("/dolar")
+    def dolar():
+        return marcar_respuesta({"dolar": fuente.obtener().valor})
+
+    client = TestClient(app)
+    respuesta = client.get("/dolar")
+    assert respuesta.json() == {"dolar": 1450.0}
+    assert "x-datos-stale" not in respuesta.headers
+
+    base.caida = True
+    respuesta = client.get("/dolar")
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["dolar"] == 1450.0 and cuerpo["stale"] is True
+    assert cuerpo["edad_datos_segundos"] >= 0
+    assert respuesta.headers["x-datos-stale"] == "true"
+    assert int(respuesta.headers["x-edad-datos"]) >= 0
+
+
+@pytest.fixture
+def mercado_sqlite(monkeypatch):
+    from routers import crear_bono
+    from utils import (obtener_bonos, obtener_banda_cambiaria, obtener_ultimo_valor_dolar,
+                       version_mercado, analitica_instrumentos)
+
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _adjuntar_esquemas(conexion, _):
+        for esquema in ("datos_financieros", "instrumentos_usuarios"):
+            conexion.execute(f"ATTACH DATABASE ':memory:' AS {esquema}")
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE datos_financieros.bonos (
+                nombre TEXT, moneda TEXT, ultimo REAL, dia_pct REAL,
+                mes_pct REAL, anio_pct REAL, fecha_vencimiento TEXT
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO datos_financieros.bonos VALUES
+            ('AL30', 'USD', 60.0, 0.1, 1.0, 20.0, '2030-07-09'),
+            ('TX26', 'ARS', 1000.0, 0.05, 2.0, 30.0, '2026-11-09')
+        """))
+        conn.execute(text("""
+            CREATE TABLE datos_financieros.dolar (
+                id INTEGER PRIMARY KEY, tipo TEXT, compra REAL, venta REAL, variacion REAL
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO datos_financieros.dolar (tipo, compra, venta, variacion)
+            VALUES ('DÓLAR OFICIAL', 1400, 1450, 0.1)
+        """))
+        conn.execute(text("""
+            CREATE TABLE datos_financieros.bandas_cambiarias (
+                id INTEGER PRIMARY KEY, fecha TEXT, banda_inferior REAL,
+                banda_superior REAL, ancho REAL
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO datos_financieros.bandas_cambiarias (fecha, banda_inferior, banda_superior, ancho)
+            VALUES ('2025-03', 951, 1471, 520), ('2030-08', 800, 2000, 1200)
+        """))
+        conn.execute(text("""
+            CREATE TABLE instrumentos_usuarios.bonos_usuarios (
+                usuario_username TEXT, bono TEXT, moneda_bono TEXT, monto_inicial REAL,
+                moneda_inversion TEXT, monto_convertido REAL, r_mensual_pct REAL,
+                r_anual_pct REAL, monto_final_pesos REAL, factor_ars REAL,
+                vs_banda_techo_usd REAL, dolar_actual REAL, dolar_equilibrio REAL,
+                dias_considerados INTEGER, mes_banda_usado TEXT
+            )
+        """))
+
+    modulos = (crear_bono, obtener_bonos, obtener_banda_cambiaria,
+               obtener_ultimo_valor_dolar, version_mercado, analitica_instrumentos)
+    fuentes = (obtener_bonos.fuente_bonos, obtener_bonos.fuente_tipo_cambio,
+               obtener_banda_cambiaria.fuente_bandas)
+
+    def usar_engine(nuevo):
+        for modulo in modulos:
+            monkeypatch.setattr(modulo, "engine", nuevo)
+        crear_bono.cache_calculo_bonos.limpiar()
+        obtener_banda_cambiaria.cache_bandas.limpiar()
+        version_mercado.limpiar_cache_versiones()
+
+    circuito_bd.registrar_exito()
+    for fuente in fuentes:
+        fuente.limpiar()
+    usar_engine(engine)
+    yield usar_engine
+    circuito_bd.registrar_exito()
+    for fuente in fuentes:
+        fuente.limpiar()
+    crear_bono.cache_calculo_bonos.limpiar()
+    obtener_banda_cambiaria.cache_bandas.limpiar()
+    version_mercado.limpiar_cache_versiones()
+
+
+def test_calcular_bonos_con_la_base_caida(mercado_sqlite):
+    from routers import crear_bono
+
+    app = FastAPI()
+    app.add_middleware(MiddlewareDatosMercado)
+    app.include_router(crear_bono.router)
+    client = TestClient(app)
+    params = {"monto": 10000, "moneda_inversion": "ARS", "usuario_username": "ana"}
+
+    respuesta = client.get("/bonos/calcular", params=params)
+    assert respuesta.status_code == 200
+    assert "x-datos-stale" not in respuesta.headers
+
+    # Base inaccesible: cada conexión falla
+    mercado_sqlite(create_engine("sqlite:////no/existe/base.db"))
+    caida = client.get("/bonos/calcular", params=params)
+    assert caida.status_code == 200
+    assert caida.headers["x-datos-stale"] == "true"
+    # Mismo cálculo, marcado como desactualizado en cada bono
+    marcados = caida.json()
+    assert all(b.pop("stale") is True and b.pop("edad_datos_segundos") >= 0 for b in marcados)
+    assert marcados == respuesta.json()
+    # Con el circuito abierto se responde sin esperar a la base
+    assert not circuito_bd.cerrado()
+    assert client.get("/bonos/calcular", params=params).status_code == 200
+
+
+def test_calcular_bonos_concurrentes_leen_la_base_una_vez(mercado_sqlite):
+    from routers import crear_bono
+    from utils import obtener_bonos
+
+    engine = crear_bono.engine
+    lecturas = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _lenta(conn, cursor, statement, parameters, context, executemany):
+        if statement.strip() == "SELECT * FROM datos_financieros.dolar":
+            lecturas.append(statement)
+            time.sleep(0.2)
+
+    app = FastAPI()
+    app.include_router(crear_bono.router)
+
+    async def pedir_en_paralelo():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            # Montos distintos: ninguno sale del cache de cálculos
+            return await asyncio.gather(*(
+                cliente.get("/bonos/calcular", params={"monto": 1000 + i, "usuario_username": "ana"})
+                for i in range(HILOS_CONCURRENTES)
+            ))
+
+    respuestas = asyncio.run(pedir_en_paralelo())
+    assert all(r.status_code == 200 for r in respuestas)
+    assert len(lecturas) == 1
+    assert obtener_bonos.obtener_tipo_cambio.coalescedor.coalescidas >= HILOS_CONCURRENTES - 1
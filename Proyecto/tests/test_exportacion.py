@@ -0,0 +1,103 @@
+"""
+Pruebas de la exportación en streaming (utils/exportacion.py) sobre
+una base SQLite en memoria.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import csv
+import io
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+from auth.auth_service import obtener_usuario_actual
+from models.user import UsuarioPublico
+from routers import dolar, crear_plazo_fijo
+from utils import exportacion
+
+FILAS = 1234
+
+
+@pytest.fixture
+def app(monkeypatch):
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _adjuntar_esquemas(conexion, _):
+        for esquema in ("datos_financieros", "instrumentos_usuarios"):
+            conexion.execute(f"ATTACH DATABASE ':memory:' AS {esquema}")
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE datos_financieros.dolar (
+                id INTEGER PRIMARY KEY, tipo TEXT, compra REAL, venta REAL, variacion REAL
+            )
+        """))
+        conn.execute(
+            text("INSERT INTO datos_financieros.dolar (tipo, compra, venta, variacion) "
+                 "VALUES (:tipo, 1400, :venta, 0.1)"),
+            [{"tipo": f"DÓLAR {i}", "venta": 1400 + i} for i in range(FILAS)]
+        )
+        conn.execute(text("""
+            CREATE TABLE instrumentos_usuarios.plazos_fijos_usuarios (
+                id INTEGER PRIMARY KEY, usuario_username TEXT, banco TEXT,
+                monto_inicial REAL, fecha_calculo TEXT
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO instrumentos_usuarios.plazos_fijos_usuarios
+            (usuario_username, banco, monto_inicial, fecha_calculo) VALUES
+            ('ana', 'Galicia', 1000, '2025-11-02'), ('beto', 'Nación', 5000, '2025-11-01'),
+            ('ana', 'Nación', 2000, '2025-11-01')
+        """))
+
+    monkeypatch.setattr(exportacion, "engine", engine)
+    app = FastAPI()
+    app.include_router(dolar.router)
+    app.include_router(crear_plazo_fijo.router)
+    return app
+
+
+def test_csv_se_genera_por_lotes(app):
+    trozos = list(exportacion.generar_csv(exportacion.leer_en_lotes(
+        "SELECT * FROM datos_financieros.dolar ORDER BY id", tamanio_lote=100
+    )))
+    assert len(trozos) == -(-FILAS // 100)
+    filas = list(csv.reader(io.StringIO(b"".join(trozos).decode())))
+    assert filas[0] == ["id", "tipo", "compra", "venta", "variacion"]
+    assert len(filas) == FILAS + 1
+
+
+def test_exportar_dolar(app):
+    respuesta = TestClient(app).get("/dolar/exportar")
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("text/csv")
+    assert "cotizaciones.csv" in respuesta.headers["content-disposition"]
+    assert len(respuesta.text.splitlines()) == FILAS + 1
+
+    assert TestClient(app).get("/dolar/exportar", params={"formato": "xls"}).status_code == 400
+
+
+def test_historial_solo_del_usuario(app):
+    app.dependency_overrides[obtener_usuario_actual] = lambda: UsuarioPublico(
+        nombre_usuario="ana", tipo="normal"
+    )
+    client = TestClient(app)
+    ruta = "/plazo fijo/instrumentos/plazos-fijos/historial/exportar"
+
+    filas = list(csv.DictReader(io.StringIO(client.get(ruta).text)))
+    assert [f["banco"] for f in filas] == ["Nación", "Galicia"]
+    assert client.get(ruta, params={"todos": True}).status_code == 403
+
+
+def test_parquet(app):
+    pq = pytest.importorskip("pyarrow.parquet")
+    respuesta = TestClient(app).get("/dolar/exportar", params={"formato": "parquet"})
+    tabla = pq.read_table(io.BytesIO(respuesta.content))
+    assert tabla.num_rows == FILAS
@@ -0,0 +1,85 @@
+"""
+Pruebas de ETag / GET condicional en los endpoints de datos de mercado.
+La versión de mercado y las consultas a la base se reemplazan por
+valores fijos.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from routers import dolar
+from utils import http_cache
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    estado = {"version": 3, "consultas": 0}
+    actualizado = datetime(2025, 11, 3, 14, 30, tzinfo=timezone.utc)
+
+    def obtener_version(fuente):
+        return estado["version"], actualizado
+
+    def obtener_ultimo_valor_dolar():
+        estado["consultas"] += 1
+        return 1450.0
+
+    monkeypatch.setattr(http_cache, "obtener_version", obtener_version)
+    monkeypatch.setattr(dolar, "obtener_ultimo_valor_dolar", obtener_ultimo_valor_dolar)
+
+    app = FastAPI()
+    app.include_router(dolar.router)
+    return TestClient(app), estado
+
+
+def test_etag_y_304_sin_consultar(cliente):
+    client, estado = cliente
+
+    respuesta = client.get("/dolar/")
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"] == '"dolar-3"'
+    assert respuesta.headers["last-modified"] == "Mon, 03 Nov 2025 14:30:00 GMT"
+    assert respuesta.headers["cache-control"] == "public, max-age=60"
+
+    respuesta = client.get("/dolar/", headers={"If-None-Match": '"dolar-3"'})
+    assert respuesta.status_code == 304
+    assert respuesta.content == b""
+    assert respuesta.headers["etag"] == '"dolar-3"'
+    assert estado["consultas"] == 1
+
+    respuesta = client.get("/dolar/", headers={"If-Modified-Since": "Mon, 03 Nov 2025 15:00:00 GMT"})
+    assert respuesta.status_code == 304
+
+
+def test_nueva_version_invalida_etag(cliente):
+    client, estado = cliente
+    estado["version"] = 4
+
+    respuesta = client.get("/dolar/", headers={"If-None-Match": '"dolar-3"'})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"] == '"dolar-4"'
+
+
+def test_sin_version_no_hay_etag(cliente):
+    client, estado = cliente
+    estado["version"] = 0
+
+    respuesta = client.get("/dolar/", headers={"If-None-Match": "*"})
+    assert respuesta.status_code == 200
+    assert "etag" not in respuesta.headers
+    assert respuesta.headers["cache-control"] == "no-cache"
+
+
+def test_last_modified_en_gmt_con_otra_zona(monkeypatch):
+    # TIMESTAMPTZ leído con la sesión en hora de Buenos Aires
+    buenos_aires = timezone(timedelta(hours=-3))
+    actualizado = datetime(2025, 11, 3, 11, 30, tzinfo=buenos_aires)
+    monkeypatch.setattr(http_cache, "obtener_version", lambda fuente: (3, actualizado))
+    cabeceras = http_cache.cabeceras_mercado("dolar")
+    assert cabeceras["Last-Modified"] == "Mon, 03 Nov 2025 14:30:00 GMT"
+    # El texto ISO de SQLite también se acepta
+    monkeypatch.setattr(http_cache, "obtener_version",
+                        lambda fuente: (3, "2025-11-03 14:30:00+00:00"))
+    assert http_cache.cabeceras_mercado("dolar") == cabeceras
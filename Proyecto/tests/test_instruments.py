@@ -126,4 +126,16 @@ def test_bono_rendimiento_vs_banda_sin_banda():
          patch("models.instruments.obtener_dolar_oficial", return_value=350):
         resultado = bono.rendimiento_vs_banda(10000)
 
-    assert resultado is None
\ No newline at end of file
+    assert resultado is None
+
+
+def test_instrumentos_con_slots():
+    """Los instrumentos no tienen __dict__: solo los atributos declarados."""
+    pf = PlazoFijo.from_supabase_row({"banco": "Banco Test", "tasa_pct": "40.5",
+                                      "monto_inicial": 1000, "dolar_equilibrio": 1500})
+    assert (pf.monto_inicial, pf.dolar_equilibrio, pf.valor_dolar) == (1000.0, 1500.0, None)
+    bono = Bono("AL30", "USD", ultimo="64,0")
+    for instrumento in (pf, bono):
+        assert not hasattr(instrumento, "__dict__")
+        with pytest.raises(AttributeError):
+            instrumento.otro_atributo = 1
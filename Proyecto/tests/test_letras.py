@@ -0,0 +1,99 @@
+"""
+Pruebas de Letra y de /letras/calcular: la curva vectorizada tiene que
+dar lo mismo que Letra letra por letra.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from datetime import date, timedelta
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from factory.fixed_income_factory import FixedIncomeInstrumentFactory
+from models import instruments
+from models.instruments import Letra
+from routers import letras
+from utils import curva_letras
+from utils.datos_mercado import CircuitoBreaker, FuenteMercado
+
+HOY = date.today()
+DOLAR = 1450.0
+LETRAS = [
+    # LEDE cada 1000 VN, con descuento
+    {"nombre": "S30N6", "moneda": "ARS", "ultimo": 985.0, "dia_pct": 0.05, "mes_pct": 1.9,
+     "anio_pct": 28.0, "fecha_vencimiento": str(HOY + timedelta(days=45))},
+    # LECAP que capitaliza (precio > VN): se estima con los rendimientos
+    {"nombre": "S31M7", "moneda": "ARS", "ultimo": 108.4, "dia_pct": 0.08, "mes_pct": 2.1,
+     "anio_pct": 30.0, "fecha_vencimiento": str(HOY + timedelta(days=160))},
+    # Letra en USD cada 100 VN
+    {"nombre": "D31D7", "moneda": "USD", "ultimo": 94.6, "dia_pct": None, "mes_pct": 0.4,
+     "anio_pct": 5.0, "fecha_vencimiento": str(HOY + timedelta(days=400))},
+    # Vencida: no se informa
+    {"nombre": "S31O5", "moneda": "ARS", "ultimo": 999.0, "dia_pct": 0.0, "mes_pct": 0.0,
+     "anio_pct": 0.0, "fecha_vencimiento": str(HOY - timedelta(days=10))},
+    # Fecha mal cargada: se omite sin romper la curva
+    {"nombre": "S3X00", "moneda": "ARS", "ultimo": 990.0, "dia_pct": 0.0, "mes_pct": 0.0,
+     "anio_pct": 0.0, "fecha_vencimiento": "2026-13-45"},
+]
+
+
+def _banda(mes=None):
+    return (1000.0, 1700.0) if mes is None or mes < "2027-06" else (1100.0, 1900.0)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(curva_letras, "fuente_letras", FuenteMercado("letras", lambda: LETRAS, CircuitoBreaker()))
+    monkeypatch.setattr(curva_letras, "obtener_dolar_oficial", lambda: DOLAR)
+    monkeypatch.setattr(curva_letras, "obtener_versiones", lambda: {})
+    monkeypatch.setattr(curva_letras, "obtener_banda_cambiaria", _banda)
+    monkeypatch.setattr(instruments, "obtener_banda_cambiaria", _banda)
+    curva_letras.cache_curva_letras.limpiar()
+    app = FastAPI()
+    app.include_router(letras.router)
+    yield TestClient(app)
+    curva_letras.cache_curva_letras.limpiar()
+
+
+def test_letra_descuento():
+    letra = FixedIncomeInstrumentFactory().crear_instrumento(
+        "letra", "S30N6", "ARS", ultimo=985.0,
+        fecha_vencimiento=HOY + timedelta(days=45)
+    )
+    assert isinstance(letra, Letra)
+    assert letra.valor_nominal == 1000.0
+    tasas = letra.tasas()
+    assert tasas["metodo"] == "descuento"
+    assert tasas["factor"] == pytest.approx(1000 / 985)
+    assert tasas["tna_pct"] == round((1000 / 985 - 1) * 365 / 45 * 100, 2)
+    assert tasas["tasa_descuento_pct"] == round(0.015 * 365 / 45 * 100, 2)
+    assert Letra("S31O5", "ARS", 999.0, HOY - timedelta(days=1)).calcular_rendimiento(1000) is None
+
+
+@pytest.mark.parametrize("moneda_inversion", ["ARS", "USD"])
+def test_curva_coincide_con_letra(client, moneda_inversion):
+    respuesta = client.get("/letras/calcular",
+                           params={"monto": 100000, "moneda_inversion": moneda_inversion})
+    assert respuesta.status_code == 200
+    resultados = {r["letra"]: r for r in respuesta.json()["letras"]}
+    assert set(resultados) == {"S30N6", "S31M7", "D31D7"}
+
+    for datos in LETRAS[:3]:
+        letra = Letra(**datos)
+        letra.actualizar(DOLAR)
+        monto = 100000
+        if letra.moneda == "ARS" and moneda_inversion == "USD":
+            monto *= DOLAR
+        elif letra.moneda == "USD" and moneda_inversion == "ARS":
+            monto /= DOLAR
+        esperado = letra.calcular_rendimiento(monto, DOLAR)
+        vs_banda = letra.rendimiento_vs_banda(monto)
+        obtenido = resultados[letra.nombre]
+
+        for campo in ("dias_al_vencimiento", "metodo", "tna_pct", "tea_pct", "tem_pct",
+                      "tasa_descuento_pct", "monto_final", "ganancia"):
+            assert obtenido[campo] == esperado[campo], campo
+        assert obtenido["usd_invertidos"] == esperado.get("usd_invertidos")
+        for campo in ("monto_final_pesos", "factor_ars", "monto_final_usd_techo",
+                      "dolar_equilibrio", "mes_banda_usado"):
+            assert obtenido[campo] == vs_banda[campo], campo
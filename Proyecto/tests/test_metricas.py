@@ -0,0 +1,67 @@
+"""
+Pruebas del middleware de métricas y de su exportación en
+formato Prometheus: conteo por ruta, errores, consultas a la base
+por request y percentiles.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from utils.metricas import MiddlewareMetricas, RegistroMetricas, instrumentar_engine
+
+registro = RegistroMetricas()
+engine_prueba = create_engine("sqlite://")
+instrumentar_engine(engine_prueba, registro)
+
+app = FastAPI()
+app.add_middleware(MiddlewareMetricas, registro=registro)
+
+
+@app.get("/items/{item_id}")
+def leer_item(item_id: int):
+    # Endpoint sincrónico: corre en el pool de threads
+    with engine_prueba.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    return {"id": item_id}
+
+
+@app.get("/falla")
+def falla():
+    raise HTTPException(status_code=503, detail="no disponible")
+
+
+client = TestClient(app)
+
+
+def test_metricas_por_ruta_y_consultas_db():
+    for i in range(3):
+        assert client.get(f"/items/{i}").status_code == 200
+    assert client.get("/falla").status_code == 503
+    assert client.get("/no-existe").status_code == 404
+
+    texto = registro.exportar_prometheus()
+
+    # Una sola serie para la plantilla, no una por item_id
+    assert 'cotizar_requests_total{metodo="GET",ruta="/items/{item_id}",estado="200"} 3' in texto
+    assert 'cotizar_requests_errores_total{metodo="GET",ruta="/falla"} 1' in texto
+    assert 'ruta="sin_ruta",estado="404"' in texto
+    assert 'cotizar_request_db_consultas_total{metodo="GET",ruta="/items/{item_id}"} 6' in texto
+    assert 'cotizar_requests_en_curso{metodo="GET",ruta="/items/{item_id}"} 0' in texto
+    assert 'cuantil="0.99"' in texto
+    assert 'cotizar_request_duracion_segundos_count{metodo="GET",ruta="/items/{item_id}"} 3' in texto
+
+
+def test_consulta_fallida_no_deja_inicios_en_la_conexion():
+    consultas = registro.consultas_db
+    with engine_prueba.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM no_existe"))
+        conn.execute(text("SELECT 1"))
+        assert not conn.info.get("metricas_inicio")
+    assert registro.consultas_db == consultas + 1
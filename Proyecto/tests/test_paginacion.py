@@ -0,0 +1,80 @@
+"""
+Pruebas de la paginación por cursor y selección de columnas
+(utils/paginacion.py) en /plazo fijo/instrumentos/plazos-fijos/bancos.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+from routers import crear_plazo_fijo
+from utils import http_cache
+from utils.trazador_sql import instrumentar_engine, limitar_consultas
+
+RUTA = "/plazo fijo/instrumentos/plazos-fijos/bancos"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _adjuntar(conexion, _):
+        conexion.execute("ATTACH DATABASE ':memory:' AS datos_financieros")
+
+    instrumentar_engine(engine)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE datos_financieros.plazos_fijos (
+                id INTEGER PRIMARY KEY, banco TEXT, plazo TEXT, tasa_pct REAL
+            )
+        """))
+        conn.execute(
+            text("INSERT INTO datos_financieros.plazos_fijos (banco, plazo, tasa_pct) "
+                 "VALUES (:banco, '30 días', :tasa)"),
+            [{"banco": f"Banco {i:02d}", "tasa": 20 + i} for i in range(7)]
+        )
+
+    monkeypatch.setattr(crear_plazo_fijo, "engine", engine)
+    monkeypatch.setattr(http_cache, "obtener_version", lambda fuente: (0, None))
+    app = FastAPI()
+    app.include_router(crear_plazo_fijo.router)
+    return TestClient(app)
+
+
+def test_recorre_todas_las_paginas(client):
+    bancos, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        respuesta = client.get(RUTA, params=params)
+        assert respuesta.status_code == 200
+        cuerpo = respuesta.json()
+        bancos += cuerpo["bancos"]
+        cursor = cuerpo["siguiente_cursor"]
+        assert "x-siguiente-cursor" not in respuesta.headers
+        if cursor is None:
+            break
+    assert [b["banco"] for b in bancos] == [f"Banco {i:02d}" for i in range(7)]
+    assert set(bancos[0]) == {"banco", "tasa_pct"}
+
+
+def test_fields_se_aplica_en_el_select(client):
+    with limitar_consultas(1) as traza:
+        respuesta = client.get(RUTA, params={"fields": "banco", "limit": 2})
+    assert respuesta.json()["bancos"] == [{"banco": "Banco 00"}, {"banco": "Banco 01"}]
+    assert "tasa_pct" not in next(iter(traza.formas))
+
+    assert client.get(RUTA, params={"fields": "banco,clave"}).status_code == 400
+
+
+def test_sin_limit_devuelve_todo(client):
+    respuesta = client.get(RUTA)
+    assert len(respuesta.json()["bancos"]) == 7
+    assert respuesta.json()["siguiente_cursor"] is None
@@ -0,0 +1,118 @@
+"""
+Pruebas del perfilado de requests a pedido: solo para administradores,
+y el perfil queda guardado con su nombre en el header X-Perfil.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import threading
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from auth import auth_service
+from models.user import UsuarioPublico
+from utils import perfilador
+
+app = FastAPI()
+app.add_middleware(perfilador.MiddlewarePerfilador)
+
+
+@app.get("/lento")
+def lento():
+    fin = time.perf_counter() + 0.05
+    total = 0
+    while time.perf_counter() < fin:
+        total += 1
+    return {"total": total}
+
+
+@app.get("/otro")
+def otro():
+    fin = time.perf_counter() + 0.3
+    while time.perf_counter() < fin:
+        pass
+    return {}
+
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def usuarios_falsos(monkeypatch, tmp_path):
+    tipos = {"token-admin": "admin", "token-normal": "normal"}
+
+    def usuario_desde_token(token):
+        return UsuarioPublico(nombre_usuario=token, tipo=tipos[token])
+
+    monkeypatch.setattr(auth_service, "usuario_desde_token", usuario_desde_token)
+    monkeypatch.setattr(perfilador, "PERFILES_DIR", str(tmp_path))
+
+
+def test_sin_flag_no_perfila():
+    respuesta = client.get("/lento")
+    assert respuesta.status_code == 200
+    assert "x-perfil" not in respuesta.headers
+
+
+def test_usuario_normal_no_puede_perfilar():
+    respuesta = client.get(
+        "/lento?perfilar=1", headers={"Authorization": "Bearer token-normal"}
+    )
+    assert respuesta.status_code == 403
+
+
+@pytest.mark.parametrize("modo", ["muestreo", "cprofile"])
+def test_admin_obtiene_perfil_guardado(modo):
+    respuesta = client.get(
+        "/lento",
+        headers={"Authorization": "Bearer token-admin", "X-Perfilar": modo},
+    )
+    assert respuesta.status_code == 200
+    ruta = perfilador.ruta_perfil(respuesta.headers["x-perfil"])
+    assert ruta is not None and os.path.getsize(ruta) > 0
+
+
+def test_muestreo_registra_la_funcion_del_endpoint():
+    respuesta = client.get(
+        "/lento?perfilar=muestreo", headers={"Authorization": "Bearer token-admin"}
+    )
+    with open(perfilador.ruta_perfil(respuesta.headers["x-perfil"]), encoding="utf-8") as f:
+        assert "lento (test_perfilador.py" in f.read()
+
+
+def test_muestreo_no_incluye_otros_requests():
+    concurrente = threading.Thread(target=client.get, args=("/otro",))
+    concurrente.start()
+    time.sleep(0.05)
+    respuesta = client.get(
+        "/lento?perfilar=muestreo", headers={"Authorization": "Bearer token-admin"}
+    )
+    concurrente.join()
+    with open(perfilador.ruta_perfil(respuesta.headers["x-perfil"]), encoding="utf-8") as f:
+        pilas = f.read()
+    assert "lento (test_perfilador.py" in pilas
+    assert "otro (test_perfilador.py" not in pilas
+
+
+def test_un_solo_cprofile_a_la_vez():
+    headers = {"Authorization": "Bearer token-admin", "X-Perfilar": "cprofile"}
+    with perfilador._lock_cprofile:
+        assert client.get("/lento", headers=headers).status_code == 409
+    assert client.get("/lento", headers=headers).status_code == 200
+
+
+def test_rota_los_perfiles_viejos(monkeypatch, tmp_path):
+    monkeypatch.setattr(perfilador, "MAXIMO_PERFILES", 2)
+    viejo = tmp_path / "viejo.prof"
+    viejo.write_text("x")
+    os.utime(viejo, (time.time() - 30 * 86400,) * 2)
+    (tmp_path / "notas.md").write_text("no es un perfil")
+
+    nombres = []
+    for _ in range(3):
+        respuesta = client.get("/lento", headers={"Authorization": "Bearer token-admin",
+                                                  "X-Perfilar": "muestreo"})
+        nombres.append(respuesta.headers["x-perfil"])
+        time.sleep(0.01)
+    assert sorted(os.listdir(tmp_path)) == sorted(nombres[1:] + ["notas.md"])
@@ -0,0 +1,148 @@
+"""
+Pruebas del almacén de sesiones y del cache LRU:
+validación en memoria, cache negativo de tokens revocados,
+vencimiento y purga de sesiones.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+from models.user import Session
+from auth.sesiones import AlmacenSesiones
+from utils.cache_lru import CacheLRU
+
+
+class DBSesionesFalsa:
+    """Reemplazo en memoria de DataBaseUsuario (solo sesiones)."""
+
+    def __init__(self):
+        self.sesiones = {}
+        self.consultas = 0
+
+    def guardar_sesion(self, sesion):
+        self.sesiones[sesion.token] = sesion
+        return True
+
+    def consultar_sesion(self, token):
+        self.consultas += 1
+        return self.sesiones.get(token)
+
+    def eliminar_sesiones_de_usuario(self, usuario_id):
+        tokens = [t for t, s in self.sesiones.items() if s.usuario_id == usuario_id]
+        for t in tokens:
+            del self.sesiones[t]
+        return tokens
+
+    def eliminar_sesiones_expiradas(self):
+        vencidas = [t for t, s in self.sesiones.items() if s.expirada()]
+        for t in vencidas:
+            del self.sesiones[t]
+        return len(vencidas)
+
+
+def _sesion(token, usuario_id=1, horas=2):
+    ahora = datetime.now(timezone.utc)
+    return Session(token, usuario_id, ahora, ahora + timedelta(hours=horas))
+
+
+def test_cache_lru_descarta_el_menos_usado():
+    cache = CacheLRU(2)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    cache.obtener("a")
+    cache.guardar("c", 3)
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") == 1
+    assert cache.obtener("c") == 3
+
+
+def test_session_acepta_fechas_en_texto():
+    sesion = Session("t", 1, "2025-11-01 10:00:00.123456", "2025-11-01 12:00:00")
+    assert sesion.fecha_expiracion.tzinfo is not None
+    assert sesion.expirada()
+
+
+def test_validar_resuelve_en_memoria():
+    db = DBSesionesFalsa()
+    almacen = AlmacenSesiones(db)
+    almacen.registrar(_sesion("tok"))
+
+    for _ in range(5):
+        assert almacen.validar("tok") is not None
+    assert db.consultas == 0
+
+
+def test_token_desconocido_queda_en_cache_negativo():
+    db = DBSesionesFalsa()
+    almacen = AlmacenSesiones(db)
+
+    assert almacen.validar("inexistente") is None
+    assert almacen.validar("inexistente") is None
+    assert db.consultas == 1
+
+
+def test_revocar_usuario_invalida_sus_tokens():
+    db = DBSesionesFalsa()
+    almacen = AlmacenSesiones(db)
+    almacen.registrar(_sesion("tok1", usuario_id=7))
+    almacen.registrar(_sesion("tok2", usuario_id=8))
+
+    assert almacen.revocar_usuario(7)
+    assert almacen.validar("tok1") is None
+    assert almacen.validar("tok2") is not None
+    assert db.consultas == 0
+
+
+def test_sesion_vencida_no_es_valida_y_se_purga():
+    db = DBSesionesFalsa()
+    almacen = AlmacenSesiones(db)
+    db.guardar_sesion(_sesion("viejo", horas=-1))
+
+    assert almacen.validar("viejo") is None
+    assert almacen.purgar_expiradas() == 1
+    assert db.sesiones == {}
+
+
+# -------------------- Cache de tokens verificados --------------------
+
+class DBUsuariosFalsa(DBSesionesFalsa):
+    def __init__(self):
+        super().__init__()
+        self.busquedas = 0
+
+    def buscar_usuario_por_nombre(self, nombre_usuario):
+        self.busquedas += 1
+        return {"username": nombre_usuario, "full_name": "Test", "tipo": "normal"}
+
+
+def _preparar_auth(monkeypatch):
+    from auth import auth_service
+    db = DBUsuariosFalsa()
+    almacen = AlmacenSesiones(db)
+    monkeypatch.setattr(auth_service, "obtener_db_usuarios", lambda: db)
+    monkeypatch.setattr(auth_service, "almacen_sesiones", almacen)
+    auth_service.cache_tokens.limpiar()
+    token = auth_service.crear_token_acceso({"sub": "testuser", "tipo": "normal"})
+    almacen.registrar(_sesion(token))
+    return auth_service, almacen, db, token
+
+
+def test_token_verificado_se_sirve_desde_cache(monkeypatch):
+    auth_service, _, db, token = _preparar_auth(monkeypatch)
+
+    for _ in range(3):
+        usuario = auth_service.usuario_desde_token(token)
+    assert usuario.nombre_usuario == "testuser"
+    assert db.busquedas == 1
+
+
+def test_cerrar_sesion_invalida_token_cacheado(monkeypatch):
+    auth_service, almacen, _, token = _preparar_auth(monkeypatch)
+    auth_service.usuario_desde_token(token)
+
+    almacen.revocar_usuario(1)
+    assert auth_service.invalidar_tokens_usuario("testuser") == 1
+    with pytest.raises(HTTPException):
+        auth_service.usuario_desde_token(token)
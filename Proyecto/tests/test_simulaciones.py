@@ -0,0 +1,261 @@
+"""
+Pruebas de /simulaciones: los resultados vectorizados tienen que
+coincidir con los de PlazoFijo y Bono, la foto de mercado se lee una
+sola vez, el ranking coincide con ordenar todos los resultados y los
+escenarios del dólar respetan la banda y se pueden repetir. La grilla
+de sensibilidad coincide con PlazoFijo y responde 304 sin cambios.
+Usa una base SQLite en memoria.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+from models import instruments
+from models.instruments import Bono, PlazoFijo
+from routers import simulaciones
+from utils import escenarios_dolar, http_cache, snapshot_mercado, version_mercado, trazador_sql
+from utils.escenarios_dolar import PERCENTILES, evaluar_instrumentos, simular_dolar_final
+from utils.trazador_sql import limitar_consultas
+
+BONOS = [
+    ("AL30", "USD", 0.1, 1.0, 20.0, "2030-07-09"),
+    ("TX26", "ARS", 0.05, 2.0, 30.0, "2026-11-09"),
+    ("S31G6", "ARS", None, 1.8, None, None),
+]
+BANDAS = {"2025-03": (951.0, 1471.0), "2026-12": (900.0, 1600.0), "2030-08": (800.0, 2000.0)}
+DOLAR = 1450.0
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _adjuntar_esquemas(conexion, _):
+        for esquema in ("datos_financieros", "instrumentos_usuarios"):
+            conexion.execute(f"ATTACH DATABASE ':memory:' AS {esquema}")
+        conexion.create_function("NOW", 0, lambda: "2025-11-01 00:00:00+00:00")
+
+    trazador_sql.instrumentar_engine(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE datos_financieros.dolar (id INTEGER PRIMARY KEY, tipo TEXT, venta REAL)"))
+        conn.execute(text("INSERT INTO datos_financieros.dolar (tipo, venta) VALUES ('DÓLAR OFICIAL', :v)"),
+                     {"v": DOLAR})
+        conn.execute(text("CREATE TABLE datos_financieros.plazos_fijos "
+                          "(id INTEGER PRIMARY KEY, banco TEXT, plazo TEXT, tasa_pct REAL)"))
+        conn.execute(text("INSERT INTO datos_financieros.plazos_fijos (banco, tasa_pct) "
+                          "VALUES ('Nación', 37.0), ('Sin tasa', NULL), ('Galicia', 35.5)"))
+        conn.execute(text("CREATE TABLE datos_financieros.bonos (nombre TEXT, moneda TEXT, "
+                          "dia_pct REAL, mes_pct REAL, anio_pct REAL, fecha_vencimiento TEXT)"))
+        conn.execute(text("INSERT INTO datos_financieros.bonos VALUES (:n, :m, :d, :me, :a, :f)"),
+                     [dict(zip(("n", "m", "d", "me", "a", "f"), b)) for b in BONOS])
+        conn.execute(text("CREATE TABLE datos_financieros.bandas_cambiarias "
+                          "(id INTEGER PRIMARY KEY, fecha TEXT, banda_inferior REAL, banda_superior REAL)"))
+        conn.execute(text("INSERT INTO datos_financieros.bandas_cambiarias "
+                          "(fecha, banda_inferior, banda_superior) VALUES (:f, :i, :s)"),
+                     [{"f": f, "i": i, "s": s} for f, (i, s) in BANDAS.items()])
+        conn.execute(text("CREATE TABLE instrumentos_usuarios.plazos_fijos_usuarios ("
+                          "usuario_username TEXT, banco TEXT, monto_inicial REAL, tasa_pct REAL, "
+                          "monto_final_pesos REAL, dolar_actual REAL, dolar_equilibrio REAL, "
+                          "fecha_calculo TEXT)"))
+
+    for modulo in (simulaciones, snapshot_mercado, version_mercado):
+        monkeypatch.setattr(modulo, "engine", engine)
+    version_mercado.limpiar_cache_versiones()
+    snapshot_mercado.limpiar_cache_snapshot()
+
+    app = FastAPI()
+    app.include_router(simulaciones.router)
+    yield TestClient(app), engine
+    snapshot_mercado.limpiar_cache_snapshot()
+
+
+def test_simulacion_coincide_con_los_instrumentos(client, monkeypatch):
+    client, _ = client
+    monkeypatch.setattr(instruments, "obtener_banda_cambiaria",
+                        lambda mes=None: BANDAS.get(mes, BANDAS["2030-08"] if mes is None else (None, None)))
+    cuerpo = {"montos": [10000, 250000], "dias": [30, 90], "monedas": ["ARS", "USD"]}
+    respuesta = client.post("/simulaciones/calcular", json=cuerpo)
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+
+    pf = datos["plazos_fijos"]
+    # Los bancos sin tasa quedan afuera
+    assert pf["bancos"] == ["Nación", "Galicia"]
+    assert len(pf["escenarios"]) == 4
+    for escenario in pf["escenarios"]:
+        for k, tna in enumerate(pf["tna"]):
+            esperado = PlazoFijo(pf["bancos"][k], tna, escenario["dias"]).calcular_rendimiento(
+                escenario["monto_inicial"])
+            assert escenario["tea"][k] == esperado["tea"]
+            assert escenario["monto_final_pesos"][k] == esperado["monto_final_pesos"]
+            assert escenario["ganancia_pesos"][k] == pytest.approx(esperado["ganancia_pesos"])
+
+    bonos = datos["bonos"]
+    assert len(bonos["escenarios"]) == 8
+    for escenario in bonos["escenarios"]:
+        for k, (nombre, moneda, dia, mes, anio, venc) in enumerate(BONOS):
+            # Como /bonos/calcular: los rendimientos faltantes valen 0
+            bono = Bono(nombre, moneda, dia_pct=dia or 0, mes_pct=mes or 0, anio_pct=anio or 0)
+            bono.actualizar(DOLAR)
+            monto = escenario["monto_inicial"]
+            if moneda == "ARS" and escenario["moneda_inversion"] == "USD":
+                monto *= DOLAR
+            elif moneda == "USD" and escenario["moneda_inversion"] == "ARS":
+                monto /= DOLAR
+            rendimiento = bono.calcular_rendimiento(monto, DOLAR)
+            vs_banda = bono.rendimiento_vs_banda(
+                monto, dias=escenario["dias"],
+                fecha_inicio=date.fromisoformat(venc) if venc else None
+            )
+            assert bonos["r_anual_pct"][k] == rendimiento["r_anual_pct"]
+            assert escenario["usd_invertidos"][k] == rendimiento.get("usd_invertidos")
+            assert escenario["mes_banda_usado"][k] == vs_banda["mes_banda_usado"]
+            for campo in ("monto_final_pesos", "factor_ars", "monto_final_usd_techo", "dolar_equilibrio"):
+                assert escenario[campo][k] == pytest.approx(vs_banda[campo], abs=0.011)
+
+
+def test_simulacion_lee_el_mercado_una_vez_y_no_guarda(client):
+    client, engine = client
+    cuerpo = {"montos": [1000, 2000, 3000], "dias": [30, 60, 90, 180], "instrumentos": ["plazos_fijos"]}
+    # Primera llamada: versiones + 4 tablas de la foto de mercado
+    with limitar_consultas(1 + 4):
+        assert client.post("/simulaciones/calcular", json=cuerpo).status_code == 200
+    # Con la foto cacheada no se vuelve a leer la base
+    with limitar_consultas(0):
+        assert client.post("/simulaciones/calcular", json=cuerpo).status_code == 200
+
+    with engine.connect() as conn:
+        guardados = conn.execute(text(
+            "SELECT COUNT(*) FROM instrumentos_usuarios.plazos_fijos_usuarios")).scalar()
+    assert guardados == 0
+
+    assert client.post("/simulaciones/calcular",
+                       json={**cuerpo, "guardar": True}).status_code == 400
+    assert client.post("/simulaciones/calcular",
+                       json={**cuerpo, "guardar": True, "usuario_username": "ana"}).status_code == 200
+    with engine.connect() as conn:
+        guardados = conn.execute(text(
+            "SELECT COUNT(*) FROM instrumentos_usuarios.plazos_fijos_usuarios")).scalar()
+    assert guardados == 3 * 4 * 2
+
+
+@pytest.mark.parametrize("criterio", ["rendimiento", "dolar_equilibrio"])
+def test_ranking_coincide_con_ordenar_todo(client, criterio):
+    client, _ = client
+    simulacion = client.post("/simulaciones/calcular",
+                             json={"montos": [10000], "dias": [90]}).json()
+    campo = "monto_final_pesos" if criterio == "rendimiento" else "dolar_equilibrio"
+    pf, bonos = simulacion["plazos_fijos"], simulacion["bonos"]
+    todos = [(v, n) for v, n in zip(pf["escenarios"][0][campo], pf["bancos"])]
+    todos += [(v, n) for v, n in zip(bonos["escenarios"][0][campo], bonos["bonos"]) if v is not None]
+    esperados = [n for _, n in sorted(todos, reverse=True)[:3]]
+
+    respuesta = client.get("/simulaciones/ranking",
+                           params={"monto": 10000, "dias": 90, "criterio": criterio, "k": 3})
+    assert respuesta.status_code == 200
+    assert [r["nombre"] for r in respuesta.json()["resultados"]] == esperados
+
+
+def test_escenarios_dolar_acotados_y_repetibles(monkeypatch):
+    pisos = np.full(60, 1000.0)
+    techos = np.linspace(1500.0, 1560.0, 60)
+    finales = simular_dolar_final(1450.0, pisos, techos, 0.6, 0.1, 5000, semilla=7, por_bloque=1000)
+    assert len(finales) == 5000
+    assert finales.min() >= 1000.0 and finales.max() <= 1560.0
+    # Misma semilla, mismo resultado, en el proceso o con un pool
+    monkeypatch.setattr(escenarios_dolar, "MINIMO_TRAYECTORIAS_PROCESOS", 0)
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        con_pool = simular_dolar_final(1450.0, pisos, techos, 0.6, 0.1, 5000, semilla=7,
+                                       pool=pool, por_bloque=1000)
+    assert np.array_equal(finales, con_pool)
+
+    factores = np.array([1.01, 1.03, 1.08])
+    resultado = evaluar_instrumentos(finales, 1450.0, factores)
+    for i, factor in enumerate(factores):
+        usd = factor * 1450.0 / finales
+        assert resultado["prob_ganarle_al_dolar"][i] == pytest.approx(np.mean(usd > 1))
+        assert resultado["usd_final_esperado"][i] == pytest.approx(usd.mean())
+        assert resultado["usd_final"][i] == pytest.approx(np.percentile(usd, PERCENTILES), rel=1e-3)
+
+
+def test_endpoint_escenarios(client):
+    client, _ = client
+    params = {"monto": 145000, "dias": 90, "trayectorias": 2000, "semilla": 1}
+    respuesta = client.get("/simulaciones/escenarios", params=params)
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    assert datos["usd_invertidos"] == 100.0
+    assert [i["nombre"] for i in datos["instrumentos"]] == ["Nación", "Galicia", "TX26", "S31G6"]
+    for instrumento in datos["instrumentos"]:
+        assert 0 <= instrumento["prob_ganarle_al_dolar"] <= 1
+        percentiles = list(instrumento["usd_final"].values())
+        assert percentiles == sorted(percentiles)
+    assert client.get("/simulaciones/escenarios", params=params).json() == datos
+
+    # Límites públicos de CPU por request
+    for exceso in ({"trayectorias": 100_001}, {"dias": 366}):
+        assert client.get("/simulaciones/escenarios", params={**params, **exceso}).status_code == 422
+
+
+def test_sensibilidad_grilla_y_etag(client, monkeypatch):
+    client, _ = client
+    params = {"tipo": "plazo_fijo", "nombre": "Galicia", "monto": 100000,
+              "dias_desde": 30, "dias_hasta": 90, "dias_paso": 30, "desde": 30, "hasta": 40,
+              "puntos": 3}
+    respuesta = client.get("/simulaciones/sensibilidad", params=params)
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    assert datos["dias"] == [30, 60, 90] and datos["valores"] == [30.0, 35.0, 40.0]
+    for i, dias in enumerate(datos["dias"]):
+        for j, tna in enumerate(datos["valores"]):
+            esperado = PlazoFijo("Galicia", tna, dias).calcular_rendimiento(100000)
+            assert datos["monto_final_pesos"][i][j] == pytest.approx(esperado["monto_final_pesos"], abs=0.011)
+            assert datos["dolar_equilibrio"][i][j] == pytest.approx(
+                esperado["monto_final_pesos"] * DOLAR / 100000, abs=0.011)
+
+    por_dolar = client.get("/simulaciones/sensibilidad", params={
+        "tipo": "bono", "nombre": "TX26", "eje": "dolar", "dias_hasta": 60, "puntos": 2}).json()
+    assert len(por_dolar["monto_final_usd"]) == 2 and len(por_dolar["monto_final_usd"][0]) == 2
+    assert client.get("/simulaciones/sensibilidad",
+                      params={**params, "nombre": "Otro"}).status_code == 404
+
+    # Sin versiones de mercado no hay ETag; con versiones, 304 hasta que cambien
+    assert "ETag" not in respuesta.headers
+    version = {"n": 3}
+    monkeypatch.setattr(http_cache, "obtener_version", lambda fuente: (version["n"], None))
+    etag = client.get("/simulaciones/sensibilidad", params=params).headers["ETag"]
+    condicional = client.get("/simulaciones/sensibilidad", params=params,
+                             headers={"If-None-Match": etag})
+    assert condicional.status_code == 304
+    otros = client.get("/simulaciones/sensibilidad", params={**params, "puntos": 4})
+    assert otros.headers["ETag"] != etag
+    version["n"] = 4
+    assert client.get("/simulaciones/sensibilidad", params=params,
+                      headers={"If-None-Match": etag}).status_code == 200
+
+    # Con el rango de dólar tomado de la banda, el ETag cambia con el día
+    por_banda = {"tipo": "bono", "nombre": "TX26", "eje": "dolar", "dias_hasta": 60, "puntos": 2}
+    respuesta = client.get("/simulaciones/sensibilidad", params=por_banda)
+    etag = respuesta.headers["ETag"]
+    assert "Last-Modified" not in respuesta.headers
+
+    class Manana(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    monkeypatch.setattr(simulaciones, "date", Manana)
+    assert client.get("/simulaciones/sensibilidad", params=por_banda,
+                      headers={"If-None-Match": etag}).status_code == 200
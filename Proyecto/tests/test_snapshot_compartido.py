@@ -0,0 +1,101 @@
+"""
+Pruebas de la foto de mercado compartida en un archivo mapeado: se
+lee igual a la publicada, sin copiar los arrays, y los lectores pasan
+a la versión nueva cuando se reemplaza el archivo.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from datetime import date
+import numpy as np
+import pytest
+from utils import snapshot_compartido, snapshot_mercado
+from utils.curva_bandas import armar_curva_bandas
+from utils.snapshot_mercado import SnapshotMercado
+
+BANDAS = {"2026-10": (900.0, 1580.0), "2026-11": (890.0, 1595.0)}
+
+
+def _foto(version: int, dolar: float) -> SnapshotMercado:
+    tasas = np.array([37.0, 35.5, 39.0])
+    r_anual = np.array([0.21, np.nan, 0.35])
+    return SnapshotMercado(
+        versiones=(version, 2, 3, 1),
+        dolar_oficial=dolar,
+        bancos=["Nación", "Galicia", "Provincia"],
+        tasas_tna=tasas,
+        bonos=["AL30", "TX26", "S31G6"],
+        monedas_bonos=["USD", "ARS", "ARS"],
+        r_anual_bonos=r_anual,
+        vencimientos_bonos=[date(2030, 7, 9), date(2026, 11, 9), None],
+        orden_bancos=np.argsort(-tasas, kind="stable"),
+        orden_bonos=np.argsort(-r_anual, kind="stable"),
+        bandas=BANDAS,
+        banda_ultima=BANDAS["2026-11"],
+        curva_bandas=armar_curva_bandas(BANDAS, BANDAS["2026-11"]),
+    )
+
+
+@pytest.fixture
+def ruta(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "mercado.snap")
+    monkeypatch.setattr(snapshot_compartido, "RUTA_SNAPSHOT_MERCADO", ruta)
+    snapshot_compartido._mapeado.update(identidad=None, snapshot=None, publicado=0.0)
+    return ruta
+
+
+def test_publicar_y_leer(ruta):
+    assert snapshot_compartido.leer_snapshot_compartido() is None
+    original = _foto(1, 1450.0)
+    snapshot_compartido.publicar_snapshot(original)
+
+    leida = snapshot_compartido.leer_snapshot_compartido()
+    for campo in ("versiones", "dolar_oficial", "bancos", "bonos", "monedas_bonos",
+                  "vencimientos_bonos", "bandas", "banda_ultima"):
+        assert getattr(leida, campo) == getattr(original, campo), campo
+    for campo in ("tasas_tna", "r_anual_bonos", "orden_bancos", "orden_bonos"):
+        np.testing.assert_array_equal(getattr(leida, campo), getattr(original, campo))
+        # Apuntan al mapeo del archivo: sin copia y de solo lectura
+        assert not getattr(leida, campo).flags.owndata
+        assert not getattr(leida, campo).flags.writeable
+    assert leida.curva_bandas.banda(date(2026, 10, 16)) == original.curva_bandas.banda(date(2026, 10, 16))
+    # Sin cambios en el archivo se reutiliza el mismo mapeo
+    assert snapshot_compartido.leer_snapshot_compartido() is leida
+
+
+def test_cambio_de_version_y_fallback(ruta, monkeypatch):
+    snapshot_compartido.publicar_snapshot(_foto(1, 1450.0))
+    anterior = snapshot_compartido.leer_snapshot_compartido()
+    snapshot_compartido.publicar_snapshot(_foto(2, 1475.0))
+    nueva = snapshot_compartido.leer_snapshot_compartido()
+    assert nueva.versiones[0] == 2 and nueva.dolar_oficial == 1475.0
+    # La foto anterior sigue siendo válida para quien la tenía
+    assert anterior.dolar_oficial == 1450.0 and anterior.tasas_tna[2] == 39.0
+    assert os.listdir(os.path.dirname(ruta)) == ["mercado.snap"]
+
+    # Con las mismas versiones que la base, obtener_snapshot usa el
+    # archivo sin leer las tablas
+    versiones = {"dolar": (2, None), "plazos_fijos": (2, None),
+                 "bonos": (3, None), "bandas_cambiarias": (1, None)}
+    monkeypatch.setattr(snapshot_mercado, "obtener_versiones", lambda: versiones)
+
+    def sin_base(clave):
+        raise AssertionError("no debería leer las tablas")
+    monkeypatch.setattr(snapshot_mercado, "_leer_snapshot", sin_base)
+    snapshot_mercado.limpiar_cache_snapshot()
+    assert snapshot_mercado.obtener_snapshot() is nueva
+
+    # Un scraper subió la versión sin publicar el archivo: se lee la base
+    versiones["dolar"] = (3, None)
+    desde_base = _foto(3, 1490.0)
+    monkeypatch.setattr(snapshot_mercado, "_leer_snapshot", lambda clave: desde_base)
+    assert snapshot_mercado.obtener_snapshot() is desde_base
+    snapshot_mercado.limpiar_cache_snapshot()
+
+    # Vencida o dañada: se vuelve a la base
+    monkeypatch.setattr(snapshot_compartido, "SEGUNDOS_VIGENCIA_SNAPSHOT", -1)
+    assert snapshot_compartido.leer_snapshot_compartido() is None
+    monkeypatch.setattr(snapshot_compartido, "SEGUNDOS_VIGENCIA_SNAPSHOT", 3600)
+    with open(ruta, "wb") as archivo:
+        archivo.write(b"basura")
+    assert snapshot_compartido.leer_snapshot_compartido() is None
@@ -0,0 +1,91 @@
+"""
+Pruebas del cálculo de TIR y duration: flujos de los bonos
+reestructurados y el resolvedor vectorizado contra cuentas escalares.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from datetime import date
+import numpy as np
+import pytest
+from models.flujos import CONDICIONES, condiciones_de, flujos_condiciones, flujos_de_fondos
+from utils.tir_bonos import armar_curva_tir, filas_curva_tir
+
+HOY = date(2026, 10, 19)
+
+
+def _tir_escalar(precio, flujos):
+    """TIR por bisección, pago por pago."""
+    bajo, alto = -0.9, 10.0
+    for _ in range(200):
+        medio = (bajo + alto) / 2
+        valor = sum(m / (1 + medio) ** ((f - HOY).days / 365) for f, m in flujos)
+        bajo, alto = (medio, alto) if valor > precio else (bajo, medio)
+    return (bajo + alto) / 2
+
+
+@pytest.mark.parametrize("clase", sorted(CONDICIONES))
+def test_condiciones_amortizan_el_100(clase):
+    amortizado = 0.0
+    saldo = 100.0
+    for fecha, monto in flujos_condiciones(CONDICIONES[clase]):
+        tasa = next(t for hasta, t in CONDICIONES[clase].tasas if fecha <= hasta)
+        amortizado += monto - saldo * tasa / 200
+        saldo = 100.0 - amortizado
+    assert amortizado == pytest.approx(100.0)
+    assert condiciones_de("GD" + clase + "D") is CONDICIONES[clase]
+
+
+# Pagos por 100 VN según los prospectos (cupón sobre el saldo + amortización)
+PAGOS_CONOCIDOS = [
+    ("GD30", date(2021, 7, 9), 0.0625),             # 0,125% sobre 100
+    ("GD30", date(2022, 1, 9), 0.25),               # 0,50%
+    ("GD30", date(2024, 7, 9), 0.375 + 4.0),        # 0,75% + 4% de amortización
+    ("GD30", date(2027, 7, 9), 0.21 + 8.0),         # 0,75% sobre 56
+    ("GD30", date(2028, 1, 9), 0.42 + 8.0),         # 1,75% sobre 48
+    ("GD30", date(2030, 7, 9), 0.07 + 8.0),         # 1,75% sobre 8
+    ("AL29", date(2025, 1, 9), 0.5 + 10.0),
+    ("GD35", date(2024, 1, 9), 1.8125),             # 3,625%
+    ("GD35", date(2025, 1, 9), 2.0625),             # 4,125%
+    ("GD35", date(2028, 7, 9), 2.375),              # 4,75%
+    ("GD35", date(2029, 1, 9), 2.5),                # 5%
+    ("AE38", date(2023, 1, 9), 1.9375),             # 3,875%
+    ("GD41", date(2028, 1, 9), 1.75 + 100 / 28),    # 3,5% + 1/28
+    ("GD46", date(2025, 1, 9), 2.0625 + 100 / 44),  # 4,125% + 1/44
+]
+
+
+@pytest.mark.parametrize("nombre, fecha, monto", PAGOS_CONOCIDOS)
+def test_pagos_segun_condiciones_de_emision(nombre, fecha, monto):
+    pagos = dict(flujos_condiciones(condiciones_de(nombre)))
+    assert pagos[fecha] == pytest.approx(monto)
+
+
+def test_tir_coincide_con_el_calculo_escalar():
+    filas = [
+        {"nombre": "GD30D", "moneda": "USD", "ultimo": 66.85, "fecha_vencimiento": "2030-07-09"},
+        {"nombre": "AE38", "moneda": "USD", "ultimo": "75,3", "fecha_vencimiento": "2038-01-09"},
+        {"nombre": "GD46D", "moneda": "USD", "ultimo": 68.9, "fecha_vencimiento": "2046-07-09"},
+        # Bullet cada 1000 VN: TIR cerrada
+        {"nombre": "TX28", "moneda": "ARS", "ultimo": 800.0, "fecha_vencimiento": "2028-07-09"},
+        # Vencido y sin precio
+        {"nombre": "TX26", "moneda": "ARS", "ultimo": 990.0, "fecha_vencimiento": "2026-07-09"},
+        {"nombre": "AL35", "moneda": "USD", "ultimo": None, "fecha_vencimiento": "2035-07-09"},
+    ]
+    curva = armar_curva_tir(filas, hoy=HOY)
+
+    for i, fila in enumerate(filas[:3]):
+        flujos, metodo = flujos_de_fondos(fila["nombre"], None, None, HOY)
+        assert metodo == "condiciones"
+        assert curva.tir[i] == pytest.approx(_tir_escalar(curva.precios[i], flujos), abs=1e-8)
+        plazos = np.array([(f - HOY).days / 365 for f, _ in flujos])
+        descontados = np.array([m for _, m in flujos]) / (1 + curva.tir[i]) ** plazos
+        assert curva.duration[i] == pytest.approx((plazos * descontados).sum() / descontados.sum())
+
+    anios = (date(2028, 7, 9) - HOY).days / 365
+    assert curva.tir[3] == pytest.approx((1000 / 800) ** (1 / anios) - 1)
+    assert curva.duration[3] == pytest.approx(anios)
+
+    resultado = filas_curva_tir(curva)
+    assert resultado[4]["tir_pct"] is None and resultado[4]["flujos_restantes"] == 0
+    assert resultado[5]["tir_pct"] is None and resultado[5]["precio"] is None
@@ -0,0 +1,221 @@
+"""
+Pruebas del trazador de consultas SQL y límites de consultas por
+endpoint, usando una base SQLite en memoria con los mismos esquemas
+que Supabase (usuarios, datos_financieros, instrumentos_usuarios).
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+from models.user import User, UsuarioPublico
+from db.usuarios.users_db import DataBaseUsuario
+from utils import metricas, trazador_sql
+from utils.metricas import RegistroMetricas
+from utils.trazador_sql import forma_consulta, redactar_parametros, limitar_consultas
+
+
+@pytest.fixture
+def engine_sqlite():
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _adjuntar_esquemas(conexion, _):
+        for esquema in ("usuarios", "datos_financieros", "instrumentos_usuarios"):
+            conexion.execute(f"ATTACH DATABASE ':memory:' AS {esquema}")
+        conexion.create_function("NOW", 0, lambda: "2025-11-01 00:00:00+00:00")
+
+    trazador_sql.instrumentar_engine(engine)
+    return engine
+
+
+def test_forma_consulta_agrupa_por_valores():
+    a = forma_consulta("SELECT * FROM t WHERE id = 1 AND nombre = 'ana'")
+    b = forma_consulta("SELECT *  FROM t\n WHERE id = 22 AND nombre = 'beto'")
+    c = forma_consulta("SELECT * FROM t WHERE id = :id AND nombre = :nombre")
+    assert a == b == c == "SELECT * FROM t WHERE id = ? AND nombre = ?"
+
+
+def test_redactar_parametros_no_expone_valores():
+    redactados = redactar_parametros({"username": "ana", "password": "secreta"})
+    assert redactados == {"username": "str", "password": "str"}
+    assert "secreta" not in str(redactar_parametros([{"p": "secreta"}] * 3, executemany=True))
+
+
+def test_actualizar_completo_usa_una_sola_consulta(engine_sqlite):
+    with engine_sqlite.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE usuarios.usuarios (
+                id INTEGER PRIMARY KEY, username TEXT, hashed_password TEXT,
+                full_name TEXT, tipo TEXT, email TEXT, telefono INTEGER
+            )
+        """))
+        conn.execute(text("INSERT INTO usuarios.usuarios (id, username) VALUES (1, 'ana')"))
+
+    db = DataBaseUsuario()
+    db.engine = engine_sqlite
+    usuario = User(email="ana@test.com", nombre="ana2", tipo="admin")
+    usuario.id = 1
+    usuario.telefono = 1234
+
+    with limitar_consultas(1):
+        assert db.actualizar_completo(usuario)
+
+
+def test_calcular_bonos_no_consulta_por_bono(engine_sqlite, monkeypatch):
+    from routers import crear_bono
+    from utils import (obtener_bonos, obtener_banda_cambiaria, obtener_ultimo_valor_dolar,
+                       version_mercado, analitica_instrumentos)
+
+    with engine_sqlite.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE datos_financieros.bonos (
+                nombre TEXT, moneda TEXT, ultimo REAL, dia_pct REAL,
+                mes_pct REAL, anio_pct REAL, fecha_vencimiento TEXT
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO datos_financieros.bonos VALUES
+            ('AL30', 'USD', 60.0, 0.1, 1.0, 20.0, '2030-07-09'),
+            ('GD30', 'USD', 61.0, 0.2, 1.5, 22.0, '2030-07-09'),
+            ('TX26', 'ARS', 1000.0, 0.05, 2.0, 30.0, '2026-11-09'),
+            ('T2X5', 'ARS', 900.0, 0.02, 1.2, 25.0, '2025-02-14')
+        """))
+        conn.execute(text("""
+            CREATE TABLE datos_financieros.dolar (
+                id INTEGER PRIMARY KEY, tipo TEXT, compra REAL, venta REAL, variacion REAL
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO datos_financieros.dolar (tipo, compra, venta, variacion)
+            VALUES ('DÓLAR OFICIAL', 1400, 1450, 0.1), ('DÓLAR BLUE', 1420, 1440, 0.2)
+        """))
+        conn.execute(text("""
+            CREATE TABLE datos_financieros.bandas_cambiarias (
+                id INTEGER PRIMARY KEY, fecha TEXT, banda_inferior REAL,
+                banda_superior REAL, ancho REAL
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO datos_financieros.bandas_cambiarias (fecha, banda_inferior, banda_superior, ancho)
+            VALUES ('2025-03', 951, 1471, 520), ('2026-12', 900, 1600, 700),
+                   ('2030-08', 800, 2000, 1200)
+        """))
+        conn.execute(text("""
+            CREATE TABLE instrumentos_usuarios.bonos_usuarios (
+                usuario_username TEXT, bono TEXT, moneda_bono TEXT, monto_inicial REAL,
+                moneda_inversion TEXT, monto_convertido REAL, r_mensual_pct REAL,
+                r_anual_pct REAL, monto_final_pesos REAL, factor_ars REAL,
+                vs_banda_techo_usd REAL, dolar_actual REAL, dolar_equilibrio REAL,
+                dias_considerados INTEGER, mes_banda_usado TEXT
+            )
+        """))
+
+    for modulo in (crear_bono, obtener_bonos, obtener_banda_cambiaria,
+                   obtener_ultimo_valor_dolar, version_mercado, analitica_instrumentos):
+        monkeypatch.setattr(modulo, "engine", engine_sqlite)
+    obtener_banda_cambiaria.cache_bandas.limpiar()
+    crear_bono.cache_calculo_bonos.limpiar()
+    version_mercado.limpiar_cache_versiones()
+    with engine_sqlite.begin() as conn:
+        for fuente in ("dolar", "bonos", "bandas_cambiarias"):
+            version_mercado.incrementar_version(conn, fuente)
+
+    app = FastAPI()
+    app.include_router(crear_bono.router)
+    client = TestClient(app)
+    params = {"monto": 10000, "moneda_inversion": "ARS", "usuario_username": "ana"}
+
+    # Primera llamada sin analítica guardada: versiones + analítica (no
+    # existe) + bonos + dólar + una consulta por mes de banda + insert
+    with limitar_consultas(1 + 1 + 2 + 3 + 1):
+        calculada = client.get("/bonos/calcular", params=params)
+    assert calculada.status_code == 200
+
+    # Con la analítica precalculada al cargar los bonos: versiones +
+    # analítica + dólar + insert, y la misma respuesta
+    with engine_sqlite.begin() as conn:
+        assert analitica_instrumentos.recalcular_analitica(conn, "bono") == 4 * 5
+        version_mercado.incrementar_version(conn, "bonos")
+    version_mercado.limpiar_cache_versiones()
+    with limitar_consultas(1 + 1 + 1 + 1):
+        primera = client.get("/bonos/calcular", params=params)
+    assert primera.json() == calculada.json()
+
+    # Misma analítica cacheada: solo el insert del registro del usuario
+    with limitar_consultas(1):
+        respuesta = client.get("/bonos/calcular", params=params)
+    assert respuesta.json() == primera.json()
+    assert len(respuesta.json()) == 4
+
+    with engine_sqlite.connect() as conn:
+        filas = conn.execute(text(
+            "SELECT r_mensual_pct, mes_banda_usado FROM instrumentos_usuarios.bonos_usuarios"
+        )).fetchall()
+    assert len(filas) == 12
+    assert all(r_mensual != 0 and mes for r_mensual, mes in filas)
+
+
+def test_consultar_usuarios_paginado_y_proyectado(engine_sqlite):
+    with engine_sqlite.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE usuarios.usuarios (
+                id INTEGER PRIMARY KEY, username TEXT, hashed_password TEXT,
+                full_name TEXT, tipo TEXT, email TEXT, telefono INTEGER
+            )
+        """))
+        conn.execute(
+            text("INSERT INTO usuarios.usuarios (username, full_name, tipo, email) "
+                 "VALUES (:u, :u, 'normal', :e)"),
+            [{"u": f"user{i}", "e": f"user{i}@test.com"} for i in range(25)]
+        )
+
+    db = DataBaseUsuario()
+    db.engine = engine_sqlite
+    vistos = []
+    cursor = None
+    while True:
+        with limitar_consultas(1) as traza:
+            usuarios = db.consultar(cursor=cursor, limite=10, campos=["email"])
+        assert "full_name" not in next(iter(traza.formas))
+        if not usuarios:
+            break
+        vistos += [u.email for u in usuarios]
+        cursor = usuarios[-1].id
+    assert vistos == [f"user{i}@test.com" for i in range(25)]
+
+
+def test_metricas_y_trazador_comparten_la_medicion(engine_sqlite):
+    registro = RegistroMetricas()
+    metricas.instrumentar_engine(engine_sqlite, registro)
+    assert len(engine_sqlite.dispatch.before_cursor_execute) == 1
+    assert len(engine_sqlite.dispatch.after_cursor_execute) == 1
+
+    with limitar_consultas(1) as traza:
+        with engine_sqlite.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    assert registro.consultas_db == traza.total == 1
+    assert registro.tiempo_db == traza.tiempo
+
+
+def test_muestras_de_consultas_solo_para_admin():
+    from main import cotizar
+    from auth.auth_service import obtener_usuario_actual
+
+    client = TestClient(cotizar)
+    assert client.get("/metrics/consultas").status_code == 401
+    for tipo, estado in (("normal", 403), ("admin", 200)):
+        cotizar.dependency_overrides[obtener_usuario_actual] = (
+            lambda tipo=tipo: UsuarioPublico(nombre_usuario="ana", tipo=tipo)
+        )
+        try:
+            assert client.get("/metrics/consultas").status_code == estado
+        finally:
+            cotizar.dependency_overrides.clear()
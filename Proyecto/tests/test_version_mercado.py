@@ -0,0 +1,58 @@
+"""
+Pruebas de la versión de datos de mercado (utils/version_mercado.py)
+usando una base SQLite en memoria.
+"""
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+from utils import version_mercado
+
+
+@pytest.fixture
+def engine_sqlite(monkeypatch):
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _preparar(conexion, _):
+        conexion.execute("ATTACH DATABASE ':memory:' AS datos_financieros")
+        conexion.create_function("NOW", 0, lambda: "2025-11-01 00:00:00+00:00")
+
+    monkeypatch.setattr(version_mercado, "engine", engine)
+    version_mercado.limpiar_cache_versiones()
+    yield engine
+    version_mercado.limpiar_cache_versiones()
+
+
+def test_sin_tabla_devuelve_version_cero(engine_sqlite):
+    assert version_mercado.obtener_versiones() == {}
+    assert version_mercado.obtener_version("dolar") == (0, None)
+
+
+def test_incrementar_version_por_fuente(engine_sqlite):
+    with engine_sqlite.begin() as conn:
+        version_mercado.incrementar_version(conn, "dolar")
+        version_mercado.incrementar_version(conn, "dolar")
+        version_mercado.incrementar_version(conn, "bonos")
+
+    assert version_mercado.obtener_version("dolar")[0] == 2
+    assert version_mercado.obtener_version("bonos")[0] == 1
+
+    # Las versiones se cachean: un incremento se ve al limpiar el cache
+    with engine_sqlite.begin() as conn:
+        version_mercado.incrementar_version(conn, "dolar")
+    assert version_mercado.obtener_version("dolar")[0] == 2
+    version_mercado.limpiar_cache_versiones()
+    assert version_mercado.obtener_version("dolar")[0] == 3
+
+
+def test_fuente_desconocida(engine_sqlite):
+    with engine_sqlite.begin() as conn:
+        with pytest.raises(ValueError):
+            version_mercado.incrementar_version(conn, "acciones")
@@ -0,0 +1,198 @@
+"""
+Analítica precalculada de plazos fijos, bonos y letras.
+
+La TEA, la tasa mensual y el factor de crecimiento en pesos de cada
+instrumento dependen solo de los datos de mercado, así que se calculan
+una vez por carga, para los plazos estándar de HORIZONTES, y se guardan
+en datos_financieros.analitica_instrumentos. Los endpoints solo
+multiplican por el monto del usuario.
+
+recalcular_analitica() se llama desde los scrapers de plazos fijos,
+bonos y letras (y desde el de bandas, porque el techo de la banda
+entra en la analítica de bonos y letras) con la conexión de la
+transacción que carga los datos: la analítica nueva se confirma junto
+con los datos y con la versión de la fuente.
+"""
+
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from models.instruments import Bono, _mes_banda_de_salida
+from utils.conexion_db import engine
+
+HORIZONTES = (30, 60, 90, 180, 365)
+
+# tipo -> tabla de datos_financieros de la que se calcula
+TABLAS_ORIGEN = {
+    "plazo_fijo": "plazos_fijos",
+    "bono": "bonos",
+    "letra": "letras",
+}
+
+CREAR_TABLA_ANALITICA = text("""
+    CREATE TABLE IF NOT EXISTS datos_financieros.analitica_instrumentos (
+        tipo TEXT NOT NULL,
+        horizonte_dias INTEGER NOT NULL,
+        nombre TEXT NOT NULL,
+        posicion INTEGER,
+        moneda TEXT,
+        tna_pct DOUBLE PRECISION,
+        tea_pct DOUBLE PRECISION,
+        tasa_mensual_pct DOUBLE PRECISION,
+        factor_ars DOUBLE PRECISION,
+        mes_banda_usado TEXT,
+        techo_banda DOUBLE PRECISION,
+        fecha_vencimiento TEXT,
+        actualizado TIMESTAMPTZ,
+        PRIMARY KEY (tipo, horizonte_dias, nombre)
+    )
+""")
+
+INSERT_ANALITICA = text("""
+    INSERT INTO datos_financieros.analitica_instrumentos (
+        tipo, horizonte_dias, nombre, posicion, moneda, tna_pct, tea_pct,
+        tasa_mensual_pct, factor_ars, mes_banda_usado, techo_banda,
+        fecha_vencimiento, actualizado
+    ) VALUES (
+        :tipo, :horizonte_dias, :nombre, :posicion, :moneda, :tna_pct, :tea_pct,
+        :tasa_mensual_pct, :factor_ars, :mes_banda_usado, :techo_banda,
+        :fecha_vencimiento, NOW()
+    )
+""")
+
+
+def _filas_plazos_fijos(conn) -> list[dict]:
+    bancos = conn.execute(text(
+        "SELECT banco, tasa_pct FROM datos_financieros.plazos_fijos ORDER BY id"
+    )).all()
+    filas = {}
+    for posicion, (banco, tasa) in enumerate(bancos):
+        if tasa is None:
+            continue
+        tna = float(tasa)
+        for dias in HORIZONTES:
+            # Misma cuenta que PlazoFijo.calcular_rendimiento
+            n = 365 / dias
+            tea = (1 + tna / (100 * n)) ** n - 1
+            # Con bancos repetidos vale la primera fila, como en crear_plazo_fijo
+            filas.setdefault((banco, dias), {
+                "nombre": banco,
+                "posicion": posicion,
+                "horizonte_dias": dias,
+                "moneda": "ARS",
+                "tna_pct": tna,
+                "tea_pct": tea * 100,
+                "tasa_mensual_pct": None,
+                "factor_ars": (1 + tea) ** (dias / 365),
+                "mes_banda_usado": None,
+                "techo_banda": None,
+                "fecha_vencimiento": None,
+            })
+    return list(filas.values())
+
+
+def _filas_bonos(conn, tabla: str) -> list[dict]:
+    """
+    Misma cuenta que Bono.calcular_rendimiento / rendimiento_vs_banda,
+    con los datos faltantes en 0 como en /bonos/calcular.
+    """
+    instrumentos = conn.execute(text(f"""
+        SELECT nombre, moneda, dia_pct, mes_pct, anio_pct, fecha_vencimiento
+        FROM datos_financieros.{tabla}
+    """)).mappings().all()
+    bandas = conn.execute(text("""
+        SELECT fecha, banda_superior FROM datos_financieros.bandas_cambiarias ORDER BY id
+    """)).all()
+    techos = {fecha: float(techo) for fecha, techo in bandas if techo}
+    techo_ultimo = float(bandas[-1][1]) if bandas and bandas[-1][1] else None
+
+    hoy = date.today()
+    filas = {}
+    for posicion, fila in enumerate(instrumentos):
+        bono = Bono(fila["nombre"], fila["moneda"], dia_pct=fila["dia_pct"] or 0,
+                    mes_pct=fila["mes_pct"] or 0, anio_pct=fila["anio_pct"] or 0)
+        r_anual = bono._estimacion_rend_anual()
+        vencimiento = fila["fecha_vencimiento"]
+        try:
+            inicio = date.fromisoformat(str(vencimiento)) if vencimiento else hoy
+        except ValueError:
+            inicio = hoy
+        for dias in HORIZONTES:
+            mes = _mes_banda_de_salida(None, inicio, dias)
+            filas.setdefault((bono.nombre, dias), {
+                "nombre": bono.nombre,
+                "posicion": posicion,
+                "horizonte_dias": dias,
+                "moneda": bono.moneda,
+                "tna_pct": None,
+                "tea_pct": r_anual * 100,
+                "tasa_mensual_pct": ((1.0 + r_anual) ** (30.0 / 365.0) - 1.0) * 100,
+                "factor_ars": (1.0 + r_anual) ** (dias / 365.0),
+                "mes_banda_usado": mes,
+                "techo_banda": techos.get(mes, techo_ultimo),
+                "fecha_vencimiento": str(vencimiento) if vencimiento else None,
+            })
+    return list(filas.values())
+
+
+def recalcular_analitica(conn, tipo: str) -> int:
+    """
+    Reemplaza la analítica de un tipo de instrumento con la calculada
+    a partir de su tabla de datos_financieros.
+
+    Corre dentro de un savepoint: si falla (por ejemplo, porque todavía
+    no existe la tabla de bandas) se informa por consola y la carga de
+    datos sigue; los endpoints calculan sin analítica.
+
+    :param conn: conexión abierta con engine.begin() (la de la carga)
+    :param tipo: "plazo_fijo", "bono" o "letra"
+    :return: cantidad de filas guardadas
+    """
+    if tipo not in TABLAS_ORIGEN:
+        raise ValueError(f"Tipo de instrumento desconocido: {tipo}")
+    try:
+        with conn.begin_nested():
+            if tipo == "plazo_fijo":
+                filas = _filas_plazos_fijos(conn)
+            else:
+                filas = _filas_bonos(conn, TABLAS_ORIGEN[tipo])
+
+            conn.execute(CREAR_TABLA_ANALITICA)
+            conn.execute(text(
+                "DELETE FROM datos_financieros.analitica_instrumentos WHERE tipo = :tipo"
+            ), {"tipo": tipo})
+            if filas:
+                conn.execute(INSERT_ANALITICA, [{**fila, "tipo": tipo} for fila in filas])
+    except SQLAlchemyError as e:
+        print(f"[ERROR analitica_instrumentos] No se pudo calcular la analítica de {tipo}: {e}")
+        return 0
+    return len(filas)
+
+
+def obtener_analitica(tipo: str, horizonte_dias: int,
+                      nombre: str | None = None) -> list[dict]:
+    """
+    Devuelve la analítica guardada de un tipo de instrumento para un
+    plazo (y opcionalmente un instrumento), en el orden de la tabla de
+    origen. Si el plazo no es uno de HORIZONTES, o la tabla todavía no
+    existe, devuelve una lista vacía y el que llama calcula como antes.
+    """
+    if horizonte_dias not in HORIZONTES:
+        return []
+    consulta = """
+        SELECT nombre, moneda, tna_pct, tea_pct, tasa_mensual_pct, factor_ars,
+               mes_banda_usado, techo_banda, fecha_vencimiento
+        FROM datos_financieros.analitica_instrumentos
+        WHERE tipo = :tipo AND horizonte_dias = :horizonte
+    """
+    parametros = {"tipo": tipo, "horizonte": horizonte_dias}
+    if nombre is not None:
+        consulta += " AND nombre = :nombre"
+        parametros["nombre"] = nombre
+    consulta += " ORDER BY posicion"
+    try:
+        with engine.connect() as conn:
+            return [dict(fila) for fila in conn.execute(text(consulta), parametros).mappings()]
+    except SQLAlchemyError as e:
+        print(f"[ERROR analitica_instrumentos] {e}")
+        return []
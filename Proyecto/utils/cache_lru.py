@@ -0,0 +1,122 @@
+"""
+Cache en memoria con política LRU (least recently used) y
+vencimiento opcional por entrada.
+Es thread-safe, porque los endpoints sincrónicos de FastAPI
+corren en un pool de threads.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+# Caches con nombre, para poder consultar sus estadísticas
+CACHES_REGISTRADOS: dict[str, "CacheLRU"] = {}
+
+_SIN_VALOR = object()
+
+
+class CacheLRU:
+    """
+    Cache acotado: cuando se llena descarta la entrada usada
+    hace más tiempo.
+
+    Atributos:
+        capacidad (int): cantidad máxima de entradas.
+        ttl (float | None): segundos de vida por defecto de cada entrada.
+        aciertos (int): cantidad de lecturas encontradas.
+        fallos (int): cantidad de lecturas no encontradas o vencidas.
+    """
+
+    def __init__(self, capacidad: int = 1024, ttl: float | None = None,
+                 nombre: str | None = None):
+        """
+        :param capacidad: cantidad máxima de entradas
+        :param ttl: segundos de vida por defecto (None = sin vencimiento)
+        :param nombre: si se indica, el cache queda registrado en
+                       CACHES_REGISTRADOS
+        """
+        if capacidad <= 0:
+            raise ValueError("La capacidad del cache debe ser positiva.")
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        if nombre:
+            CACHES_REGISTRADOS[nombre] = self
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def obtener(self, clave: Hashable, por_defecto: Any = None) -> Any:
+        """Devuelve el valor cacheado o `por_defecto` si no está o venció."""
+        with self._lock:
+            entrada = self._datos.get(clave, _SIN_VALOR)
+            if entrada is _SIN_VALOR:
+                self.fallos += 1
+                return por_defecto
+            valor, vence = entrada
+            if vence is not None and vence <= time.monotonic():
+                del self._datos[clave]
+                self.fallos += 1
+                return por_defecto
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave: Hashable, valor: Any, ttl: float | None = None):
+        """
+        Guarda un valor. Si se supera la capacidad,
+        descarta el menos usado.
+
+        :param ttl: segundos de vida para esta entrada
+                    (por defecto se usa el del cache)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        vence = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._datos[clave] = (valor, vence)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def eliminar(self, clave: Hashable) -> bool:
+        """Elimina una entrada. Devuelve True si existía."""
+        with self._lock:
+            return self._datos.pop(clave, _SIN_VALOR) is not _SIN_VALOR
+
+    def eliminar_si(self, condicion: Callable[[Hashable, Any], bool]) -> int:
+        """
+        Elimina todas las entradas para las que condicion(clave, valor)
+        es verdadera. Devuelve la cantidad eliminada.
+        """
+        with self._lock:
+            claves = [c for c, (v, _) in self._datos.items() if condicion(c, v)]
+            for clave in claves:
+                del self._datos[clave]
+            return len(claves)
+
+    def purgar_vencidas(self) -> int:
+        """Elimina las entradas vencidas. Devuelve la cantidad eliminada."""
+        ahora = time.monotonic()
+        with self._lock:
+            claves = [
+                c for c, (_, vence) in self._datos.items()
+                if vence is not None and vence <= ahora
+            ]
+            for clave in claves:
+                del self._datos[clave]
+            return len(claves)
+
+    def limpiar(self):
+        """Vacía el cache (no reinicia las estadísticas)."""
+        with self._lock:
+            self._datos.clear()
+
+    def ratio_aciertos(self) -> float:
+        """Proporción de lecturas que encontraron el valor (0.0 a 1.0)."""
+        total = self.aciertos + self.fallos
+        return self.aciertos / total if total else 0.0
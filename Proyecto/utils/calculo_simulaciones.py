@@ -0,0 +1,314 @@
+"""
+Cálculos de /simulaciones (routers/simulaciones.py) con numpy sobre
+todos los instrumentos de la foto de mercado a la vez.
+
+El router importa este módulo dentro de cada endpoint, así numpy y la
+curva de bandas se cargan con el primer request y no al iniciar la API.
+"""
+
+from datetime import date
+import numpy as np
+from models.instruments import _mes_banda_de_salida
+from utils.snapshot_mercado import SnapshotMercado, _lista
+from utils.ranking import factor_plazo_fijo
+from utils.escenarios_dolar import (
+    PERCENTILES, evaluar_instrumentos, limites_banda, simular_dolar_final
+)
+
+
+def simular_instrumentos(snapshot: SnapshotMercado, montos: list[float], dias: list[int],
+                         monedas: list[str], instrumentos: list[str],
+                         guardar: bool = False) -> tuple[dict, list, list]:
+    """
+    Plazos fijos y bonos para todas las combinaciones de montos, plazos
+    y monedas. Devuelve (respuesta, filas de plazos fijos, filas de
+    bonos); las filas solo se arman si `guardar`.
+    """
+    montos = np.array(montos, dtype=float)
+    dias = np.array(dias, dtype=float)
+    respuesta = {"dolar_oficial": snapshot.dolar_oficial}
+    filas_pf, filas_bonos = [], []
+
+    if "plazos_fijos" in instrumentos:
+        respuesta["plazos_fijos"], filas_pf = _simular_plazos_fijos(
+            snapshot, montos, dias, guardar
+        )
+    if "bonos" in instrumentos:
+        respuesta["bonos"], filas_bonos = _simular_bonos(
+            snapshot, montos, dias, monedas, guardar
+        )
+    return respuesta, filas_pf, filas_bonos
+
+
+def simular_escenarios(snapshot: SnapshotMercado, monto: float, moneda_inversion: str,
+                       dias: int, trayectorias: int, volatilidad: float, deriva: float,
+                       semilla: int | None, instrumentos: str) -> dict:
+    """
+    Dólar final simulado dentro de la banda y, para cada plazo fijo y
+    bono en pesos, percentiles del resultado en USD y probabilidad de
+    ganarle al dólar. Requiere snapshot.dolar_oficial.
+    """
+    dolar = snapshot.dolar_oficial
+    tipos, nombres, factores = [], [], []
+    if instrumentos in ("todos", "plazos_fijos"):
+        tipos += ["plazo_fijo"] * len(snapshot.bancos)
+        nombres += snapshot.bancos
+        factores.append(factor_plazo_fijo(snapshot.tasas_tna, dias))
+    if instrumentos in ("todos", "bonos"):
+        en_pesos = np.array([m == "ARS" for m in snapshot.monedas_bonos], dtype=bool)
+        tipos += ["bono"] * int(en_pesos.sum())
+        nombres += [b for b, ars in zip(snapshot.bonos, en_pesos) if ars]
+        factores.append((1.0 + snapshot.r_anual_bonos[en_pesos]) ** (dias / 365.0))
+    factores = np.concatenate(factores) if factores else np.array([])
+
+    pisos, techos = limites_banda(snapshot, dias)
+    dolar_final = simular_dolar_final(dolar, pisos, techos, volatilidad, deriva,
+                                      trayectorias, semilla)
+    usd_invertidos = monto if moneda_inversion == "USD" else monto / dolar
+    resultado = evaluar_instrumentos(dolar_final, dolar, factores)
+    claves = [f"p{p}" for p in PERCENTILES]
+
+    return {
+        "dolar_oficial": dolar,
+        "usd_invertidos": round(usd_invertidos, 2),
+        "dolar_final": dict(zip(claves, _lista(np.percentile(dolar_final, PERCENTILES), 2))),
+        "prob_dolar_en_techo": round(float(np.mean(dolar_final >= techos[-1])), 4),
+        "instrumentos": [
+            {
+                "tipo": tipo,
+                "nombre": nombre,
+                "rendimiento_pct": round((factor - 1) * 100, 2),
+                "dolar_equilibrio": round(equilibrio, 2),
+                "usd_final": dict(zip(claves, _lista(usd_final * usd_invertidos, 2))),
+                "usd_final_esperado": round(esperado * usd_invertidos, 2),
+                "prob_ganarle_al_dolar": round(prob, 4),
+            }
+            for tipo, nombre, factor, equilibrio, usd_final, esperado, prob in zip(
+                tipos, nombres, factores.tolist(), resultado["dolar_equilibrio"].tolist(),
+                resultado["usd_final"], resultado["usd_final_esperado"].tolist(),
+                resultado["prob_ganarle_al_dolar"].tolist()
+            )
+        ],
+    }
+
+
+def grilla_sensibilidad(snapshot: SnapshotMercado, tipo: str, nombre: str, eje: str,
+                        monto: float, moneda_inversion: str, dias: list[int],
+                        desde: float | None, hasta: float | None, puntos: int) -> dict:
+    """
+    Grilla plazo × tasa (eje "tna") o plazo × dólar al vencimiento (eje
+    "dolar") de un instrumento de la foto. Requiere que el instrumento
+    exista y snapshot.dolar_oficial; lanza ValueError si el rango de
+    dólar no es positivo.
+    """
+    dolar = snapshot.dolar_oficial
+    nombres = snapshot.bancos if tipo == "plazo_fijo" else snapshot.bonos
+    i = nombres.index(nombre)
+    if tipo == "plazo_fijo":
+        tasa = float(snapshot.tasas_tna[i])
+        factor = factor_plazo_fijo
+    else:
+        tasa = float(snapshot.r_anual_bonos[i]) * 100
+        factor = _factor_bono
+
+    dias = np.array(dias)
+    monto_pesos = monto * dolar if moneda_inversion == "USD" else monto
+    resultado = {
+        "tipo": tipo,
+        "nombre": nombre,
+        "eje": eje,
+        "tasa_actual_pct": round(tasa, 2),
+        "dolar_oficial": dolar,
+        "monto_inicial": monto,
+        "moneda_inversion": moneda_inversion,
+        "usd_invertidos": round(monto_pesos / dolar, 2),
+        "dias": dias.tolist(),
+    }
+
+    if eje == "tna":
+        valores = np.linspace(max(tasa - 10, 0) if desde is None else desde,
+                              tasa + 10 if hasta is None else hasta, puntos)
+        grilla = factor(valores[None, :], dias[:, None])
+        resultado["valores"] = _lista(valores, 4)
+        resultado["dolar_equilibrio"] = [_lista(fila, 2) for fila in grilla * dolar]
+        resultado["monto_final_pesos"] = [_lista(fila, 2) for fila in grilla * monto_pesos]
+    else:
+        # Por defecto, del piso al techo de la banda en el último plazo
+        vencimiento = np.datetime64(date.today(), "D") + int(dias[-1])
+        piso, techo = (v[0] for v in snapshot.curva_bandas.bandas_de_fechas([vencimiento]))
+        desde = desde if desde is not None else (piso if piso == piso else dolar * 0.8)
+        hasta = hasta if hasta is not None else (techo if techo == techo else dolar * 1.5)
+        if desde <= 0:
+            raise ValueError("El dólar debe ser positivo.")
+        valores = np.linspace(desde, hasta, puntos)
+        factores = factor(tasa, dias)
+        resultado["valores"] = _lista(valores, 2)
+        resultado["dolar_equilibrio"] = _lista(factores * dolar, 2)
+        resultado["monto_final_usd"] = [
+            _lista(fila, 2) for fila in monto_pesos * factores[:, None] / valores[None, :]
+        ]
+    return resultado
+
+
+def _factor_bono(tea_pct, dias):
+    """Factor de crecimiento de un bono a `dias` días con esa TEA (%)."""
+    return (1 + tea_pct / 100) ** (dias / 365)
+
+
+def _simular_plazos_fijos(snapshot: SnapshotMercado, montos: np.ndarray,
+                          dias: np.ndarray, guardar: bool = False) -> tuple[dict, list]:
+    """
+    Mismas cuentas que PlazoFijo.calcular_rendimiento para todos los
+    bancos, montos y plazos. Devuelve (respuesta, filas para
+    plazos_fijos_usuarios, que solo se arman si `guardar`).
+    """
+    tna = snapshot.tasas_tna                                    # (bancos,)
+    n = (365.0 / dias)[:, None]                                 # (dias, 1)
+    tea = (1 + tna[None, :] / (100 * n)) ** n - 1               # (dias, bancos)
+    factor = (1 + tea) ** (dias[:, None] / 365)
+    monto_final = np.round(montos[:, None, None] * factor[None], 2)  # (montos, dias, bancos)
+    ganancia = monto_final - montos[:, None, None]
+    dolar = snapshot.dolar_oficial
+    if dolar:
+        dolar_equilibrio = np.round(monto_final * dolar / montos[:, None, None], 2)
+    else:
+        dolar_equilibrio = np.full_like(monto_final, np.nan)
+
+    escenarios, filas = [], []
+    for i, monto in enumerate(montos.tolist()):
+        for j, plazo in enumerate(dias.tolist()):
+            escenarios.append({
+                "monto_inicial": monto,
+                "dias": int(plazo),
+                "tea": _lista(tea[j] * 100, 2),
+                "monto_final_pesos": _lista(monto_final[i, j], 2),
+                "ganancia_pesos": _lista(ganancia[i, j], 2),
+                "dolar_equilibrio": _lista(dolar_equilibrio[i, j], 2),
+            })
+            if not guardar:
+                continue
+            equilibrio = _lista(dolar_equilibrio[i, j], 2)
+            for k, banco in enumerate(snapshot.bancos):
+                filas.append({
+                    "banco": banco,
+                    "monto_inicial": monto,
+                    "tasa_pct": float(tna[k]),
+                    "monto_final_pesos": float(monto_final[i, j, k]),
+                    "dolar_actual": dolar,
+                    "dolar_equilibrio": equilibrio[k],
+                })
+
+    respuesta = {
+        "bancos": snapshot.bancos,
+        "tna": tna.tolist(),
+        "escenarios": escenarios,
+    }
+    return respuesta, filas
+
+
+def _simular_bonos(snapshot: SnapshotMercado, montos: np.ndarray, dias: np.ndarray,
+                   monedas: list[str], guardar: bool = False) -> tuple[dict, list]:
+    """
+    Mismas cuentas que Bono.calcular_rendimiento y
+    Bono.rendimiento_vs_banda (ver routers/crear_bono.py) para todos
+    los bonos, montos, monedas y plazos. Devuelve (respuesta, filas
+    para bonos_usuarios, que solo se arman si `guardar`).
+    """
+    cantidad = len(snapshot.bonos)
+    r_anual = snapshot.r_anual_bonos                            # (bonos,)
+    r_mensual = (1.0 + r_anual) ** (30.0 / 365.0) - 1.0
+    es_ars = np.array([m == "ARS" for m in snapshot.monedas_bonos], dtype=bool)
+    es_usd = np.array([m == "USD" for m in snapshot.monedas_bonos], dtype=bool)
+    dolar = snapshot.dolar_oficial
+    factor = (1.0 + r_anual[None, :]) ** (dias[:, None] / 365.0)  # (dias, bonos)
+
+    # Mes de salida y techo de la banda por plazo y bono. Igual que en
+    # /bonos/calcular, se cuenta desde el vencimiento (o desde hoy)
+    hoy = date.today()
+    meses = [
+        [_mes_banda_de_salida(None, venc or hoy, int(plazo))
+         for venc in snapshot.vencimientos_bonos]
+        for plazo in dias.tolist()
+    ]
+    techos = np.array(
+        [[snapshot.techo(mes) or np.nan for mes in fila] for fila in meses], dtype=float
+    ).reshape(len(dias), cantidad)
+    dolar_equilibrio = factor * techos                           # (dias, bonos)
+
+    # Los bonos en USD se pasan a pesos para compararlos con la banda
+    a_pesos = np.where(es_usd, dolar, 1.0) if dolar else np.ones(cantidad)
+
+    escenarios, filas = [], []
+    for moneda in monedas:
+        # Conversión del monto a la moneda de cada bono
+        conversion = np.ones(cantidad)
+        if dolar:
+            conversion[es_ars if moneda == "USD" else es_usd] = (
+                dolar if moneda == "USD" else 1 / dolar
+            )
+
+        for monto in montos.tolist():
+            convertido = monto * conversion                      # (bonos,)
+            if dolar:
+                usd_invertidos = np.where(es_ars, convertido / dolar, np.nan)
+            else:
+                usd_invertidos = np.full(cantidad, np.nan)
+            monto_final = (convertido * a_pesos)[None, :] * factor  # (dias, bonos)
+            usd_techo = monto_final / techos
+
+            for j, plazo in enumerate(dias.tolist()):
+                escenarios.append({
+                    "monto_inicial": monto,
+                    "moneda_inversion": moneda,
+                    "dias": int(plazo),
+                    "monto_convertido": _lista(convertido, 2),
+                    "usd_invertidos": _lista(usd_invertidos, 2),
+                    "monto_final_pesos": _lista(monto_final[j], 2),
+                    "factor_ars": _lista(factor[j], 6),
+                    "monto_final_usd_techo": _lista(usd_techo[j], 2),
+                    "dolar_equilibrio": _lista(dolar_equilibrio[j], 2),
+                    "mes_banda_usado": meses[j],
+                })
+                if guardar:
+                    filas.extend(_filas_bonos(
+                        snapshot, monto, moneda, int(plazo), convertido, r_mensual,
+                        monto_final[j], factor[j], usd_techo[j], dolar_equilibrio[j], meses[j]
+                    ))
+
+    respuesta = {
+        "bonos": snapshot.bonos,
+        "monedas": snapshot.monedas_bonos,
+        "r_mensual_pct": _lista(r_mensual * 100, 2),
+        "r_anual_pct": _lista(r_anual * 100, 2),
+        "escenarios": escenarios,
+    }
+    return respuesta, filas
+
+
+def _filas_bonos(snapshot, monto, moneda, dias, convertido, r_mensual, monto_final,
+                 factor, usd_techo, dolar_equilibrio, meses) -> list[dict]:
+    """
+    Filas de un escenario para bonos_usuarios, con los mismos
+    redondeos y valores por defecto que /bonos/calcular.
+    """
+    usd_techo = np.nan_to_num(usd_techo)
+    dolar_equilibrio = np.nan_to_num(dolar_equilibrio)
+    return [
+        {
+            "bono": bono,
+            "moneda_bono": snapshot.monedas_bonos[k],
+            "monto_inicial": monto,
+            "moneda_inversion": moneda,
+            "monto_convertido": round(float(convertido[k]), 6),
+            "r_mensual_pct": round(float(r_mensual[k]) * 100, 2),
+            "r_anual_pct": round(float(snapshot.r_anual_bonos[k]) * 100, 2),
+            "monto_final_pesos": round(float(monto_final[k]), 2),
+            "factor_ars": round(float(factor[k]), 6),
+            "vs_banda_techo_usd": round(float(usd_techo[k]), 6),
+            "dolar_actual": round(snapshot.dolar_oficial or 0, 2),
+            "dolar_equilibrio": round(float(dolar_equilibrio[k]), 2),
+            "dias_considerados": dias,
+            "mes_banda_usado": meses[k],
+        }
+        for k, bono in enumerate(snapshot.bonos)
+    ]
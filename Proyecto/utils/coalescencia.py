@@ -0,0 +1,127 @@
+"""
+Coalescencia de lecturas concurrentes iguales ("single flight").
+
+Al comienzo de cada minuto muchos tableros piden a la vez /dolar/,
+/dolar/cotizaciones y /bonos/calcular, y cada request hacía su propia
+consulta (obtener_ultimo_valor_dolar, obtener_tipo_cambio,
+obtener_bonos_desde_bd) contra un pool de 5 conexiones.
+
+Con @coalescer, la primera llamada con una clave (función + argumentos)
+ejecuta la consulta y las que llegan mientras está en curso esperan y
+reciben el mismo resultado (o la misma excepción). No es un cache:
+cuando la consulta termina, la siguiente llamada vuelve a la base.
+
+Los endpoints sincrónicos corren en el pool de threads de FastAPI, así
+que la espera es con threading.Event. Las cantidades de llamadas,
+ejecuciones y llamadas coalescidas de cada función registrada se
+publican en /metrics (utils/metricas.py).
+"""
+
+import functools
+import threading
+from typing import Any, Callable, Hashable
+
+
+# Coalescedores con nombre, para poder consultar sus estadísticas
+COALESCEDORES_REGISTRADOS: dict[str, "Coalescedor"] = {}
+
+
+class _Vuelo:
+    """Una ejecución en curso y lo que esperan sus seguidores."""
+    __slots__ = ("listo", "resultado", "error")
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error: BaseException | None = None
+
+
+class Coalescedor:
+    """
+    Agrupa las llamadas concurrentes con la misma clave en una sola
+    ejecución.
+
+    Atributos:
+        llamadas (int): cantidad de llamadas recibidas.
+        ejecuciones (int): cantidad de veces que se ejecutó la función.
+        coalescidas (int): llamadas que esperaron una ejecución en curso.
+    """
+
+    def __init__(self, nombre: str | None = None):
+        """
+        :param nombre: si se indica, queda registrado en
+                       COALESCEDORES_REGISTRADOS
+        """
+        self.llamadas = 0
+        self.ejecuciones = 0
+        self.coalescidas = 0
+        self._vuelos: dict[Hashable, _Vuelo] = {}
+        self._lock = threading.Lock()
+        if nombre:
+            COALESCEDORES_REGISTRADOS[nombre] = self
+
+    def en_curso(self) -> int:
+        """Cantidad de ejecuciones en curso."""
+        return len(self._vuelos)
+
+    def ratio_coalescencia(self) -> float:
+        """Llamadas coalescidas / llamadas (0 si no hubo llamadas)."""
+        return self.coalescidas / self.llamadas if self.llamadas else 0.0
+
+    def ejecutar(self, clave: Hashable, funcion: Callable[[], Any],
+                 copiar: Callable[[Any], Any] | None = None) -> Any:
+        """
+        Ejecuta `funcion` o, si ya hay una ejecución en curso con la
+        misma clave, espera su resultado.
+
+        :param copiar: si se indica, los seguidores reciben
+                       copiar(resultado) en lugar del mismo objeto
+        """
+        with self._lock:
+            self.llamadas += 1
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = _Vuelo()
+                self.ejecuciones += 1
+            else:
+                self.coalescidas += 1
+
+        if not lider:
+            vuelo.listo.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return copiar(vuelo.resultado) if copiar else vuelo.resultado
+
+        try:
+            vuelo.resultado = funcion()
+            return vuelo.resultado
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+            vuelo.listo.set()
+
+
+def coalescer(nombre: str, copiar: Callable[[Any], Any] | None = None):
+    """
+    Decorador: las llamadas concurrentes con los mismos argumentos
+    comparten una sola ejecución. Los argumentos deben ser hashables.
+
+    :param nombre: nombre con el que se publican las métricas
+    :param copiar: ver Coalescedor.ejecutar (para resultados mutables)
+    """
+    def decorador(funcion):
+        coalescedor = Coalescedor(nombre)
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            clave = (args, tuple(sorted(kwargs.items())))
+            return coalescedor.ejecutar(clave, lambda: funcion(*args, **kwargs), copiar)
+
+        envoltura.coalescedor = coalescedor
+        return envoltura
+
+    return decorador
@@ -3,13 +3,59 @@ Carga las variables de entorno desde un archivo .env
 y configura una conexión a la base de datos.
 Se fuerza el uso de IPV4, única forma de conexión 
 actual cuando trabajamos con el modo gratuito de Supabase.
+
+Para pruebas locales (ej. benchmarks/prueba_carga.py) DB_URL puede
+ser 'sqlite:///ruta/base.db': cada esquema de Supabase se adjunta
+como un archivo aparte (base_usuarios.db, base_datos_financieros.db,
+...) y se registra la función NOW().
+
+Las lecturas de datos de mercado usan conectar_con_timeout, que corta
+en Postgres las consultas que tardan más de SEGUNDOS_TIMEOUT_CONSULTA
+(statement_timeout). La conexión inicial se corta a los
+SEGUNDOS_TIMEOUT_CONEXION.
 """
 
 from dotenv import load_dotenv
 import os
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, event, text
+
+ESQUEMAS = ("usuarios", "datos_financieros", "instrumentos_usuarios")
+
+
+def _configurar_sqlite(engine, ruta_base: str):
+    """Adjunta un archivo por esquema y registra NOW() en cada conexión."""
+    raiz, _ = os.path.splitext(ruta_base)
+
+    @event.listens_for(engine, "connect")
+    def _al_conectar(conexion, _):
+        for esquema in ESQUEMAS:
+            conexion.execute(f"ATTACH DATABASE '{raiz}_{esquema}.db' AS {esquema}")
+            conexion.execute(f"PRAGMA {esquema}.journal_mode=WAL")
+        conexion.create_function(
+            "NOW", 0, lambda: str(datetime.now(timezone.utc))
+        )
+
+
+@contextmanager
+def conectar_con_timeout(engine, segundos: float | None = None):
+    """
+    Como engine.connect(), pero en Postgres las consultas de la
+    conexión se cancelan si tardan más de `segundos`
+    (SEGUNDOS_TIMEOUT_CONSULTA por defecto). El límite es
+    SET LOCAL: vale hasta que termina la transacción de la conexión.
+    """
+    segundos = SEGUNDOS_TIMEOUT_CONSULTA if segundos is None else segundos
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"SET LOCAL statement_timeout = {int(segundos * 1000)}"))
+        yield conn
+
 
 load_dotenv()
+SEGUNDOS_TIMEOUT_CONSULTA = float(os.getenv("SEGUNDOS_TIMEOUT_CONSULTA", "3"))
+SEGUNDOS_TIMEOUT_CONEXION = int(os.getenv("SEGUNDOS_TIMEOUT_CONEXION", "5"))
 try:
     DB_URL = os.getenv("DB_URL")
     if not DB_URL:
@@ -19,12 +65,22 @@ try:
     if "supabase.co" in DB_URL and "options=" not in DB_URL:
         DB_URL += "?sslmode=require&options=-c%20inet_client_addr=127.0.0.1"
 
-    engine = create_engine(
-        DB_URL,
-        pool_size=5,
-        max_overflow=0,
-        pool_pre_ping=True
-    )
+    if DB_URL.startswith("sqlite:///"):
+        engine = create_engine(
+            DB_URL,
+            pool_size=5,
+            max_overflow=0,
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        _configurar_sqlite(engine, DB_URL[len("sqlite:///"):])
+    else:
+        engine = create_engine(
+            DB_URL,
+            pool_size=5,
+            max_overflow=0,
+            pool_pre_ping=True,
+            connect_args={"connect_timeout": SEGUNDOS_TIMEOUT_CONEXION}
+        )
 
 except Exception as e:
-    raise RuntimeError(f"Error al configurar la conexión a la base de datos: {e}")
\ No newline at end of file
+    raise RuntimeError(f"Error al configurar la conexión a la base de datos: {e}")
@@ -0,0 +1,96 @@
+"""
+Curva diaria de la banda cambiaria.
+
+El cronograma de bandas es mensual ('YYYY-MM' -> piso, techo), así que
+redondear un plazo a un mes usa la misma banda para el 1 y el 31. Acá
+se arma una vez, a partir del cronograma, un array con el piso y el
+techo de cada día: el valor del mes vale el día 1 y se interpola
+linealmente hasta el día 1 del mes siguiente (el último mes queda fijo).
+
+La banda de una fecha es una posición del array (O(1)) y para muchas
+fechas se resuelve con una sola operación de numpy. Las fechas fuera
+del cronograma usan la última banda, como obtener_banda_cambiaria.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+import numpy as np
+from sqlalchemy import text
+from utils.cache_lru import CacheLRU
+from utils.conexion_db import engine
+from utils.obtener_banda_cambiaria import SEGUNDOS_CACHE_BANDAS
+from utils.version_mercado import obtener_versiones
+
+_cache_curva_bandas = CacheLRU(2, ttl=SEGUNDOS_CACHE_BANDAS, nombre="curva_bandas")
+
+
+@dataclass(frozen=True)
+class CurvaBandas:
+    """Piso y techo de la banda para cada día desde `inicio`."""
+    inicio: date
+    pisos: np.ndarray
+    techos: np.ndarray
+    ultima: tuple[float | None, float | None] = (None, None)
+
+    def banda(self, fecha: date) -> tuple[float | None, float | None]:
+        """(piso, techo) de una fecha."""
+        i = (fecha - self.inicio).days
+        if 0 <= i < len(self.techos):
+            return float(self.pisos[i]), float(self.techos[i])
+        return self.ultima
+
+    def bandas_de_fechas(self, fechas) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (pisos, techos) de un array de fechas (datetime64 o date).
+        NaN donde no hay banda.
+        """
+        fechas = np.asarray(fechas, dtype="datetime64[D]")
+        indices = (fechas - np.datetime64(self.inicio, "D")).astype(np.int64)
+        dentro = (indices >= 0) & (indices < len(self.techos))
+        seguros = np.where(dentro, indices, 0)
+        piso_ultimo, techo_ultimo = (np.nan if v is None else v for v in self.ultima)
+        if len(self.techos) == 0:
+            return np.full(fechas.shape, piso_ultimo), np.full(fechas.shape, techo_ultimo)
+        return (np.where(dentro, self.pisos[seguros], piso_ultimo),
+                np.where(dentro, self.techos[seguros], techo_ultimo))
+
+
+def armar_curva_bandas(bandas: dict[str, tuple[float, float]],
+                       ultima: tuple[float | None, float | None] = (None, None)) -> CurvaBandas:
+    """
+    Arma la curva diaria a partir del cronograma mensual.
+
+    :param bandas: {'YYYY-MM': (piso, techo)}; los meses salteados se
+                   interpolan entre los que están
+    :param ultima: banda para fechas fuera del cronograma
+    """
+    meses = sorted(m for m in bandas if len(m) == 7)
+    if not meses:
+        return CurvaBandas(date.today(), np.array([]), np.array([]), ultima)
+
+    dias_mes = np.array(meses, dtype="datetime64[M]").astype("datetime64[D]")
+    fin = (np.datetime64(meses[-1], "M") + 1).astype("datetime64[D]")
+    dias = np.arange(dias_mes[0], fin).astype(np.int64)
+    puntos = dias_mes.astype(np.int64)
+    pisos = np.interp(dias, puntos, [bandas[m][0] for m in meses])
+    techos = np.interp(dias, puntos, [bandas[m][1] for m in meses])
+    return CurvaBandas(dias_mes[0].astype(date), pisos, techos, ultima)
+
+
+def obtener_curva_bandas() -> CurvaBandas:
+    """Curva diaria vigente; se rearma cuando cambia el cronograma."""
+    clave = obtener_versiones().get("bandas_cambiarias", (0, None))[0]
+    curva = _cache_curva_bandas.obtener(clave)
+    if curva is None:
+        with engine.connect() as conn:
+            filas = conn.execute(text("""
+                SELECT fecha, banda_inferior, banda_superior
+                FROM datos_financieros.bandas_cambiarias
+                ORDER BY id
+            """)).all()
+        # Con meses repetidos gana la última fila, como en obtener_banda_cambiaria
+        por_mes = {fecha: (float(inf), float(sup)) for fecha, inf, sup in filas}
+        ultima = (float(filas[-1][1]), float(filas[-1][2])) if filas else (None, None)
+        curva = armar_curva_bandas(por_mes, ultima)
+        _cache_curva_bandas.guardar(clave, curva)
+    return curva
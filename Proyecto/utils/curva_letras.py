@@ -0,0 +1,151 @@
+"""
+Curva de letras del Tesoro para /letras/calcular (routers/letras.py).
+
+Las tasas de todas las letras se calculan de una vez con numpy y se
+cachean hasta que cambien los datos de mercado o el día; cada request
+solo escala la curva por el monto (filas_letras). Las cuentas son las
+mismas que las de models.instruments.Letra.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+import numpy as np
+from models.instruments import valor_nominal_por_precio
+from utils.cache_lru import CacheLRU
+from utils.obtener_bonos import fuente_letras
+from utils.obtener_banda_cambiaria import obtener_banda_cambiaria
+from utils.obtener_ultimo_valor_dolar import obtener_dolar_oficial
+from utils.datos_mercado import datos_desactualizados
+from utils.snapshot_mercado import _a_fecha, _a_float, _lista, _r_anual_estimado
+from utils.version_mercado import obtener_versiones
+
+FUENTES_CURVA_LETRAS = ("dolar", "letras", "bandas_cambiarias")
+cache_curva_letras = CacheLRU(8, ttl=10 * 60, nombre="curva_letras")
+
+
+@dataclass(frozen=True)
+class CurvaLetras:
+    """Tasas de las letras vigentes, una posición por letra."""
+    nombres: list[str]
+    monedas: np.ndarray
+    vencimientos: list[str]
+    dias: np.ndarray
+    metodos: list[str]
+    factor: np.ndarray          # monto al vencimiento / monto invertido
+    tasa_descuento: np.ndarray  # NaN en las estimadas
+    meses_banda: list[str]
+    techos: np.ndarray          # NaN si no hay banda
+    dolar_oficial: float | None
+
+
+def armar_curva(filas: list[dict], dolar_oficial: float | None,
+                hoy: date | None = None) -> CurvaLetras:
+    """
+    Calcula la curva de letras: factor VN / precio para las que se
+    compran con descuento y, para las que capitalizan o no tienen
+    precio, el estimado con los rendimientos informados (como Bono).
+    Las letras vencidas o sin vencimiento (o con una fecha mal cargada)
+    quedan afuera.
+    """
+    hoy = np.datetime64(hoy or date.today(), "D")
+    vencimientos = np.array(
+        [_a_fecha(f["fecha_vencimiento"]) for f in filas], dtype="datetime64[D]"
+    ).reshape(-1)
+    dias = (vencimientos - hoy).astype("timedelta64[D]").astype(float)
+    dias[np.isnat(vencimientos)] = np.nan
+    vigentes = np.nan_to_num(dias, nan=0.0) > 0
+
+    filas = [f for f, v in zip(filas, vigentes) if v]
+    vencimientos, dias = vencimientos[vigentes], dias[vigentes]
+    precio = np.array([_a_float(f["ultimo"]) for f in filas], dtype=float)
+    valor_nominal = np.array([valor_nominal_por_precio(p) for p in precio.tolist()], dtype=float)
+    r_anual = _r_anual_estimado(*np.array(
+        [[_a_float(f[c]) for c in ("dia_pct", "mes_pct", "anio_pct")] for f in filas], dtype=float
+    ).reshape(-1, 3).T)
+
+    con_descuento = (precio > 0) & (precio < valor_nominal)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(con_descuento, valor_nominal / precio, (1.0 + r_anual) ** (dias / 365.0))
+        tasa_descuento = np.where(con_descuento, (1 - precio / valor_nominal) * 365 / dias, np.nan)
+
+    # Techo de la banda del mes de vencimiento (o la última banda)
+    meses = vencimientos.astype("datetime64[M]").astype(str).tolist()
+    techo_ultimo = obtener_banda_cambiaria(None)[1]
+    techo_por_mes = {mes: obtener_banda_cambiaria(mes)[1] or techo_ultimo for mes in set(meses)}
+    techos = np.array([techo_por_mes[mes] or np.nan for mes in meses], dtype=float)
+
+    return CurvaLetras(
+        nombres=[f["nombre"] for f in filas],
+        monedas=np.array([f["moneda"] for f in filas], dtype=object),
+        vencimientos=vencimientos.astype(str).tolist(),
+        dias=dias,
+        metodos=np.where(con_descuento, "descuento", "estimado").tolist(),
+        factor=factor,
+        tasa_descuento=tasa_descuento,
+        meses_banda=meses,
+        techos=techos,
+        dolar_oficial=dolar_oficial,
+    )
+
+
+def obtener_curva() -> CurvaLetras:
+    """Curva de letras vigente, recalculada solo si cambió el mercado o el día."""
+    versiones = obtener_versiones()
+    clave = (
+        date.today(),
+        tuple(versiones.get(fuente, (0, None))[0] for fuente in FUENTES_CURVA_LETRAS),
+    )
+    curva = cache_curva_letras.obtener(clave)
+    if curva is None:
+        curva = armar_curva(fuente_letras.obtener().valor, obtener_dolar_oficial())
+        if not datos_desactualizados():
+            cache_curva_letras.guardar(clave, curva)
+    return curva
+
+
+def filas_letras(curva: CurvaLetras, monto: float, moneda_inversion: str) -> list[dict]:
+    """
+    Una fila por letra de la curva con las tasas, el monto al
+    vencimiento y la comparación con la banda para `monto` invertido
+    en `moneda_inversion`.
+    """
+    dolar = curva.dolar_oficial
+    es_ars = curva.monedas == "ARS"
+    es_usd = curva.monedas == "USD"
+
+    # Conversión del monto a la moneda de cada letra y de vuelta a pesos
+    convertido = np.full(len(curva.nombres), float(monto))
+    a_pesos = np.ones(len(curva.nombres))
+    if dolar:
+        convertido[es_ars if moneda_inversion == "USD" else es_usd] *= (
+            dolar if moneda_inversion == "USD" else 1 / dolar
+        )
+        a_pesos[es_usd] = dolar
+
+    dias, factor = curva.dias, curva.factor
+    monto_final = convertido * factor
+    monto_final_pesos = convertido * a_pesos * factor
+    usd_invertidos = np.where(es_ars, convertido / dolar, np.nan) if dolar \
+        else np.full(len(curva.nombres), np.nan)
+
+    columnas = {
+        "letra": curva.nombres,
+        "moneda": curva.monedas.tolist(),
+        "fecha_vencimiento": curva.vencimientos,
+        "dias_al_vencimiento": dias.astype(int).tolist(),
+        "metodo": curva.metodos,
+        "tna_pct": _lista((factor - 1) * 365 / dias * 100, 2),
+        "tea_pct": _lista((factor ** (365 / dias) - 1) * 100, 2),
+        "tem_pct": _lista((factor ** (30 / dias) - 1) * 100, 2),
+        "tasa_descuento_pct": _lista(curva.tasa_descuento * 100, 2),
+        "monto_convertido": _lista(convertido, 2),
+        "usd_invertidos": _lista(usd_invertidos, 2),
+        "monto_final": _lista(monto_final, 2),
+        "ganancia": _lista(monto_final - convertido, 2),
+        "monto_final_pesos": _lista(monto_final_pesos, 2),
+        "factor_ars": _lista(factor, 6),
+        "monto_final_usd_techo": _lista(monto_final_pesos / curva.techos, 2),
+        "dolar_equilibrio": _lista(factor * curva.techos, 2),
+        "mes_banda_usado": curva.meses_banda,
+    }
+    return [dict(zip(columnas, fila)) for fila in zip(*columnas.values())]
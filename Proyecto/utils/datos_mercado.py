@@ -0,0 +1,349 @@
+"""
+Acceso a datos de mercado tolerante a fallas de la base.
+
+Cuando Supabase está lenta o caída, cada request que lee el dólar,
+los bonos, las letras o las bandas quedaba colgado hasta el timeout de
+la conexión.
+Una FuenteMercado envuelve una de esas lecturas y:
+
+- guarda el último valor leído bien de cada clave (argumentos);
+- cuenta las fallas de conexión y los timeouts (es_falla_de_conexion)
+  en un circuito compartido (CircuitoBreaker): después de
+  FALLOS_PARA_ABRIR fallas seguidas se abre y deja de consultar la base
+  durante SEGUNDOS_CIRCUITO_ABIERTO. Los demás errores (una tabla que no
+  existe, una consulta mal escrita) se propagan sin tocar el circuito:
+  son de esa lectura, no de la base;
+- si la lectura falla o el circuito está abierto, devuelve el último
+  valor conocido marcado como desactualizado (stale) con su edad, y
+  un thread en segundo plano reintenta hasta que la base responde;
+- con el circuito cerrado pero la base lenta, si la lectura no termina
+  en SEGUNDOS_ESPERA_LECTURA devuelve el último valor conocido (stale)
+  y la lectura sigue en segundo plano y actualiza el valor al terminar
+  (stale-while-revalidate);
+- sin valor conocido, propaga el error (CircuitoAbierto si ni se
+  consultó la base).
+
+Las consultas de las lecturas usan conectar_con_timeout
+(utils/conexion_db.py), así que un error tarda a lo sumo el
+statement_timeout y, con el circuito abierto, la respuesta sale de
+memoria. Los requests que usaron datos desactualizados llevan los
+headers X-Datos-Stale y X-Edad-Datos (MiddlewareDatosMercado) y las
+respuestas JSON pueden sumar los campos con marcar_respuesta.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as EsperaAgotada
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+from sqlalchemy.exc import OperationalError, TimeoutError as TimeoutPool
+
+FALLOS_PARA_ABRIR = int(os.getenv("FALLOS_PARA_ABRIR_CIRCUITO", "3"))
+SEGUNDOS_CIRCUITO_ABIERTO = float(os.getenv("SEGUNDOS_CIRCUITO_ABIERTO", "30"))
+# Espera máxima de una lectura con valor conocido antes de servirlo stale
+SEGUNDOS_ESPERA_LECTURA = float(os.getenv("SEGUNDOS_ESPERA_LECTURA", "1"))
+# SQLSTATE de Postgres para una consulta cancelada (statement_timeout)
+CONSULTA_CANCELADA = "57014"
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+# Edad del dato más viejo servido como desactualizado en el request en
+# curso. Los threads del pool de FastAPI copian el contexto, así que
+# las lecturas de endpoints sincrónicos también lo actualizan.
+contexto_stale: ContextVar[dict | None] = ContextVar("contexto_stale", default=None)
+
+
+class CircuitoAbierto(Exception):
+    """La base está marcada como caída y no hay un valor conocido."""
+
+
+def es_falla_de_conexion(error: BaseException) -> bool:
+    """
+    True si el error indica que la base no responde: errores de red,
+    timeout del pool de conexiones, no poder conectarse, conexión
+    perdida (connection_invalidated) o consulta cancelada por el
+    statement_timeout. Los demás errores de SQLAlchemy (ProgrammingError
+    por una tabla que no existe, etc.) no cuentan.
+    """
+    if isinstance(error, (OSError, TimeoutPool)):
+        return True
+    if not isinstance(error, OperationalError):
+        return False
+    if error.connection_invalidated or error.statement is None:
+        # statement None: falló la conexión, antes de ejecutar nada
+        return True
+    original = error.orig
+    return (getattr(original, "pgcode", None) == CONSULTA_CANCELADA
+            or "statement timeout" in str(original))
+
+
+class CircuitoBreaker:
+    """
+    Circuito de errores de la base.
+
+    cerrado: se consulta normalmente. abierto: no se consulta hasta
+    que pasen `segundos_abierto`. semiabierto: una sola consulta de
+    prueba; si sale bien se cierra y si falla se vuelve a abrir.
+    """
+
+    def __init__(self, fallos_para_abrir: int = FALLOS_PARA_ABRIR,
+                 segundos_abierto: float = SEGUNDOS_CIRCUITO_ABIERTO,
+                 reloj: Callable[[], float] = time.monotonic):
+        self.fallos_para_abrir = fallos_para_abrir
+        self.segundos_abierto = segundos_abierto
+        self.reloj = reloj
+        self.estado = CERRADO
+        self.fallos = 0
+        self.aperturas = 0
+        self._abierto_desde = 0.0
+        self._lock = threading.Lock()
+
+    def cerrado(self) -> bool:
+        return self.estado == CERRADO
+
+    def permitir(self) -> bool:
+        """True si se puede consultar la base (o hacer la prueba)."""
+        with self._lock:
+            if self.estado == CERRADO:
+                return True
+            if self.estado == ABIERTO and self.reloj() - self._abierto_desde >= self.segundos_abierto:
+                self.estado = SEMIABIERTO
+                return True
+            return False
+
+    def segundos_para_reintento(self) -> float:
+        """Cuánto falta para poder probar la base otra vez."""
+        with self._lock:
+            if self.estado == ABIERTO:
+                return max(0.0, self._abierto_desde + self.segundos_abierto - self.reloj())
+            return 0.0 if self.estado == CERRADO else self.segundos_abierto
+
+    def registrar_exito(self):
+        with self._lock:
+            self.estado = CERRADO
+            self.fallos = 0
+
+    def registrar_fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self.estado == SEMIABIERTO or self.fallos >= self.fallos_para_abrir:
+                if self.estado != ABIERTO:
+                    self.aperturas += 1
+                self.estado = ABIERTO
+                self._abierto_desde = self.reloj()
+
+
+# Un solo circuito para la base: si está caída, lo está para todas las lecturas
+circuito_bd = CircuitoBreaker()
+
+# Threads de las lecturas con valor conocido (ver FuenteMercado._leer_con_espera)
+_pool_lecturas = ThreadPoolExecutor(max_workers=8, thread_name_prefix="lectura-mercado")
+
+
+@dataclass(frozen=True)
+class LecturaMercado:
+    """Valor leído y, si viene de memoria, cuántos segundos tiene."""
+    valor: Any
+    obtenido: float          # time.time() de la lectura en la base
+    stale: bool = False
+
+    @property
+    def edad_segundos(self) -> float:
+        return max(0.0, time.time() - self.obtenido)
+
+
+class FuenteMercado:
+    """
+    Lectura de datos de mercado con último valor conocido y circuito.
+
+    :param nombre: para los mensajes de error
+    :param leer: función que consulta la base (recibe los argumentos
+                 de obtener)
+    :param es_falla: decide si un error de `leer` es una falla de la
+                     base; los demás (ej. ValueError si no hay datos o
+                     una consulta mal escrita) se propagan sin tocar el
+                     circuito
+    :param espera: segundos que se espera una lectura cuando hay un
+                   valor conocido para servir si la base está lenta
+    """
+
+    def __init__(self, nombre: str, leer: Callable[..., Any],
+                 circuito: CircuitoBreaker = circuito_bd,
+                 es_falla: Callable[[BaseException], bool] = es_falla_de_conexion,
+                 espera: float = SEGUNDOS_ESPERA_LECTURA):
+        self.nombre = nombre
+        self.leer = leer
+        self.circuito = circuito
+        self.es_falla = es_falla
+        self.espera = espera
+        self._ultimos: dict[Hashable, LecturaMercado] = {}
+        self._refrescando: set[Hashable] = set()
+        self._en_curso: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, *args) -> LecturaMercado:
+        """
+        Lee de la base o, si la base falla o el circuito está abierto,
+        devuelve el último valor conocido con stale=True.
+
+        Raises:
+            CircuitoAbierto: si el circuito está abierto y no hay valor conocido.
+            Las excepciones de `leer` si falla y no hay valor conocido.
+        """
+        ultimo = self._ultimos.get(args)
+        if ultimo is not None and not self.circuito.cerrado():
+            self._refrescar_en_segundo_plano(args)
+            return self._desactualizada(ultimo)
+        if not self.circuito.permitir():
+            raise CircuitoAbierto(f"La base no está disponible ({self.nombre}).")
+
+        try:
+            if ultimo is None:
+                return self._leer(args)
+            return self._leer_con_espera(args)
+        except EsperaAgotada:
+            print(f"[ERROR datos_mercado] {self.nombre}: la base tarda más de "
+                  f"{self.espera}s. Se usa el último valor conocido.")
+            return self._desactualizada(ultimo)
+        except Exception as e:
+            if ultimo is None or not self.es_falla(e):
+                raise
+            print(f"[ERROR datos_mercado] {self.nombre}: {e}. Se usa el último valor conocido.")
+            if not self.circuito.cerrado():
+                self._refrescar_en_segundo_plano(args)
+            return self._desactualizada(ultimo)
+
+    def limpiar(self):
+        """Olvida los últimos valores conocidos (para tests)."""
+        with self._lock:
+            self._ultimos.clear()
+
+    def _leer(self, args) -> LecturaMercado:
+        """Consulta la base y actualiza el circuito y el último valor."""
+        try:
+            valor = self.leer(*args)
+        except Exception as e:
+            if self.es_falla(e):
+                self.circuito.registrar_fallo()
+            raise
+        self.circuito.registrar_exito()
+        lectura = LecturaMercado(valor, time.time())
+        with self._lock:
+            self._ultimos[args] = lectura
+        return lectura
+
+    def _leer_con_espera(self, args) -> LecturaMercado:
+        """
+        Lee en el pool de lecturas y espera a lo sumo `espera` segundos
+        (EsperaAgotada si no alcanza). La lectura sigue en curso y las
+        llamadas siguientes con la misma clave esperan la misma, así
+        que una base lenta no acumula consultas.
+        """
+        with self._lock:
+            futuro = self._en_curso.get(args)
+            nuevo = futuro is None
+            if nuevo:
+                # El contexto del request (métricas, traza) sigue a la lectura
+                contexto = contextvars.copy_context()
+                futuro = self._en_curso[args] = _pool_lecturas.submit(contexto.run, self._leer, args)
+        if nuevo:
+            # Fuera del lock: si ya terminó, el callback corre en este thread
+            futuro.add_done_callback(lambda _: self._terminar_lectura(args, futuro))
+        return futuro.result(timeout=self.espera)
+
+    def _terminar_lectura(self, args, futuro: Future):
+        with self._lock:
+            if self._en_curso.get(args) is futuro:
+                del self._en_curso[args]
+
+    def _desactualizada(self, ultimo: LecturaMercado) -> LecturaMercado:
+        lectura = LecturaMercado(ultimo.valor, ultimo.obtenido, stale=True)
+        acumulado = contexto_stale.get()
+        if acumulado is not None:
+            acumulado["edad_segundos"] = max(acumulado["edad_segundos"] or 0.0, lectura.edad_segundos)
+        return lectura
+
+    def _refrescar_en_segundo_plano(self, args):
+        """Lanza (si no hay uno ya) el thread que reintenta esta lectura."""
+        with self._lock:
+            if args in self._refrescando:
+                return
+            self._refrescando.add(args)
+        threading.Thread(target=self._refrescar, args=(args,), daemon=True,
+                         name=f"refresco-{self.nombre}").start()
+
+    def _refrescar(self, args):
+        try:
+            while not self.circuito.cerrado():
+                time.sleep(self.circuito.segundos_para_reintento())
+                if not self.circuito.permitir():
+                    continue
+                try:
+                    self._leer(args)
+                except Exception as e:
+                    print(f"[ERROR datos_mercado] Reintento de {self.nombre}: {e}")
+                    if not self.es_falla(e):
+                        return
+        except Exception as e:
+            print(f"[ERROR datos_mercado] Refresco de {self.nombre} abortado: {e}")
+        finally:
+            with self._lock:
+                self._refrescando.discard(args)
+
+
+def datos_desactualizados() -> bool:
+    """
+    True si el request en curso usó datos desactualizados (los
+    resultados armados con ellos no se deben guardar en caches).
+    """
+    acumulado = contexto_stale.get()
+    return acumulado is not None and acumulado["edad_segundos"] is not None
+
+
+def marcar_respuesta(respuesta: dict) -> dict:
+    """
+    Agrega 'stale': True y 'edad_datos_segundos' a una respuesta JSON
+    si el request usó datos desactualizados. Si no, la deja igual.
+    """
+    if datos_desactualizados():
+        acumulado = contexto_stale.get()
+        respuesta["stale"] = True
+        respuesta["edad_datos_segundos"] = round(acumulado["edad_segundos"])
+    return respuesta
+
+
+class MiddlewareDatosMercado:
+    """
+    Middleware ASGI que agrega X-Datos-Stale: true y X-Edad-Datos
+    (segundos) a las respuestas armadas con datos desactualizados.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        acumulado = {"edad_segundos": None}
+        token = contexto_stale.set(acumulado)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and acumulado["edad_segundos"] is not None:
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                    (b"x-datos-stale", b"true"),
+                    (b"x-edad-datos", str(round(acumulado["edad_segundos"])).encode()),
+                ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send=enviar)
+        finally:
+            contexto_stale.reset(token)
@@ -0,0 +1,117 @@
+"""
+Escenarios de Monte Carlo del dólar oficial dentro de la banda cambiaria.
+
+rendimiento_vs_banda compara contra el techo de la banda de un solo
+mes. Acá se simulan muchas trayectorias diarias del dólar con un
+movimiento browniano geométrico (volatilidad y deriva configurables)
+acotado cada día por el piso y el techo de la banda de ese día
+(utils/curva_bandas.py), y con el dólar final de cada trayectoria se
+evalúan los instrumentos en pesos: percentiles del resultado en USD y
+probabilidad de ganarle al dólar (terminar por debajo del dólar de
+equilibrio).
+
+Las trayectorias se generan por bloques (la memoria depende del
+tamaño del bloque, no de la cantidad de trayectorias) y cada bloque
+tiene su propia semilla derivada de la semilla pedida, así que el
+resultado es el mismo con o sin pool de procesos.
+
+El pool de procesos (PROCESOS_ESCENARIOS > 1) se crea una sola vez al
+arrancar la API (utils/procesos_escenarios.py, en el ciclo de vida de
+main.py) y lo comparten todos los requests.
+"""
+
+from concurrent.futures import Executor
+from datetime import date
+import numpy as np
+from utils import procesos_escenarios
+from utils.snapshot_mercado import SnapshotMercado
+
+PERCENTILES = (5, 25, 50, 75, 95)
+TRAYECTORIAS_POR_BLOQUE = 20_000
+# Por debajo de esto no conviene repartir entre procesos
+MINIMO_TRAYECTORIAS_PROCESOS = 50_000
+
+
+def limites_banda(snapshot: SnapshotMercado, dias: int,
+                  hoy: date | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Piso y techo de la banda para cada día de la simulación (1..dias),
+    de la curva diaria de la foto. Los días sin banda no se acotan.
+    """
+    hoy = np.datetime64(hoy or date.today(), "D")
+    pisos, techos = snapshot.curva_bandas.bandas_de_fechas(hoy + np.arange(1, dias + 1))
+    return np.nan_to_num(pisos, nan=-np.inf), np.nan_to_num(techos, nan=np.inf)
+
+
+def _simular_bloque(dolar_inicial: float, pisos: np.ndarray, techos: np.ndarray,
+                    volatilidad: float, deriva: float, cantidad: int,
+                    semilla: np.random.SeedSequence) -> np.ndarray:
+    """Dólar final de `cantidad` trayectorias, avanzando día por día."""
+    rng = np.random.default_rng(semilla)
+    dt = 1 / 365
+    media = (deriva - volatilidad ** 2 / 2) * dt
+    desvio = volatilidad * np.sqrt(dt)
+    dolar = np.full(cantidad, float(dolar_inicial))
+    for piso, techo in zip(pisos, techos):
+        dolar *= np.exp(media + desvio * rng.standard_normal(cantidad))
+        np.clip(dolar, piso, techo, out=dolar)
+    return dolar
+
+
+def simular_dolar_final(dolar_inicial: float, pisos: np.ndarray, techos: np.ndarray,
+                        volatilidad: float, deriva: float, trayectorias: int,
+                        semilla: int | None = None, pool: Executor | None = None,
+                        por_bloque: int = TRAYECTORIAS_POR_BLOQUE) -> np.ndarray:
+    """
+    Simula `trayectorias` caminos del dólar y devuelve el valor final
+    de cada uno.
+
+    :param volatilidad: volatilidad anual (0.2 = 20%)
+    :param deriva: deriva anual del dólar
+    :param semilla: para repetir la simulación (None = al azar)
+    :param pool: pool de procesos (None = el pool compartido, si se
+                 inició); se usa solo si hay más de un bloque y al
+                 menos MINIMO_TRAYECTORIAS_PROCESOS trayectorias
+    """
+    if pool is None:
+        pool = procesos_escenarios.pool_escenarios
+    tamanios = [por_bloque] * (trayectorias // por_bloque)
+    if trayectorias % por_bloque:
+        tamanios.append(trayectorias % por_bloque)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanios))
+    argumentos = [
+        (dolar_inicial, pisos, techos, volatilidad, deriva, cantidad, s)
+        for cantidad, s in zip(tamanios, semillas)
+    ]
+
+    if pool is not None and len(tamanios) > 1 and trayectorias >= MINIMO_TRAYECTORIAS_PROCESOS:
+        finales = list(pool.map(_simular_bloque, *zip(*argumentos)))
+    else:
+        finales = [_simular_bloque(*a) for a in argumentos]
+    return np.concatenate(finales)
+
+
+def evaluar_instrumentos(dolar_final: np.ndarray, dolar_inicial: float,
+                         factores: np.ndarray) -> dict:
+    """
+    Resultado en USD de invertir 1 USD (pasado a pesos) en instrumentos
+    con esos factores de crecimiento en pesos, en todas las trayectorias.
+
+    El resultado en USD (factor · dólar_inicial / dólar_final) baja
+    cuando sube el dólar, así que sus percentiles salen de los del dólar
+    final sin armar la matriz instrumentos × trayectorias.
+
+    Returns:
+        dict con arrays: "usd_final" (instrumento × PERCENTILES),
+        "usd_final_esperado", "dolar_equilibrio" y
+        "prob_ganarle_al_dolar" (P[dólar final < dolar_equilibrio]).
+    """
+    ordenado = np.sort(dolar_final)
+    percentiles_dolar = np.percentile(ordenado, [100 - p for p in PERCENTILES])
+    equilibrio = factores * dolar_inicial
+    return {
+        "usd_final": equilibrio[:, None] / percentiles_dolar[None, :],
+        "usd_final_esperado": equilibrio * np.mean(1.0 / ordenado),
+        "dolar_equilibrio": equilibrio,
+        "prob_ganarle_al_dolar": np.searchsorted(ordenado, equilibrio, side="left") / len(ordenado),
+    }
@@ -0,0 +1,173 @@
+"""
+Exportación en streaming de tablas a CSV, Parquet o Arrow IPC.
+
+Las filas se leen con un cursor del lado del servidor
+(stream_results + yield_per), de a TAMANIO_LOTE, y cada lote se
+convierte y se envía antes de leer el siguiente. La memoria usada no
+depende del tamaño de la tabla.
+
+Parquet y Arrow necesitan pyarrow (está en requirements.txt), que se
+importa solo al pedir esos formatos para no sumar tiempo de arranque.
+Si falta, esos formatos responden 501.
+"""
+
+import csv
+import io
+from typing import Iterator
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from utils.conexion_db import engine
+
+TAMANIO_LOTE = 5000
+
+# formato -> (media type, extensión)
+FORMATOS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+}
+
+
+def leer_en_lotes(consulta: str, parametros: dict | None = None,
+                  tamanio_lote: int | None = None) -> Iterator:
+    """
+    Ejecuta la consulta con un cursor del lado del servidor.
+    Primero devuelve los nombres de las columnas y después listas de
+    hasta `tamanio_lote` filas (TAMANIO_LOTE por defecto).
+    """
+    tamanio_lote = tamanio_lote or TAMANIO_LOTE
+    with engine.connect() as conn:
+        resultado = conn.execution_options(
+            stream_results=True, yield_per=tamanio_lote
+        ).execute(text(consulta), parametros or {})
+        yield list(resultado.keys())
+        for lote in resultado.partitions(tamanio_lote):
+            yield lote
+
+
+def generar_csv(lotes: Iterator) -> Iterator[bytes]:
+    """Convierte los lotes de leer_en_lotes() en trozos de CSV."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(next(lotes))
+    for lote in lotes:
+        escritor.writerows(lote)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _BufferSalida(io.RawIOBase):
+    """Archivo en memoria que se vacía cada vez que se leen sus bytes."""
+
+    def __init__(self):
+        self._partes: list[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def generar_arrow(lotes: Iterator, formato: str) -> Iterator[bytes]:
+    """
+    Convierte los lotes en Parquet (un row group por lote) o en un
+    stream Arrow IPC (un record batch por lote).
+    El esquema se toma del primer lote; las columnas sin ningún valor
+    en ese lote (o todas, si no hay filas) se exportan como texto.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columnas = next(lotes)
+    buffer = _BufferSalida()
+    escritor = esquema = None
+
+    def abrir(esquema):
+        salida = pa.PythonFile(buffer, mode="w")
+        if formato == "parquet":
+            return pq.ParquetWriter(salida, esquema)
+        return pa.ipc.new_stream(salida, esquema)
+
+    try:
+        for lote in lotes:
+            datos = {c: [fila[i] for fila in lote] for i, c in enumerate(columnas)}
+            if escritor is None:
+                inferido = pa.RecordBatch.from_pydict(datos).schema
+                esquema = pa.schema([
+                    pa.field(campo.name, pa.string()) if pa.types.is_null(campo.type) else campo
+                    for campo in inferido
+                ])
+                escritor = abrir(esquema)
+            escritor.write_batch(pa.RecordBatch.from_pydict(datos, schema=esquema))
+            yield buffer.vaciar()
+        if escritor is None:
+            escritor = abrir(pa.schema([pa.field(c, pa.string()) for c in columnas]))
+    finally:
+        if escritor is not None:
+            escritor.close()
+    yield buffer.vaciar()
+
+
+def consulta_historial(tabla: str, usuario_actual, todos: bool = False,
+                       orden: str | None = None) -> tuple[str, dict]:
+    """
+    Consulta del historial de cálculos de una tabla de
+    instrumentos_usuarios: el del usuario autenticado o, si es admin y
+    pide `todos`, el de todos los usuarios.
+    """
+    if todos and usuario_actual.tipo != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="Solo los administradores pueden exportar el historial de todos los usuarios."
+        )
+    consulta = f"SELECT * FROM instrumentos_usuarios.{tabla}"
+    parametros = {}
+    if not todos:
+        consulta += " WHERE usuario_username = :usuario"
+        parametros["usuario"] = usuario_actual.nombre_usuario
+    if orden:
+        consulta += f" ORDER BY {orden}"
+    return consulta, parametros
+
+
+def respuesta_exportacion(consulta: str, parametros: dict | None,
+                          formato: str, nombre_archivo: str) -> StreamingResponse:
+    """
+    Arma la StreamingResponse de una exportación. Starlette recorre el
+    generador en el pool de threads, así que la lectura de la base no
+    bloquea el event loop.
+    """
+    formato = formato.lower()
+    if formato not in FORMATOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato no soportado: {formato}. Opciones: {', '.join(FORMATOS)}"
+        )
+    if formato != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=501,
+                detail=f"El formato {formato} requiere pyarrow instalado en el servidor."
+            )
+
+    lotes = leer_en_lotes(consulta, parametros)
+    cuerpo = generar_csv(lotes) if formato == "csv" else generar_arrow(lotes, formato)
+    media_type, extension = FORMATOS[formato]
+    return StreamingResponse(
+        cuerpo,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={nombre_archivo}.{extension}"},
+    )
@@ -0,0 +1,104 @@
+"""
+Cache HTTP (GET condicional) para endpoints de datos de mercado.
+
+Los datos solo cambian cuando corre un scraper, que incrementa la
+versión de su fuente (ver utils/version_mercado.py). Con esa versión
+se arman:
+- ETag: '"<fuente>-<version>"'
+- Last-Modified: fecha en que se cargó la versión
+- Cache-Control: max-age según cada cuánto se scrapea la fuente
+
+Los cálculos que dependen de varias fuentes y de los parámetros del
+request (ej. /simulaciones/sensibilidad) usan cabeceras_calculo: el
+ETag combina las versiones de las fuentes con los parámetros.
+
+Si el cliente manda If-None-Match (o If-Modified-Since) y los datos no
+cambiaron, el endpoint responde 304 sin consultar la base ni
+serializar nada.
+"""
+
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from models.user import _a_datetime_utc
+from utils.version_mercado import obtener_version
+
+# Segundos que un cliente (o CDN) puede reutilizar una respuesta,
+# según cada cuánto se actualiza cada fuente
+MAX_AGE_POR_FUENTE = {
+    "dolar": 60,
+    "plazos_fijos": 15 * 60,
+    "bonos": 5 * 60,
+    "letras": 5 * 60,
+    "bandas_cambiarias": 60 * 60,
+}
+
+
+def cabeceras_mercado(fuente: str) -> dict[str, str]:
+    """
+    Cabeceras de cache para los datos de una fuente. Si la versión es
+    desconocida (la tabla de versiones no existe) no se arma ETag y se
+    pide revalidar siempre.
+    """
+    version, actualizado = obtener_version(fuente)
+    if not version:
+        return {"Cache-Control": "no-cache"}
+
+    cabeceras = {
+        "ETag": f'"{fuente}-{version}"',
+        "Cache-Control": f"public, max-age={MAX_AGE_POR_FUENTE.get(fuente, 60)}",
+    }
+    if actualizado:
+        cabeceras["Last-Modified"] = format_datetime(_a_datetime_utc(actualizado), usegmt=True)
+    return cabeceras
+
+
+def cabeceras_calculo(fuentes: tuple[str, ...], parametros: str = "") -> dict[str, str]:
+    """
+    Cabeceras de cache para un cálculo sobre varias fuentes: el ETag
+    cambia si cambia la versión de cualquiera de ellas o los
+    parámetros; Last-Modified es la última carga y max-age el de la
+    fuente que se actualiza más seguido.
+    """
+    versiones = [obtener_version(fuente) for fuente in fuentes]
+    if not all(version for version, _ in versiones):
+        return {"Cache-Control": "no-cache"}
+
+    clave = ";".join(f"{f}-{v}" for f, (v, _) in zip(fuentes, versiones)) + "|" + parametros
+    cabeceras = {
+        "ETag": f'"calculo-{hashlib.sha1(clave.encode()).hexdigest()[:16]}"',
+        "Cache-Control": f"public, max-age={min(MAX_AGE_POR_FUENTE.get(f, 60) for f in fuentes)}",
+    }
+    fechas = [_a_datetime_utc(a) for _, a in versiones if a]
+    if fechas:
+        cabeceras["Last-Modified"] = format_datetime(max(fechas), usegmt=True)
+    return cabeceras
+
+
+def no_modificado(request: Request, cabeceras: dict[str, str]) -> bool:
+    """
+    True si la copia del cliente sigue vigente. If-None-Match tiene
+    prioridad sobre If-Modified-Since (RFC 9110, 13.2.2).
+    """
+    etag = cabeceras.get("ETag")
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if not etag:
+            return False
+        etiquetas = {e.strip().removeprefix("W/") for e in if_none_match.split(",")}
+        return "*" in etiquetas or etag in etiquetas
+
+    ultima = cabeceras.get("Last-Modified")
+    if_modified_since = request.headers.get("if-modified-since")
+    if ultima and if_modified_since:
+        try:
+            return parsedate_to_datetime(ultima) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def respuesta_no_modificada(cabeceras: dict[str, str]) -> Response:
+    """Respuesta 304 con las mismas cabeceras de cache."""
+    return Response(status_code=304, headers=cabeceras)
+
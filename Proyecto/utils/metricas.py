@@ -0,0 +1,380 @@
+"""
+Métricas de la API en formato Prometheus.
+
+Registra, por ruta (la plantilla, ej. '/bonos/calcular'):
+- cantidad de requests por código de estado
+- histograma de latencias y percentiles p50/p95/p99
+  (sobre una ventana de las últimas mediciones)
+- requests en curso y errores (excepciones o estado >= 500)
+- consultas a la base y tiempo de base por request
+Además expone el ratio de aciertos de los caches registrados
+en utils.cache_lru.CACHES_REGISTRADOS y el ratio de coalescencia de
+las lecturas registradas en utils.coalescencia.COALESCEDORES_REGISTRADOS,
+y el estado del circuito de la base (utils/datos_mercado.py).
+
+El middleware se agrega en main.py y las métricas se publican en /metrics.
+"""
+
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from typing import Callable
+from sqlalchemy import event
+from starlette.routing import Match
+from utils.cache_lru import CACHES_REGISTRADOS
+from utils.coalescencia import COALESCEDORES_REGISTRADOS
+from utils.datos_mercado import circuito_bd
+
+# Límites superiores (en segundos) de los buckets del histograma
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CUANTILES = (0.5, 0.95, 0.99)
+# Cantidad de latencias recientes por ruta usadas para los percentiles
+TAMANIO_VENTANA = 1024
+
+RUTA_DESCONOCIDA = "sin_ruta"
+
+# Acumuladores del request en curso (consultas y tiempo de base).
+# Los threads del pool de FastAPI copian el contexto, así que las
+# consultas hechas desde endpoints sincrónicos se cuentan igual.
+contexto_request: ContextVar[dict | None] = ContextVar("contexto_request", default=None)
+
+
+class MetricasRuta:
+    """Contadores de una combinación (método, ruta)."""
+
+    def __init__(self):
+        self.por_estado: dict[int, int] = {}
+        self.errores = 0
+        self.en_curso = 0
+        self.buckets = [0] * len(BUCKETS_LATENCIA)
+        self.suma_latencia = 0.0
+        self.cantidad = 0
+        self.ventana = deque(maxlen=TAMANIO_VENTANA)
+        self.consultas_db = 0
+        self.tiempo_db = 0.0
+
+    def registrar(self, estado: int, duracion: float, consultas_db: int,
+                  tiempo_db: float):
+        self.por_estado[estado] = self.por_estado.get(estado, 0) + 1
+        if estado >= 500:
+            self.errores += 1
+        i = bisect_left(BUCKETS_LATENCIA, duracion)
+        if i < len(self.buckets):
+            self.buckets[i] += 1
+        self.suma_latencia += duracion
+        self.cantidad += 1
+        self.ventana.append(duracion)
+        self.consultas_db += consultas_db
+        self.tiempo_db += tiempo_db
+
+    def cuantiles(self) -> dict[float, float]:
+        """Percentiles de la ventana reciente (vacío si no hubo requests)."""
+        if not self.ventana:
+            return {}
+        ordenadas = sorted(self.ventana)
+        n = len(ordenadas)
+        return {q: ordenadas[min(n - 1, int(q * n))] for q in CUANTILES}
+
+
+class RegistroMetricas:
+    """Registro thread-safe de métricas por ruta y de la base de datos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rutas: dict[tuple[str, str], MetricasRuta] = {}
+        self.consultas_db = 0
+        self.tiempo_db = 0.0
+
+    def _ruta(self, metodo: str, ruta: str) -> MetricasRuta:
+        clave = (metodo, ruta)
+        metricas = self.rutas.get(clave)
+        if metricas is None:
+            metricas = self.rutas[clave] = MetricasRuta()
+        return metricas
+
+    def inicio_request(self, metodo: str, ruta: str):
+        with self._lock:
+            self._ruta(metodo, ruta).en_curso += 1
+
+    def fin_request(self, metodo: str, ruta: str, estado: int,
+                    duracion: float, consultas_db: int = 0,
+                    tiempo_db: float = 0.0):
+        with self._lock:
+            metricas = self._ruta(metodo, ruta)
+            metricas.en_curso -= 1
+            metricas.registrar(estado, duracion, consultas_db, tiempo_db)
+
+    def registrar_consulta_db(self, duracion: float):
+        with self._lock:
+            self.consultas_db += 1
+            self.tiempo_db += duracion
+
+    def exportar_prometheus(self) -> str:
+        """Devuelve todas las métricas en el formato de texto de Prometheus."""
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+
+        with self._lock:
+            rutas = sorted(self.rutas.items())
+
+            metrica("cotizar_requests_total", "counter",
+                    "Requests atendidos por ruta y código de estado.")
+            for (metodo, ruta), m in rutas:
+                for estado, cantidad in sorted(m.por_estado.items()):
+                    lineas.append(
+                        f"cotizar_requests_total{_etiquetas(metodo=metodo, ruta=ruta, estado=estado)} {cantidad}"
+                    )
+
+            metrica("cotizar_requests_errores_total", "counter",
+                    "Requests terminados con excepción o estado >= 500.")
+            for (metodo, ruta), m in rutas:
+                lineas.append(
+                    f"cotizar_requests_errores_total{_etiquetas(metodo=metodo, ruta=ruta)} {m.errores}"
+                )
+
+            metrica("cotizar_requests_en_curso", "gauge",
+                    "Requests en curso por ruta.")
+            for (metodo, ruta), m in rutas:
+                lineas.append(
+                    f"cotizar_requests_en_curso{_etiquetas(metodo=metodo, ruta=ruta)} {m.en_curso}"
+                )
+
+            metrica("cotizar_request_duracion_segundos", "histogram",
+                    "Latencia de los requests por ruta.")
+            for (metodo, ruta), m in rutas:
+                acumulado = 0
+                for limite, cantidad in zip(BUCKETS_LATENCIA, m.buckets):
+                    acumulado += cantidad
+                    lineas.append(
+                        "cotizar_request_duracion_segundos_bucket"
+                        f"{_etiquetas(metodo=metodo, ruta=ruta, le=limite)} {acumulado}"
+                    )
+                lineas.append(
+                    "cotizar_request_duracion_segundos_bucket"
+                    f"{_etiquetas(metodo=metodo, ruta=ruta, le='+Inf')} {m.cantidad}"
+                )
+                lineas.append(
+                    f"cotizar_request_duracion_segundos_sum{_etiquetas(metodo=metodo, ruta=ruta)} {m.suma_latencia:.6f}"
+                )
+                lineas.append(
+                    f"cotizar_request_duracion_segundos_count{_etiquetas(metodo=metodo, ruta=ruta)} {m.cantidad}"
+                )
+
+            metrica("cotizar_request_latencia_cuantil_segundos", "gauge",
+                    f"Percentiles de latencia sobre los últimos {TAMANIO_VENTANA} requests.")
+            for (metodo, ruta), m in rutas:
+                for q, valor in m.cuantiles().items():
+                    lineas.append(
+                        "cotizar_request_latencia_cuantil_segundos"
+                        f"{_etiquetas(metodo=metodo, ruta=ruta, cuantil=q)} {valor:.6f}"
+                    )
+
+            metrica("cotizar_request_db_consultas_total", "counter",
+                    "Consultas a la base hechas por los requests de cada ruta.")
+            for (metodo, ruta), m in rutas:
+                lineas.append(
+                    f"cotizar_request_db_consultas_total{_etiquetas(metodo=metodo, ruta=ruta)} {m.consultas_db}"
+                )
+
+            metrica("cotizar_request_db_segundos_total", "counter",
+                    "Tiempo de base acumulado por los requests de cada ruta.")
+            for (metodo, ruta), m in rutas:
+                lineas.append(
+                    f"cotizar_request_db_segundos_total{_etiquetas(metodo=metodo, ruta=ruta)} {m.tiempo_db:.6f}"
+                )
+
+            metrica("cotizar_db_consultas_total", "counter",
+                    "Consultas a la base en todo el proceso (con o sin request).")
+            lineas.append(f"cotizar_db_consultas_total {self.consultas_db}")
+            metrica("cotizar_db_segundos_total", "counter",
+                    "Tiempo de base acumulado en todo el proceso.")
+            lineas.append(f"cotizar_db_segundos_total {self.tiempo_db:.6f}")
+
+        caches = sorted(CACHES_REGISTRADOS.items())
+        metrica("cotizar_cache_aciertos_total", "counter", "Lecturas encontradas en cache.")
+        for nombre, cache in caches:
+            lineas.append(f"cotizar_cache_aciertos_total{_etiquetas(cache=nombre)} {cache.aciertos}")
+        metrica("cotizar_cache_fallos_total", "counter", "Lecturas no encontradas en cache.")
+        for nombre, cache in caches:
+            lineas.append(f"cotizar_cache_fallos_total{_etiquetas(cache=nombre)} {cache.fallos}")
+        metrica("cotizar_cache_ratio_aciertos", "gauge", "Aciertos / lecturas de cada cache.")
+        for nombre, cache in caches:
+            lineas.append(
+                f"cotizar_cache_ratio_aciertos{_etiquetas(cache=nombre)} {cache.ratio_aciertos():.6f}"
+            )
+        metrica("cotizar_cache_entradas", "gauge", "Entradas actuales de cada cache.")
+        for nombre, cache in caches:
+            lineas.append(f"cotizar_cache_entradas{_etiquetas(cache=nombre)} {len(cache)}")
+
+        coalescedores = sorted(COALESCEDORES_REGISTRADOS.items())
+        metrica("cotizar_coalescencia_llamadas_total", "counter",
+                "Llamadas a cada lectura coalescida.")
+        for nombre, c in coalescedores:
+            lineas.append(f"cotizar_coalescencia_llamadas_total{_etiquetas(lectura=nombre)} {c.llamadas}")
+        metrica("cotizar_coalescencia_ejecuciones_total", "counter",
+                "Consultas realmente ejecutadas por cada lectura coalescida.")
+        for nombre, c in coalescedores:
+            lineas.append(f"cotizar_coalescencia_ejecuciones_total{_etiquetas(lectura=nombre)} {c.ejecuciones}")
+        metrica("cotizar_coalescencia_coalescidas_total", "counter",
+                "Llamadas que esperaron una consulta igual en curso.")
+        for nombre, c in coalescedores:
+            lineas.append(f"cotizar_coalescencia_coalescidas_total{_etiquetas(lectura=nombre)} {c.coalescidas}")
+        metrica("cotizar_coalescencia_ratio", "gauge", "Coalescidas / llamadas de cada lectura.")
+        for nombre, c in coalescedores:
+            lineas.append(
+                f"cotizar_coalescencia_ratio{_etiquetas(lectura=nombre)} {c.ratio_coalescencia():.6f}"
+            )
+        metrica("cotizar_coalescencia_en_curso", "gauge", "Consultas coalescidas en curso.")
+        for nombre, c in coalescedores:
+            lineas.append(f"cotizar_coalescencia_en_curso{_etiquetas(lectura=nombre)} {c.en_curso()}")
+
+        metrica("cotizar_bd_circuito_abierto", "gauge",
+                "1 si el circuito de la base está abierto o en prueba (se sirven datos desactualizados).")
+        lineas.append(f"cotizar_bd_circuito_abierto {0 if circuito_bd.cerrado() else 1}")
+        metrica("cotizar_bd_circuito_aperturas_total", "counter",
+                "Veces que se abrió el circuito de la base.")
+        lineas.append(f"cotizar_bd_circuito_aperturas_total {circuito_bd.aperturas}")
+
+        return "\n".join(lineas) + "\n"
+
+
+def _etiquetas(**etiquetas) -> str:
+    """Arma el bloque {clave="valor",...} escapando los valores."""
+    partes = []
+    for clave, valor in etiquetas.items():
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{clave}="{valor}"')
+    return "{" + ",".join(partes) + "}"
+
+
+# Registro compartido por el middleware, el engine y /metrics
+registro_metricas = RegistroMetricas()
+
+
+# -------------------------------
+# INSTRUMENTACIÓN DE LA BASE DE DATOS
+# -------------------------------
+
+# Funciones que reciben cada consulta medida, por engine
+_OYENTES_CONSULTAS: "weakref.WeakKeyDictionary[object, list]" = weakref.WeakKeyDictionary()
+
+
+def al_terminar_consulta(engine, oyente: Callable[[str, object, bool, float], None]):
+    """
+    Llama a oyente(statement, parameters, executemany, duracion)
+    después de cada consulta del engine.
+
+    Los listeners de SQLAlchemy que miden el tiempo se agregan una sola
+    vez por engine, así que las métricas y el trazador
+    (utils/trazador_sql.py) comparten la misma medición.
+    """
+    oyentes = _OYENTES_CONSULTAS.get(engine)
+    if oyentes is None:
+        oyentes = _OYENTES_CONSULTAS[engine] = []
+        _medir_consultas(engine, oyentes)
+    oyentes.append(oyente)
+
+
+def _medir_consultas(engine, oyentes: list):
+    """
+    Listeners que miden cada consulta. El inicio se guarda en el
+    contexto de ejecución de la consulta, que se descarta con ella: si
+    la consulta falla no queda nada pendiente en la conexión.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metricas_inicio = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "_metricas_inicio", None)
+        if inicio is None:
+            return
+        duracion = time.perf_counter() - inicio
+        for oyente in oyentes:
+            oyente(statement, parameters, executemany, duracion)
+
+
+def instrumentar_engine(engine, registro: RegistroMetricas = registro_metricas):
+    """
+    Suma cada consulta del engine al registro global y al request en
+    curso (si hay uno).
+    """
+
+    def _registrar(statement, parameters, executemany, duracion):
+        registro.registrar_consulta_db(duracion)
+        acumulado = contexto_request.get()
+        if acumulado is not None:
+            acumulado["consultas_db"] += 1
+            acumulado["tiempo_db"] += duracion
+
+    al_terminar_consulta(engine, _registrar)
+
+
+# -------------------------------
+# MIDDLEWARE
+# -------------------------------
+
+def resolver_ruta(scope) -> str:
+    """
+    Devuelve la plantilla de la ruta que atiende el request
+    (ej. '/auth/borrar_usuario/{username}'), para no crear una serie
+    por cada valor distinto de los parámetros del path.
+    """
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    for ruta in getattr(router, "routes", []):
+        coincidencia, _ = ruta.matches(scope)
+        if coincidencia == Match.FULL:
+            return getattr(ruta, "path", RUTA_DESCONOCIDA)
+    return RUTA_DESCONOCIDA
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mide cada request HTTP. La duración incluye
+    el envío completo del cuerpo (también en respuestas en streaming).
+    """
+
+    def __init__(self, app, registro: RegistroMetricas = registro_metricas):
+        self.app = app
+        self.registro = registro
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        ruta = resolver_ruta(scope)
+        estado = 500
+        acumulado = {"consultas_db": 0, "tiempo_db": 0.0}
+        token = contexto_request.set(acumulado)
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        self.registro.inicio_request(metodo, ruta)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        except Exception:
+            estado = 500
+            raise
+        finally:
+            self.registro.fin_request(
+                metodo, ruta, estado, time.perf_counter() - inicio,
+                acumulado["consultas_db"], acumulado["tiempo_db"]
+            )
+            contexto_request.reset(token)
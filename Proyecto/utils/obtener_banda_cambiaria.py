@@ -1,13 +1,23 @@
 from sqlalchemy import text
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.conexion_db import engine
+from utils.conexion_db import engine, conectar_con_timeout
+from utils.cache_lru import CacheLRU
+from utils.datos_mercado import FuenteMercado
+
+# El cronograma de bandas cambia solo cuando se recarga el CSV, así que
+# se cachea por mes para no consultar la base en cada cálculo
+# (por ejemplo, una vez por bono o por plazo fijo dentro de un request).
+SEGUNDOS_CACHE_BANDAS = 5 * 60
+cache_bandas = CacheLRU(256, ttl=SEGUNDOS_CACHE_BANDAS, nombre="bandas_cambiarias")
 
 
 def obtener_banda_cambiaria(mes: str = None):
     """
     Devuelve la banda inferior y superior para un mes desde Supabase.
     Si no se pasa mes, toma el último disponible.
+    Los resultados se cachean durante SEGUNDOS_CACHE_BANDAS. Si la base
+    no responde se usa la última banda leída del mes (sin cachearla).
 
     Args:
         mes (str, optional): Mes en formato 'yyyy-mm' (ej: '2025-11').
@@ -17,7 +27,18 @@ def obtener_banda_cambiaria(mes: str = None):
         tuple[float, float] | tuple[None, None]:
         (banda_inferior, banda_superior)
     """
-    with engine.connect() as conn:
+    banda = cache_bandas.obtener(mes)
+    if banda is None:
+        lectura = fuente_bandas.obtener(mes)
+        banda = lectura.valor
+        if not lectura.stale:
+            cache_bandas.guardar(mes, banda)
+    return banda
+
+
+def _consultar_banda_cambiaria(mes: str = None):
+    """Consulta la banda de un mes (o la última) en la base."""
+    with conectar_con_timeout(engine) as conn:
         if mes:
             result = conn.execute(
                 text("""
@@ -43,4 +64,8 @@ def obtener_banda_cambiaria(mes: str = None):
 
     if row:
         return float(row[0]), float(row[1])
-    return None, None
\ No newline at end of file
+    return None, None
+
+
+# Última banda conocida de cada mes, para cuando la base no responde
+fuente_bandas = FuenteMercado("bandas_cambiarias", _consultar_banda_cambiaria)
@@ -1,8 +1,12 @@
 from sqlalchemy import text
 from typing import List, Dict, Any
-from utils.conexion_db import engine 
+from utils.conexion_db import engine, conectar_con_timeout
+from utils.coalescencia import coalescer
+from utils.datos_mercado import FuenteMercado
 
 
+# Los seguidores reciben copias: los llamadores pueden modificar las filas
+@coalescer("bonos_desde_bd", copiar=lambda filas: [dict(f) for f in filas])
 def obtener_bonos_desde_bd(moneda: str = None) -> List[Dict[str, Any]]:
     """
     Consulta bonos desde la base de datos, opcionalmente filtrando por moneda.
@@ -19,11 +23,24 @@ def obtener_bonos_desde_bd(moneda: str = None) -> List[Dict[str, Any]]:
         query += " WHERE moneda = :moneda"
         params["moneda"] = moneda
 
-    with engine.connect() as conn:
+    with conectar_con_timeout(engine) as conn:
         result = conn.execute(text(query), params)
         return [dict(row._mapping) for row in result]
 
 
+def obtener_letras_desde_bd() -> List[Dict[str, Any]]:
+    """
+    Consulta las letras (LECAP, LEDE, letras en USD) desde la base de datos.
+
+    Returns:
+        List[Dict[str, Any]]: Lista de letras.
+    """
+    with conectar_con_timeout(engine) as conn:
+        result = conn.execute(text("SELECT * FROM datos_financieros.letras"))
+        return [dict(row._mapping) for row in result]
+
+
+@coalescer("tipo_cambio", copiar=dict)
 def obtener_tipo_cambio() -> Dict[str, float]:
     """
     Devuelve un diccionario con los tipos de cambio actuales desde la tabla de dólares.
@@ -31,6 +48,12 @@ def obtener_tipo_cambio() -> Dict[str, float]:
     Returns:
         Dict[str, float]: {tipo: venta}.
     """
-    with engine.connect() as conn:
+    with conectar_con_timeout(engine) as conn:
         result = conn.execute(text("SELECT * FROM datos_financieros.dolar"))
-        return {row._mapping["tipo"]: float(row._mapping["venta"]) for row in result}
\ No newline at end of file
+        return {row._mapping["tipo"]: float(row._mapping["venta"]) for row in result}
+
+
+# Últimos valores conocidos, para cuando la base no responde (utils/datos_mercado.py)
+fuente_bonos = FuenteMercado("bonos", obtener_bonos_desde_bd)
+fuente_letras = FuenteMercado("letras", obtener_letras_desde_bd)
+fuente_tipo_cambio = FuenteMercado("tipo_cambio", obtener_tipo_cambio)
@@ -1,10 +1,12 @@
 from sqlalchemy import text
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.scrap_runner import scrap
-from utils.conexion_db import engine
+from utils.conexion_db import engine, conectar_con_timeout
+from utils.coalescencia import coalescer
+from utils.datos_mercado import FuenteMercado
 
 
+@coalescer("ultimo_valor_dolar")
 def obtener_ultimo_valor_dolar(tipo: str = "DÓLAR BLUE") -> float:
     """
     Devuelve el último valor de venta del dólar según el tipo,
@@ -20,9 +22,10 @@ def obtener_ultimo_valor_dolar(tipo: str = "DÓLAR BLUE") -> float:
         ValueError: Si no se encuentra el tipo en la base de datos.
     """
     # Ejecutar scraping antes (actualiza la tabla si corresponde)
+    # from utils.scrap_runner import scrap
     # scrap(["dolar"])
 
-    with engine.connect() as conn:
+    with conectar_con_timeout(engine) as conn:
         result = conn.execute(
             text("""
                 SELECT venta
@@ -41,16 +44,22 @@ def obtener_ultimo_valor_dolar(tipo: str = "DÓLAR BLUE") -> float:
     raise ValueError(f"No se encontró el valor del dólar para el tipo '{tipo}'.")
 
 
+# Último valor conocido del dólar oficial, para cuando la base no responde
+fuente_dolar_oficial = FuenteMercado("dolar_oficial", obtener_ultimo_valor_dolar)
+
+
 def obtener_dolar_oficial() -> float | None:
     """
     Helper para obtener el último valor del dólar oficial desde la BD.
-    Maneja errores y devuelve None si falla.
+    Si la base falla o está marcada como caída (utils/datos_mercado.py)
+    devuelve el último valor leído; sin ninguno, informa el error y
+    devuelve None.
 
     Returns:
         float | None: Valor del dólar oficial o None si hay error.
     """
     try:
-        return obtener_ultimo_valor_dolar("DÓLAR OFICIAL")
+        return fuente_dolar_oficial.obtener("DÓLAR OFICIAL").valor
     except Exception as e:
         print(f"Error obteniendo dólar oficial: {e}")
         return None
@@ -0,0 +1,87 @@
+"""
+Paginación por cursor (keyset) y selección de columnas para los
+endpoints que devuelven listas.
+
+En lugar de OFFSET, cada página pide las filas con clave mayor a la
+última que recibió el cliente (`cursor`), así la base usa el índice
+de la clave y el costo de una página no crece con el número de página.
+Con `fields=` el cliente elige las columnas y solo esas se piden en
+el SELECT. Todos los endpoints paginados devuelven el cursor de la
+página siguiente en el cuerpo, como `siguiente_cursor` junto a la
+lista (None en la última página).
+
+Sin `limit` se devuelven todas las filas, como antes de paginar, para
+no cortar las respuestas de los clientes existentes.
+"""
+
+from fastapi import HTTPException
+
+# Sin límite por defecto: la paginación es opcional
+LIMITE_POR_DEFECTO = None
+LIMITE_MAXIMO = 1000
+
+
+def columnas_pedidas(fields: str | None, permitidas: tuple[str, ...],
+                     por_defecto: tuple[str, ...]) -> list[str]:
+    """
+    Valida la lista `fields` ('banco,tasa_pct') contra las columnas
+    permitidas. Sin `fields` devuelve `por_defecto`.
+
+    Raises:
+        HTTPException 400: si se pide una columna que no existe.
+    """
+    if not fields:
+        return list(por_defecto)
+    columnas = list(dict.fromkeys(c.strip() for c in fields.split(",") if c.strip()))
+    invalidas = [c for c in columnas if c not in permitidas]
+    if invalidas or not columnas:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos no válidos: {', '.join(invalidas) or fields}. "
+                   f"Opciones: {', '.join(permitidas)}"
+        )
+    return columnas
+
+
+def consulta_paginada(tabla: str, columnas: list[str], clave: str = "id",
+                      cursor=None, limite: int | None = LIMITE_POR_DEFECTO,
+                      where: str | None = None, parametros: dict | None = None
+                      ) -> tuple[str, dict]:
+    """
+    Arma 'SELECT <clave + columnas> FROM tabla WHERE clave > :cursor
+    ORDER BY clave LIMIT limite + 1'. La fila de más indica si hay una
+    página siguiente (ver pagina()). Con limite None no hay LIMIT.
+
+    Los nombres de tabla y columnas tienen que venir validados
+    (ej. con columnas_pedidas()), porque se insertan en el SQL.
+    """
+    seleccion = ", ".join(dict.fromkeys([clave, *columnas]))
+    condiciones = [where] if where else []
+    parametros = dict(parametros or {})
+    if cursor is not None:
+        condiciones.append(f"{clave} > :cursor")
+        parametros["cursor"] = cursor
+    consulta = f"SELECT {seleccion} FROM {tabla}"
+    if condiciones:
+        consulta += " WHERE " + " AND ".join(condiciones)
+    consulta += f" ORDER BY {clave}"
+    if limite is not None:
+        consulta += " LIMIT :limite"
+        parametros["limite"] = limite + 1
+    return consulta, parametros
+
+
+def pagina(filas: list[dict], columnas: list[str], limite: int | None,
+           clave: str = "id") -> tuple[list[dict], object | None]:
+    """
+    Recorta las filas de consulta_paginada() a `limite` y devuelve
+    (filas con solo las columnas pedidas, cursor de la página
+    siguiente o None si es la última o no hay límite).
+    """
+    siguiente = None
+    if limite is not None:
+        siguiente = filas[limite - 1][clave] if len(filas) > limite else None
+        filas = filas[:limite]
+    if clave not in columnas:
+        filas = [{c: fila[c] for c in columnas} for fila in filas]
+    return filas, siguiente
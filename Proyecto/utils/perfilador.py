@@ -0,0 +1,263 @@
+"""
+Perfilado opcional de requests individuales (solo administradores).
+
+Un request se perfila si trae el header `X-Perfilar` o el parámetro
+`?perfilar=` y un token de un usuario con tipo "admin" (el mismo
+chequeo que usa /auth/borrar_usuario). Valores posibles:
+- "muestreo" (o "1"): muestrea cada PERIODO_MUESTREO segundos las pilas
+  del request y guarda pilas colapsadas, compatibles con flamegraph.pl
+  y speedscope. Solo se cuentan las pilas del event loop mientras corre
+  la tarea del request y las de los threads del pool que corren código
+  con el contexto del request (endpoints sincrónicos, run_in_threadpool);
+  los demás requests concurrentes no aparecen.
+- "cprofile": perfilador determinístico sobre el thread del event loop.
+  Sirve para endpoints async que calculan en línea (ej. /bonos/calcular);
+  no ve el trabajo de los endpoints sincrónicos, que corren en otro
+  thread, y SÍ incluye las corrutinas de otros requests que el loop
+  ejecute mientras tanto (cProfile no distingue tareas). Para medir un
+  request con tráfico concurrente conviene "muestreo".
+
+El perfil se guarda en PERFILES_DIR y su nombre se devuelve en el header
+`X-Perfil`. Se descarga con GET /metrics/perfiles/{nombre}. Se conservan
+los últimos MAXIMO_PERFILES perfiles de menos de DIAS_PERFILES días; los
+demás se borran al guardar uno nuevo. Se permite un solo perfil
+"cprofile" a la vez (el segundo recibe 409): cProfile engancha el
+thread del event loop y dos a la vez se pisan.
+"""
+
+import cProfile
+import contextvars
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import parse_qs
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+PERFILES_DIR = os.getenv(
+    "PERFILES_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "perfiles")
+)
+PERIODO_MUESTREO = 0.002  # segundos
+MODOS = {"1": "muestreo", "muestreo": "muestreo", "cprofile": "cprofile"}
+EXTENSIONES_PERFIL = (".txt", ".prof")
+MAXIMO_PERFILES = int(os.getenv("MAXIMO_PERFILES", "50"))
+DIAS_PERFILES = float(os.getenv("DIAS_PERFILES", "7"))
+
+# Un solo cProfile a la vez en el event loop
+_lock_cprofile = threading.Lock()
+
+# Funciones en las que un thread está esperando (no trabajando)
+_FUNCIONES_OCIOSAS = {"select", "poll", "wait", "_wait_for_tstate_lock", "sleep", "_worker"}
+
+# Perfilador del request en curso. Los threads del pool copian el
+# contexto, así que el muestreo reconoce el trabajo del request por él.
+perfil_en_curso: contextvars.ContextVar["PerfiladorMuestreo | None"] = contextvars.ContextVar(
+    "perfil_en_curso", default=None
+)
+
+
+class PerfiladorMuestreo:
+    """
+    Perfilador por muestreo: un thread aparte toma las pilas de los
+    demás threads y cuenta cuántas veces aparece cada una.
+
+    Con `raiz` (el frame de la corrutina que atiende el request) solo
+    cuenta las pilas que pasan por ese frame o que corren dentro de un
+    contexto con perfil_en_curso en este perfilador.
+    """
+
+    def __init__(self, periodo: float = PERIODO_MUESTREO, raiz=None):
+        self.periodo = periodo
+        self.raiz = raiz
+        self.pilas: Counter[str] = Counter()
+        self.muestras = 0
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join()
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        while not self._detener.wait(self.periodo):
+            self.muestras += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == propio or frame.f_code.co_name in _FUNCIONES_OCIOSAS:
+                    continue
+                if self.raiz is not None and not self._es_del_request(frame):
+                    continue
+                pila = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    pila.append(
+                        f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{frame.f_lineno})"
+                    )
+                    frame = frame.f_back
+                self.pilas[";".join(reversed(pila))] += 1
+
+    def _es_del_request(self, frame) -> bool:
+        """
+        True si la pila pasa por la corrutina del request (event loop)
+        o por un contextvars.Context marcado con este perfilador (el que
+        usa el pool de threads para correr el endpoint).
+        """
+        while frame is not None:
+            if frame is self.raiz:
+                return True
+            for valor in frame.f_locals.values():
+                if isinstance(valor, contextvars.Context) and valor.get(perfil_en_curso) is self:
+                    return True
+            frame = frame.f_back
+        return False
+
+    def pilas_colapsadas(self) -> str:
+        """Una línea por pila: 'f1;f2;f3 cantidad'."""
+        return "\n".join(f"{pila} {n}" for pila, n in self.pilas.most_common()) + "\n"
+
+
+def modo_perfilado(scope) -> str | None:
+    """Devuelve el modo pedido por header o query string, o None."""
+    for nombre, valor in scope.get("headers", []):
+        if nombre == b"x-perfilar":
+            return MODOS.get(valor.decode().strip().lower())
+    consulta = parse_qs(scope.get("query_string", b"").decode())
+    if "perfilar" in consulta:
+        return MODOS.get(consulta["perfilar"][0].strip().lower())
+    return None
+
+
+def es_admin(scope) -> bool:
+    """Valida el token Bearer del request y verifica que sea de un admin."""
+    from auth.auth_service import usuario_desde_token
+    for nombre, valor in scope.get("headers", []):
+        if nombre == b"authorization":
+            esquema, _, token = valor.decode().partition(" ")
+            if esquema.lower() != "bearer" or not token:
+                return False
+            try:
+                return usuario_desde_token(token).tipo == "admin"
+            except Exception:
+                return False
+    return False
+
+
+def rotar_perfiles(maximo: int | None = None, dias: float | None = None) -> int:
+    """
+    Borra los perfiles de más de `dias` días y, de los que quedan, los
+    más viejos hasta dejar `maximo`. Devuelve cuántos borró.
+    """
+    maximo = MAXIMO_PERFILES if maximo is None else maximo
+    dias = DIAS_PERFILES if dias is None else dias
+    try:
+        with os.scandir(PERFILES_DIR) as entradas:
+            perfiles = sorted(
+                (e for e in entradas if e.is_file() and e.name.endswith(EXTENSIONES_PERFIL)),
+                key=lambda e: e.stat().st_mtime, reverse=True
+            )
+    except FileNotFoundError:
+        return 0
+
+    limite = time.time() - dias * 86400
+    borrados = 0
+    for i, entrada in enumerate(perfiles):
+        if i >= maximo or entrada.stat().st_mtime < limite:
+            try:
+                os.remove(entrada.path)
+                borrados += 1
+            except OSError as e:
+                print(f"[ERROR perfilador] No se pudo borrar {entrada.name}: {e}")
+    return borrados
+
+
+def _guardar_muestreo(perfilador: PerfiladorMuestreo, ruta: str):
+    perfilador.detener()
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(perfilador.pilas_colapsadas())
+    rotar_perfiles()
+
+
+def _guardar_cprofile(perfil: cProfile.Profile, ruta: str):
+    perfil.dump_stats(ruta)
+    rotar_perfiles()
+
+
+def ruta_perfil(nombre: str) -> str | None:
+    """Ruta del archivo de un perfil guardado (None si el nombre no es válido)."""
+    if os.path.basename(nombre) != nombre:
+        return None
+    ruta = os.path.join(PERFILES_DIR, nombre)
+    return ruta if os.path.isfile(ruta) else None
+
+
+class MiddlewarePerfilador:
+    """Middleware ASGI que perfila los requests que lo piden."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        modo = modo_perfilado(scope) if scope["type"] == "http" else None
+        if modo is None:
+            await self.app(scope, receive, send)
+            return
+
+        # usuario_desde_token consulta la base: no bloquear el event loop
+        if not await run_in_threadpool(es_admin, scope):
+            respuesta = JSONResponse(
+                {"detail": "Solo los administradores pueden perfilar requests."},
+                status_code=403,
+            )
+            await respuesta(scope, receive, send)
+            return
+
+        if modo == "cprofile" and not _lock_cprofile.acquire(blocking=False):
+            respuesta = JSONResponse(
+                {"detail": "Ya hay un perfil cprofile en curso; reintentar al terminar."},
+                status_code=409,
+            )
+            await respuesta(scope, receive, send)
+            return
+
+        extension = "txt" if modo == "muestreo" else "prof"
+        nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-{modo}-{uuid.uuid4().hex[:8]}.{extension}"
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                mensaje.setdefault("headers", [])
+                mensaje["headers"] = list(mensaje["headers"]) + [(b"x-perfil", nombre.encode())]
+            await send(mensaje)
+
+        ruta = os.path.join(PERFILES_DIR, nombre)
+
+        # El disco (crear el directorio, escribir y rotar) va al pool de
+        # threads para no frenar el event loop
+        if modo == "muestreo":
+            await run_in_threadpool(os.makedirs, PERFILES_DIR, exist_ok=True)
+            perfilador = PerfiladorMuestreo(raiz=sys._getframe())
+            token = perfil_en_curso.set(perfilador)
+            perfilador.iniciar()
+            try:
+                await self.app(scope, receive, enviar)
+            finally:
+                perfil_en_curso.reset(token)
+                await run_in_threadpool(_guardar_muestreo, perfilador, ruta)
+        else:
+            try:
+                await run_in_threadpool(os.makedirs, PERFILES_DIR, exist_ok=True)
+                perfil = cProfile.Profile()
+                perfil.enable()
+                try:
+                    await self.app(scope, receive, enviar)
+                finally:
+                    perfil.disable()
+                await run_in_threadpool(_guardar_cprofile, perfil, ruta)
+            finally:
+                _lock_cprofile.release()
@@ -0,0 +1,33 @@
+"""
+Pool de procesos compartido de /simulaciones/escenarios.
+
+Se crea una sola vez al arrancar la API (iniciar_pool_escenarios, en el
+ciclo de vida de main.py) y lo usa utils/escenarios_dolar.py. Está
+aparte de ese módulo para que el arranque no cargue numpy: los
+cálculos se importan recién en el primer request que los usa.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Procesos para simulaciones grandes (0 = en el proceso del request)
+PROCESOS_ESCENARIOS = int(os.getenv("PROCESOS_ESCENARIOS", "0"))
+
+# Pool compartido; None hasta iniciar_pool_escenarios()
+pool_escenarios: ProcessPoolExecutor | None = None
+
+
+def iniciar_pool_escenarios(procesos: int = PROCESOS_ESCENARIOS) -> ProcessPoolExecutor | None:
+    """Crea el pool compartido si se configuraron procesos (> 1)."""
+    global pool_escenarios
+    if procesos > 1 and pool_escenarios is None:
+        pool_escenarios = ProcessPoolExecutor(max_workers=procesos)
+    return pool_escenarios
+
+
+def cerrar_pool_escenarios():
+    """Cierra el pool compartido (al apagar la API)."""
+    global pool_escenarios
+    if pool_escenarios is not None:
+        pool_escenarios.shutdown(cancel_futures=True)
+        pool_escenarios = None
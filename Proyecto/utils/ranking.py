@@ -0,0 +1,89 @@
+"""
+Selección de los K mejores plazos fijos y bonos para un plazo dado.
+
+Por rendimiento, el orden de bancos y bonos no depende del monto ni
+del plazo, así que la foto de mercado ya trae los índices ordenados
+(SnapshotMercado.orden_bancos / orden_bonos) y el top K sale de
+intercalar ambas listas con heapq.merge: se calculan solo K elementos.
+
+Por dólar de equilibrio, el de los bonos depende del techo de la banda
+del mes de salida, que cambia con el plazo; ahí se calcula para todos
+los bonos y se eligen los K mayores con heapq.nlargest.
+"""
+
+import heapq
+from datetime import date
+from itertools import islice
+from typing import Iterator, NamedTuple
+from models.instruments import _mes_banda_de_salida
+from utils.snapshot_mercado import SnapshotMercado
+
+CRITERIOS = ("rendimiento", "dolar_equilibrio")
+TIPOS = ("plazos_fijos", "bonos")
+
+
+class Candidato(NamedTuple):
+    clave: float
+    tipo: str             # "plazo_fijo" o "bono"
+    indice: int           # posición en la foto de mercado
+    factor: float         # monto final / monto inicial, en pesos
+    dolar_equilibrio: float | None
+    mes_banda_usado: str | None = None
+
+
+def factor_plazo_fijo(tna, dias: int):
+    """Mismo cálculo que PlazoFijo.calcular_rendimiento, sin el monto."""
+    n = 365 / dias
+    tasa_efectiva_anual = (1 + tna / (100 * n)) ** n - 1
+    return (1 + tasa_efectiva_anual) ** (dias / 365)
+
+
+def _plazos_fijos(snapshot: SnapshotMercado, dias: int, criterio: str) -> Iterator[Candidato]:
+    """Bancos de mayor a menor según el criterio, calculados a demanda."""
+    dolar = snapshot.dolar_oficial
+    if criterio == "dolar_equilibrio" and not dolar:
+        return
+    for i in snapshot.orden_bancos.tolist():
+        factor = float(factor_plazo_fijo(snapshot.tasas_tna[i], dias))
+        equilibrio = factor * dolar if dolar else None
+        yield Candidato(factor if criterio == "rendimiento" else equilibrio,
+                        "plazo_fijo", i, factor, equilibrio)
+
+
+def _bonos(snapshot: SnapshotMercado, dias: int, criterio: str, k: int) -> Iterator[Candidato]:
+    """Bonos de mayor a menor según el criterio."""
+    hoy = date.today()
+
+    def candidato(i, factor):
+        mes = _mes_banda_de_salida(None, snapshot.vencimientos_bonos[i] or hoy, dias)
+        techo = snapshot.techo(mes)
+        equilibrio = factor * techo if techo else None
+        return Candidato(factor if criterio == "rendimiento" else equilibrio,
+                         "bono", i, factor, equilibrio, mes)
+
+    factores = (1.0 + snapshot.r_anual_bonos) ** (dias / 365.0)
+    if criterio == "rendimiento":
+        for i in snapshot.orden_bonos.tolist():
+            yield candidato(i, float(factores[i]))
+        return
+
+    todos = (candidato(i, float(f)) for i, f in enumerate(factores.tolist()))
+    yield from heapq.nlargest(
+        k, (c for c in todos if c.dolar_equilibrio is not None), key=lambda c: c.clave
+    )
+
+
+def top_k(snapshot: SnapshotMercado, dias: int, k: int,
+          criterio: str = "rendimiento", tipos: tuple = TIPOS) -> list[Candidato]:
+    """
+    Devuelve los K mejores instrumentos (mayor rendimiento o mayor
+    dólar de equilibrio) a `dias` días, de mayor a menor.
+    """
+    if criterio not in CRITERIOS:
+        raise ValueError(f"Criterio no válido: {criterio}")
+    fuentes = []
+    if "plazos_fijos" in tipos:
+        fuentes.append(_plazos_fijos(snapshot, dias, criterio))
+    if "bonos" in tipos:
+        fuentes.append(_bonos(snapshot, dias, criterio, k))
+    return list(islice(heapq.merge(*fuentes, key=lambda c: c.clave, reverse=True), k))
@@ -10,6 +10,7 @@ import time
 from typing import List
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import subprocess
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Carpeta donde están los scrapers
 SCRAPERS_DIR = os.path.join(os.path.dirname(__file__), "..", "source")
@@ -86,6 +87,16 @@ def scrap(nombres: List[str]):
         for _ in as_completed(futures):
             pass
 
+    # Con los datos nuevos cargados, se publica la foto de mercado
+    # compartida por los workers de la API (si está configurada)
+    try:
+        from utils.snapshot_compartido import publicar_snapshot_desde_bd
+        ruta = publicar_snapshot_desde_bd()
+        if ruta:
+            print(f"✅ Foto de mercado publicada en {ruta}")
+    except Exception as e:
+        print(f"❌ Error publicando la foto de mercado: {e}")
+
 
 # Este bloque asegura que el código solo se ejecutará si el script se ejecuta directamente
 if __name__ == "__main__":
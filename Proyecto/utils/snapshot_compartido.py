@@ -0,0 +1,214 @@
+"""
+Foto de mercado compartida entre procesos (workers de uvicorn) en un
+archivo mapeado en memoria.
+
+Después de cada corrida de scrapers (utils/scrap_runner.py) se publica
+la foto de mercado (utils/snapshot_mercado.py) en un archivo binario
+inmutable: un encabezado JSON con los nombres, fechas y versiones, y
+los arrays numéricos (tasas, rendimientos, órdenes, curva de bandas)
+con tamaño fijo y alineados a 8 bytes. Se escribe en un archivo
+temporal y se reemplaza con os.replace, así que los lectores ven la
+versión anterior completa o la nueva completa.
+
+Cada worker mapea el archivo con mmap y arma la foto con arrays de
+numpy que apuntan directo al archivo (sin copiar): hay una sola copia
+de los datos por máquina, compartida por el cache de páginas del
+sistema. En cada lectura se hace un stat del archivo y, si cambió, se
+mapea la versión nueva; los requests que tenían la anterior la siguen
+usando hasta terminar.
+
+Se activa con la variable de entorno RUTA_SNAPSHOT_MERCADO. Si el
+archivo no existe, está dañado, tiene más de SEGUNDOS_VIGENCIA_SNAPSHOT
+segundos o no es de las versiones vigentes de la base (un scraper
+corrido por su cuenta no lo publica), obtener_snapshot lee la base
+como siempre.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import date
+import numpy as np
+from utils.curva_bandas import CurvaBandas
+from utils.snapshot_mercado import FUENTES_SNAPSHOT, SnapshotMercado, _leer_snapshot
+from utils.version_mercado import limpiar_cache_versiones, obtener_versiones
+
+RUTA_SNAPSHOT_MERCADO = os.getenv("RUTA_SNAPSHOT_MERCADO")
+SEGUNDOS_VIGENCIA_SNAPSHOT = float(os.getenv("SEGUNDOS_VIGENCIA_SNAPSHOT", 60 * 60))
+
+MAGIA = b"SNAPMERC"
+FORMATO = 1
+# magia, formato, largo del encabezado JSON
+ESTRUCTURA_INICIO = struct.Struct("<8sIQ")
+ALINEACION = 8
+
+# Arrays de la foto: (nombre en el archivo, dtype)
+ARRAYS = (
+    ("tasas_tna", "<f8"),
+    ("r_anual_bonos", "<f8"),
+    ("orden_bancos", "<i8"),
+    ("orden_bonos", "<i8"),
+    ("curva_pisos", "<f8"),
+    ("curva_techos", "<f8"),
+)
+
+_lock = threading.Lock()
+_mapeado = {"identidad": None, "snapshot": None, "publicado": 0.0}
+
+
+def _alinear(n: int) -> int:
+    return (n + ALINEACION - 1) // ALINEACION * ALINEACION
+
+
+def serializar_snapshot(snapshot: SnapshotMercado, publicado: float | None = None) -> bytes:
+    """Arma el contenido binario del archivo para una foto de mercado."""
+    curva = snapshot.curva_bandas
+    arrays = {
+        "tasas_tna": snapshot.tasas_tna,
+        "r_anual_bonos": snapshot.r_anual_bonos,
+        "orden_bancos": snapshot.orden_bancos,
+        "orden_bonos": snapshot.orden_bonos,
+        "curva_pisos": curva.pisos if curva else np.array([]),
+        "curva_techos": curva.techos if curva else np.array([]),
+    }
+    datos = [np.ascontiguousarray(arrays[nombre], dtype=dtype) for nombre, dtype in ARRAYS]
+
+    encabezado = {
+        "publicado": publicado if publicado is not None else time.time(),
+        "versiones": list(snapshot.versiones),
+        "dolar_oficial": snapshot.dolar_oficial,
+        "bancos": snapshot.bancos,
+        "bonos": snapshot.bonos,
+        "monedas_bonos": snapshot.monedas_bonos,
+        "vencimientos_bonos": [v.isoformat() if v else None for v in snapshot.vencimientos_bonos],
+        "bandas": snapshot.bandas,
+        "banda_ultima": list(snapshot.banda_ultima),
+        "curva_inicio": curva.inicio.isoformat() if curva else None,
+        "arrays": {},
+    }
+    # Los offsets son relativos al comienzo de los datos, que empiezan
+    # alineados después del encabezado
+    offset = 0
+    for (nombre, dtype), array in zip(ARRAYS, datos):
+        encabezado["arrays"][nombre] = [offset, dtype, len(array)]
+        offset = _alinear(offset + array.nbytes)
+    texto = json.dumps(encabezado, ensure_ascii=False).encode("utf-8")
+
+    contenido = bytearray(ESTRUCTURA_INICIO.pack(MAGIA, FORMATO, len(texto)) + texto)
+    inicio_datos = _alinear(len(contenido))
+    for (nombre, _), array in zip(ARRAYS, datos):
+        posicion = inicio_datos + encabezado["arrays"][nombre][0]
+        contenido.extend(b"\0" * (posicion - len(contenido)))
+        contenido.extend(array.tobytes())
+    return bytes(contenido)
+
+
+def publicar_snapshot(snapshot: SnapshotMercado, ruta: str | None = None) -> str:
+    """
+    Escribe la foto en `ruta` (o RUTA_SNAPSHOT_MERCADO) de forma
+    atómica: archivo temporal en la misma carpeta + os.replace.
+    """
+    ruta = ruta or RUTA_SNAPSHOT_MERCADO
+    if not ruta:
+        raise ValueError("No hay ruta para publicar la foto de mercado (RUTA_SNAPSHOT_MERCADO).")
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(carpeta, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, prefix=".snapshot-", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            archivo.write(serializar_snapshot(snapshot))
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return ruta
+
+
+def _mapear(ruta: str) -> tuple[SnapshotMercado, float]:
+    """Mapea el archivo y arma la foto con arrays que apuntan al mapeo."""
+    with open(ruta, "rb") as archivo:
+        memoria = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+    magia, formato, largo = ESTRUCTURA_INICIO.unpack_from(memoria, 0)
+    if magia != MAGIA or formato != FORMATO:
+        raise ValueError(f"Formato de foto de mercado desconocido: {magia!r} v{formato}")
+    fin_encabezado = ESTRUCTURA_INICIO.size + largo
+    encabezado = json.loads(bytes(memoria[ESTRUCTURA_INICIO.size:fin_encabezado]))
+
+    inicio_datos = _alinear(fin_encabezado)
+    arrays = {
+        nombre: np.frombuffer(memoria, dtype=dtype, count=cantidad, offset=inicio_datos + offset)
+        for nombre, (offset, dtype, cantidad) in encabezado["arrays"].items()
+    }
+    ultima = tuple(encabezado["banda_ultima"])
+    curva = None
+    if encabezado["curva_inicio"]:
+        curva = CurvaBandas(date.fromisoformat(encabezado["curva_inicio"]),
+                            arrays["curva_pisos"], arrays["curva_techos"], ultima)
+    snapshot = SnapshotMercado(
+        versiones=tuple(encabezado["versiones"]),
+        dolar_oficial=encabezado["dolar_oficial"],
+        bancos=encabezado["bancos"],
+        tasas_tna=arrays["tasas_tna"],
+        bonos=encabezado["bonos"],
+        monedas_bonos=encabezado["monedas_bonos"],
+        r_anual_bonos=arrays["r_anual_bonos"],
+        vencimientos_bonos=[date.fromisoformat(v) if v else None
+                            for v in encabezado["vencimientos_bonos"]],
+        orden_bancos=arrays["orden_bancos"],
+        orden_bonos=arrays["orden_bonos"],
+        bandas={mes: tuple(banda) for mes, banda in encabezado["bandas"].items()},
+        banda_ultima=ultima,
+        curva_bandas=curva,
+    )
+    return snapshot, encabezado["publicado"]
+
+
+def leer_snapshot_compartido(ruta: str | None = None) -> SnapshotMercado | None:
+    """
+    Foto publicada en el archivo compartido, o None si no hay archivo,
+    no se puede leer o está vencida. Solo vuelve a mapear el archivo
+    si cambió (otro inodo, tamaño o fecha de modificación).
+    """
+    ruta = ruta or RUTA_SNAPSHOT_MERCADO
+    if not ruta:
+        return None
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    identidad = (ruta, estado.st_ino, estado.st_size, estado.st_mtime_ns)
+
+    with _lock:
+        if _mapeado["identidad"] != identidad:
+            try:
+                snapshot, publicado = _mapear(ruta)
+            except (OSError, ValueError, KeyError, struct.error) as e:
+                print(f"[ERROR snapshot_compartido] No se pudo leer {ruta}: {e}")
+                return None
+            _mapeado.update(identidad=identidad, snapshot=snapshot, publicado=publicado)
+        snapshot, publicado = _mapeado["snapshot"], _mapeado["publicado"]
+
+    if time.time() - publicado > SEGUNDOS_VIGENCIA_SNAPSHOT:
+        return None
+    return snapshot
+
+
+def publicar_snapshot_desde_bd(ruta: str | None = None) -> str | None:
+    """
+    Lee la foto vigente de la base (sin caches) y la publica. Se llama
+    al terminar los scrapers. Si no hay ruta configurada no hace nada.
+    """
+    ruta = ruta or RUTA_SNAPSHOT_MERCADO
+    if not ruta:
+        return None
+    limpiar_cache_versiones()
+    versiones = obtener_versiones()
+    clave = tuple(versiones.get(fuente, (0, None))[0] for fuente in FUENTES_SNAPSHOT)
+    return publicar_snapshot(_leer_snapshot(clave), ruta)
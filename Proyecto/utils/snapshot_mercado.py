@@ -0,0 +1,189 @@
+"""
+Foto (snapshot) de los datos de mercado que usan los cálculos:
+dólar oficial, tasas de plazos fijos, bonos y bandas cambiarias.
+
+Se arma con una consulta por tabla y se reutiliza mientras no cambie
+la versión de ninguna fuente (ver utils/version_mercado.py), así un
+request que simula muchos escenarios no vuelve a leer la base por
+cada monto o plazo. Los datos numéricos quedan en arrays de numpy
+para poder calcular todos los instrumentos de una vez.
+
+Al armar la foto también se guardan los índices de bancos y bonos
+ordenados por rendimiento (ver utils/ranking.py).
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+import numpy as np
+from sqlalchemy import text
+from utils.conexion_db import engine
+from utils.cache_lru import CacheLRU
+from utils.curva_bandas import CurvaBandas, armar_curva_bandas
+from utils.version_mercado import obtener_versiones
+
+FUENTES_SNAPSHOT = ("dolar", "plazos_fijos", "bonos", "bandas_cambiarias")
+
+# El TTL cubre el caso de que la tabla de versiones no exista
+# (todas las versiones en 0)
+SEGUNDOS_CACHE_SNAPSHOT = 5 * 60
+_cache_snapshots = CacheLRU(4, ttl=SEGUNDOS_CACHE_SNAPSHOT, nombre="snapshot_mercado")
+
+
+@dataclass(frozen=True)
+class SnapshotMercado:
+    """Datos de mercado de un momento dado, en arrays por instrumento."""
+    versiones: tuple
+    dolar_oficial: float | None
+    bancos: list[str]
+    tasas_tna: np.ndarray
+    bonos: list[str]
+    monedas_bonos: list[str]
+    r_anual_bonos: np.ndarray
+    vencimientos_bonos: list[date | None]
+    # Índices de mayor a menor tasa. El orden por rendimiento no depende
+    # del monto ni del plazo: el factor de un PF a d días es
+    # 1 + tna·d/36500 y el de un bono (1 + r_anual)^(d/365)
+    orden_bancos: np.ndarray
+    orden_bonos: np.ndarray
+    bandas: dict[str, tuple[float, float]] = field(default_factory=dict)
+    banda_ultima: tuple[float | None, float | None] = (None, None)
+    # Piso y techo día por día (ver utils/curva_bandas.py)
+    curva_bandas: CurvaBandas | None = None
+
+    def techo(self, mes: str) -> float | None:
+        """
+        Techo de la banda de un mes ('YYYY-MM'). Si el mes no está
+        usa la última banda, igual que Bono.rendimiento_vs_banda.
+        """
+        _, techo = self.bandas.get(mes, (None, None))
+        if not techo or techo <= 0:
+            techo = self.banda_ultima[1]
+        return techo if techo and techo > 0 else None
+
+
+def _r_anual_estimado(dia_pct: np.ndarray, mes_pct: np.ndarray,
+                      anio_pct: np.ndarray) -> np.ndarray:
+    """
+    Versión vectorizada de Bono._estimacion_rend_anual: promedio de
+    las tasas anuales que se pueden estimar con los datos (NaN = falta).
+    """
+    estimaciones = np.stack([
+        anio_pct / 100.0,
+        (1.0 + mes_pct / 100.0) ** 12 - 1.0,
+        (1.0 + dia_pct / 100.0) ** 365 - 1.0,
+    ])
+    disponibles = ~np.isnan(estimaciones)
+    cantidad = disponibles.sum(axis=0)
+    suma = np.where(disponibles, estimaciones, 0.0).sum(axis=0)
+    return np.divide(suma, cantidad, out=np.zeros_like(suma), where=cantidad > 0)
+
+
+def _a_float(valor) -> float:
+    """Convierte un valor de la base a float; NaN si falta o no es numérico."""
+    if valor is None:
+        return np.nan
+    if isinstance(valor, str):
+        valor = valor.replace("%", "").replace(",", ".").strip()
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _a_fecha(valor) -> date | None:
+    if isinstance(valor, date):
+        return valor
+    try:
+        return date.fromisoformat(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def _lista(valores: np.ndarray, decimales: int) -> list:
+    """Redondea y pasa a lista; los NaN (dato faltante) quedan en None."""
+    return [None if v != v else v for v in np.round(valores, decimales).tolist()]
+
+
+def _leer_snapshot(versiones: tuple) -> SnapshotMercado:
+    """Lee todas las tablas que usa la foto en una sola conexión."""
+    with engine.connect() as conn:
+        fila_dolar = conn.execute(text("""
+            SELECT venta FROM datos_financieros.dolar
+            WHERE tipo = 'DÓLAR OFICIAL'
+            ORDER BY id DESC
+            LIMIT 1
+        """)).fetchone()
+        bancos = conn.execute(text(
+            "SELECT banco, tasa_pct FROM datos_financieros.plazos_fijos ORDER BY id"
+        )).all()
+        bonos = conn.execute(text("""
+            SELECT nombre, moneda, dia_pct, mes_pct, anio_pct, fecha_vencimiento
+            FROM datos_financieros.bonos
+        """)).all()
+        bandas = conn.execute(text("""
+            SELECT fecha, banda_inferior, banda_superior
+            FROM datos_financieros.bandas_cambiarias
+            ORDER BY id
+        """)).all()
+
+    # Con meses repetidos gana la última fila, como en obtener_banda_cambiaria
+    por_mes = {fecha: (float(inf), float(sup)) for fecha, inf, sup in bandas}
+    ultima = (float(bandas[-1][1]), float(bandas[-1][2])) if bandas else (None, None)
+
+    # Los bancos sin tasa quedan afuera, como en la analítica guardada
+    tasas = [_a_float(tasa) for _, tasa in bancos]
+    bancos = [(banco, tasa) for (banco, _), tasa in zip(bancos, tasas) if not np.isnan(tasa)]
+    tasas_tna = np.array([tasa for _, tasa in bancos], dtype=float)
+    # Rendimientos faltantes en 0, como en /bonos/calcular y la analítica
+    # guardada, para que cada bono tenga el mismo r_anual en todos lados
+    columnas_pct = np.array([[_a_float(b[c]) for c in (2, 3, 4)] for b in bonos],
+                            dtype=float).reshape(-1, 3)
+    r_anual = _r_anual_estimado(*np.nan_to_num(columnas_pct, nan=0.0).T)
+    return SnapshotMercado(
+        versiones=versiones,
+        dolar_oficial=float(fila_dolar[0]) if fila_dolar else None,
+        bancos=[b[0] for b in bancos],
+        tasas_tna=tasas_tna,
+        bonos=[b[0] for b in bonos],
+        monedas_bonos=[b[1] for b in bonos],
+        r_anual_bonos=r_anual,
+        vencimientos_bonos=[_a_fecha(b[5]) for b in bonos],
+        orden_bancos=np.argsort(-tasas_tna, kind="stable"),
+        orden_bonos=np.argsort(-r_anual, kind="stable"),
+        bandas=por_mes,
+        banda_ultima=ultima,
+        curva_bandas=armar_curva_bandas(por_mes, ultima),
+    )
+
+
+def obtener_snapshot() -> SnapshotMercado:
+    """
+    Devuelve la foto de mercado vigente, leyéndola de la base solo si
+    cambió la versión de alguna de las fuentes.
+
+    Si hay una foto publicada en el archivo compartido entre workers
+    (RUTA_SNAPSHOT_MERCADO, ver utils/snapshot_compartido.py) y es de
+    las versiones vigentes, se usa esa sin leer las tablas. Un scraper
+    corrido por su cuenta sube la versión sin publicar el archivo: en
+    ese caso se lee la base, para no responder datos viejos con los
+    ETags de la versión nueva.
+    """
+    versiones = obtener_versiones()
+    clave = tuple(versiones.get(fuente, (0, None))[0] for fuente in FUENTES_SNAPSHOT)
+
+    # Import local: snapshot_compartido importa este módulo
+    from utils.snapshot_compartido import leer_snapshot_compartido
+    compartido = leer_snapshot_compartido()
+    if compartido is not None and tuple(compartido.versiones) == clave:
+        return compartido
+
+    snapshot = _cache_snapshots.obtener(clave)
+    if snapshot is None:
+        snapshot = _leer_snapshot(clave)
+        _cache_snapshots.guardar(clave, snapshot)
+    return snapshot
+
+
+def limpiar_cache_snapshot():
+    """Descarta las fotos guardadas (para pruebas)."""
+    _cache_snapshots.limpiar()
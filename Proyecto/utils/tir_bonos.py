@@ -0,0 +1,201 @@
+"""
+TIR (rendimiento al vencimiento) y duration de todos los bonos a la vez.
+
+Bono._estimacion_rend_anual anualiza las variaciones de precio del día,
+el mes y el año, así que mide el impulso del precio y no el rendimiento.
+Esta TIR sale de los flujos de fondos de cada bono (models/flujos.py) y
+de su último precio: es la tasa efectiva anual y que cumple
+
+    precio = sum(flujo_i / (1 + y) ** t_i)    con t_i en años (ACT/365)
+
+Los flujos de todos los bonos se apilan en una matriz (bono x pago,
+rellenada con ceros) y se resuelve con Newton para todos los bonos en
+cada iteración. Si algún bono no converge (precios raros, flujos muy
+concentrados), se termina con bisección, también vectorizada.
+
+El precio se toma como precio sucio (sin separar interés corrido).
+Los resultados se cachean por versión de los bonos y día: se recalculan
+una vez por cada actualización de precios.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+import numpy as np
+from sqlalchemy import text
+from models.flujos import flujos_de_fondos
+from utils.cache_lru import CacheLRU
+from utils.conexion_db import engine
+from utils.snapshot_mercado import _a_fecha, _a_float, _lista
+from utils.version_mercado import obtener_versiones
+
+TIR_MINIMA = -0.99
+TIR_MAXIMA = 100.0
+TOLERANCIA = 1e-10
+TOLERANCIA_PRECIO = 1e-9  # relativa al precio
+ITERACIONES_NEWTON = 50
+ITERACIONES_BISECCION = 200
+
+cache_tir_bonos = CacheLRU(8, ttl=10 * 60, nombre="tir_bonos")
+
+
+@dataclass(frozen=True)
+class CurvaTIR:
+    """TIR y duration por bono; NaN donde no hay flujos o no hay solución."""
+    nombres: list[str]
+    monedas: list[str]
+    precios: np.ndarray
+    vencimientos: list[str | None]
+    metodos: list[str]
+    flujos_restantes: np.ndarray
+    tir: np.ndarray                  # efectiva anual
+    duration: np.ndarray             # Macaulay, en años
+    duration_modificada: np.ndarray
+
+
+def matriz_flujos(flujos: list[list[tuple[date, float]]],
+                  hoy: date) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Apila los flujos de los bonos.
+
+    Returns:
+        (plazos, montos): matrices bono x pago con el plazo en años y el
+        monto de cada pago; los bonos con menos pagos se rellenan con 0.
+    """
+    columnas = max((len(f) for f in flujos), default=0)
+    plazos = np.zeros((len(flujos), columnas))
+    montos = np.zeros((len(flujos), columnas))
+    for i, pagos in enumerate(flujos):
+        for j, (fecha, monto) in enumerate(pagos):
+            plazos[i, j] = (fecha - hoy).days / 365.0
+            montos[i, j] = monto
+    return plazos, montos
+
+
+def _valor_presente(tir: np.ndarray, plazos: np.ndarray, montos: np.ndarray):
+    """Valor presente de cada bono y su derivada respecto de la TIR."""
+    descuento = (1.0 + tir[:, None]) ** -plazos
+    valor = (montos * descuento).sum(axis=1)
+    derivada = -(montos * plazos * descuento).sum(axis=1) / (1.0 + tir)
+    return valor, derivada
+
+
+def resolver_tir(precios: np.ndarray, plazos: np.ndarray,
+                 montos: np.ndarray) -> np.ndarray:
+    """
+    TIR efectiva anual de cada bono (NaN si no tiene flujos, el precio
+    no es positivo o no hay TIR entre TIR_MINIMA y TIR_MAXIMA).
+
+    Con flujos positivos el valor presente es decreciente en la TIR,
+    así que la solución, si existe, es única.
+    """
+    precios = np.asarray(precios, dtype=float)
+    tir = np.full(len(precios), np.nan)
+    validos = (precios > 0) & (montos.sum(axis=1) > 0)
+    if not validos.any():
+        return tir
+    p, t, c = precios[validos], plazos[validos], montos[validos]
+
+    # Punto de partida: rendimiento simple hasta el plazo promedio
+    plazo_medio = np.maximum((t * c).sum(axis=1) / c.sum(axis=1), 1 / 365)
+    y = np.clip((c.sum(axis=1) / p) ** (1 / plazo_medio) - 1, TIR_MINIMA + 0.01, TIR_MAXIMA)
+
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        for _ in range(ITERACIONES_NEWTON):
+            valor, derivada = _valor_presente(y, t, c)
+            paso = (valor - p) / derivada
+            y = np.clip(y - np.nan_to_num(paso), TIR_MINIMA, TIR_MAXIMA)
+            if np.all(np.abs(paso) < TOLERANCIA):
+                break
+        valor, _ = _valor_presente(y, t, c)
+        convergio = np.abs(valor - p) <= TOLERANCIA_PRECIO * np.maximum(p, 1.0)
+
+        # Bisección para los que no convergieron, si la TIR está en el rango
+        pendientes = ~convergio
+        if pendientes.any():
+            y[pendientes] = _biseccion(p[pendientes], t[pendientes], c[pendientes])
+
+    tir[validos] = y
+    return tir
+
+
+def _biseccion(precios: np.ndarray, plazos: np.ndarray, montos: np.ndarray) -> np.ndarray:
+    bajo = np.full(len(precios), TIR_MINIMA)
+    alto = np.full(len(precios), TIR_MAXIMA)
+    en_rango = (_valor_presente(bajo, plazos, montos)[0] >= precios) & \
+               (_valor_presente(alto, plazos, montos)[0] <= precios)
+    for _ in range(ITERACIONES_BISECCION):
+        medio = (bajo + alto) / 2
+        arriba = _valor_presente(medio, plazos, montos)[0] > precios
+        bajo = np.where(arriba, medio, bajo)
+        alto = np.where(arriba, alto, medio)
+        if np.all(alto - bajo < TOLERANCIA):
+            break
+    return np.where(en_rango, (bajo + alto) / 2, np.nan)
+
+
+def duration(tir: np.ndarray, plazos: np.ndarray,
+             montos: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Duration de Macaulay (años) y modificada de cada bono a su TIR."""
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        descuento = (1.0 + tir[:, None]) ** -plazos
+        valor = (montos * descuento).sum(axis=1)
+        macaulay = (montos * plazos * descuento).sum(axis=1) / valor
+    return macaulay, macaulay / (1.0 + tir)
+
+
+def armar_curva_tir(filas: list[dict], hoy: date | None = None) -> CurvaTIR:
+    """Calcula TIR y duration de los bonos a partir de sus filas de la base."""
+    hoy = hoy or date.today()
+    precios = np.array([_a_float(f.get("ultimo")) for f in filas], dtype=float)
+    vencimientos = [_a_fecha(f.get("fecha_vencimiento")) for f in filas]
+
+    flujos, metodos = [], []
+    for fila, precio, vencimiento in zip(filas, precios.tolist(), vencimientos):
+        pagos, metodo = flujos_de_fondos(fila["nombre"], vencimiento, precio, hoy)
+        flujos.append(pagos)
+        metodos.append(metodo)
+
+    plazos, montos = matriz_flujos(flujos, hoy)
+    tir = resolver_tir(precios, plazos, montos)
+    macaulay, modificada = duration(tir, plazos, montos)
+    return CurvaTIR(
+        nombres=[f["nombre"] for f in filas],
+        monedas=[f["moneda"] for f in filas],
+        precios=precios,
+        vencimientos=[str(v) if v else None for v in vencimientos],
+        metodos=metodos,
+        flujos_restantes=np.array([len(f) for f in flujos]),
+        tir=tir,
+        duration=macaulay,
+        duration_modificada=modificada,
+    )
+
+
+def filas_curva_tir(curva: CurvaTIR) -> list[dict]:
+    """Una fila por bono para la respuesta de /bonos/tir (NaN -> None)."""
+    columnas = {
+        "bono": curva.nombres,
+        "moneda": curva.monedas,
+        "precio": _lista(curva.precios, 2),
+        "fecha_vencimiento": curva.vencimientos,
+        "flujos": curva.metodos,
+        "flujos_restantes": curva.flujos_restantes.tolist(),
+        "tir_pct": _lista(curva.tir * 100, 2),
+        "duration": _lista(curva.duration, 2),
+        "duration_modificada": _lista(curva.duration_modificada, 2),
+    }
+    return [dict(zip(columnas, fila)) for fila in zip(*columnas.values())]
+
+
+def obtener_curva_tir() -> CurvaTIR:
+    """Curva de TIR vigente: se recalcula cuando cambian los bonos o el día."""
+    clave = (date.today(), obtener_versiones().get("bonos", (0, None))[0])
+    curva = cache_tir_bonos.obtener(clave)
+    if curva is None:
+        with engine.connect() as conn:
+            filas = conn.execute(text(
+                "SELECT nombre, moneda, ultimo, fecha_vencimiento FROM datos_financieros.bonos"
+            )).mappings().all()
+        curva = armar_curva_tir([dict(f) for f in filas])
+        cache_tir_bonos.guardar(clave, curva)
+    return curva
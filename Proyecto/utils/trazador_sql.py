@@ -0,0 +1,208 @@
+"""
+Trazador de consultas SQL basado en eventos de SQLAlchemy.
+
+- Cuenta las consultas de cada request y agrupa las que tienen la
+  misma "forma" (el SQL con los valores reemplazados por '?').
+  Si una forma se repite más de UMBRAL_REPETICIONES veces en un mismo
+  request lo informa como posible N+1.
+- Guarda muestras de consultas lentas con los parámetros redactados
+  (solo se conserva el nombre y el tipo de cada parámetro).
+- limitar_consultas() sirve en los tests para fijar un máximo de
+  consultas por endpoint.
+"""
+
+import re
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from utils.metricas import al_terminar_consulta, resolver_ruta
+
+UMBRAL_REPETICIONES = 5
+UMBRAL_CONSULTA_LENTA = 0.2  # segundos
+MAX_MUESTRAS = 50
+
+_RE_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_PARAMETRO = re.compile(r"%\(\w+\)s|:\w+|%s|\?")
+_RE_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def forma_consulta(sql: str) -> str:
+    """
+    Normaliza una consulta para agrupar las que solo difieren en los
+    valores: colapsa espacios y reemplaza textos, números, parámetros
+    y listas de valores por '?'.
+    """
+    forma = _RE_TEXTO.sub("?", sql)
+    forma = _RE_PARAMETRO.sub("?", forma)
+    forma = _RE_NUMERO.sub("?", forma)
+    forma = _RE_LISTA.sub("(?)", forma)
+    return _RE_ESPACIOS.sub(" ", forma).strip()
+
+
+def redactar_parametros(parametros, executemany: bool = False):
+    """
+    Reemplaza los valores de los parámetros por el nombre de su tipo.
+    En un executemany devuelve la cantidad de filas y la primera redactada.
+    """
+    if executemany and isinstance(parametros, (list, tuple)):
+        primera = redactar_parametros(parametros[0]) if parametros else None
+        return {"filas": len(parametros), "ejemplo": primera}
+    if isinstance(parametros, dict):
+        return {clave: type(valor).__name__ for clave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [type(valor).__name__ for valor in parametros]
+    return None
+
+
+class TrazaConsultas:
+    """Consultas registradas durante un request (o un bloque de test)."""
+
+    def __init__(self):
+        self.total = 0
+        self.tiempo = 0.0
+        self.formas: Counter[str] = Counter()
+
+    def registrar(self, forma: str, duracion: float):
+        self.total += 1
+        self.tiempo += duracion
+        self.formas[forma] += 1
+
+    def repetidas(self, umbral: int = UMBRAL_REPETICIONES) -> list[tuple[str, int]]:
+        """Formas que se ejecutaron más de `umbral` veces."""
+        return [(f, n) for f, n in self.formas.most_common() if n > umbral]
+
+    def resumen(self) -> str:
+        return "\n".join(f"  {n} x {f}" for f, n in self.formas.most_common())
+
+
+class TrazadorSQL:
+    """
+    Registro global del trazador: muestras de consultas lentas y
+    detecciones de N+1 recientes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.consultas_lentas = deque(maxlen=MAX_MUESTRAS)
+        self.repeticiones = deque(maxlen=MAX_MUESTRAS)
+        # Contadores activos de limitar_consultas()
+        self._contadores: list[TrazaConsultas] = []
+
+    def registrar_lenta(self, forma, duracion, parametros, ruta):
+        with self._lock:
+            self.consultas_lentas.append({
+                "forma": forma,
+                "duracion_ms": round(duracion * 1000, 2),
+                "parametros": parametros,
+                "ruta": ruta,
+                "fecha": datetime.now(timezone.utc).isoformat(),
+            })
+
+    def registrar_repeticiones(self, ruta: str, traza: TrazaConsultas):
+        repetidas = traza.repetidas()
+        if not repetidas:
+            return
+        with self._lock:
+            for forma, cantidad in repetidas:
+                print(f"[N+1] {ruta}: {cantidad} consultas iguales en un request: {forma}")
+                self.repeticiones.append({
+                    "ruta": ruta,
+                    "forma": forma,
+                    "cantidad": cantidad,
+                    "fecha": datetime.now(timezone.utc).isoformat(),
+                })
+
+    def muestras(self) -> dict:
+        """Copia de las muestras para exponer por la API."""
+        with self._lock:
+            return {
+                "umbral_lenta_ms": UMBRAL_CONSULTA_LENTA * 1000,
+                "umbral_repeticiones": UMBRAL_REPETICIONES,
+                "consultas_lentas": list(self.consultas_lentas),
+                "repeticiones": list(self.repeticiones),
+            }
+
+
+trazador_sql = TrazadorSQL()
+
+# Traza del request en curso y ruta que lo atiende
+traza_actual: ContextVar[TrazaConsultas | None] = ContextVar("traza_actual", default=None)
+ruta_actual: ContextVar[str | None] = ContextVar("ruta_actual", default=None)
+
+
+def instrumentar_engine(engine, trazador: TrazadorSQL = trazador_sql):
+    """
+    Alimenta el trazador con las consultas del engine. Usa la medición
+    de utils/metricas.py (al_terminar_consulta): cada consulta se mide
+    una sola vez aunque el engine también tenga métricas.
+    """
+
+    def _registrar(statement, parameters, executemany, duracion):
+        forma = forma_consulta(statement)
+
+        traza = traza_actual.get()
+        if traza is not None:
+            traza.registrar(forma, duracion)
+        for contador in list(trazador._contadores):
+            contador.registrar(forma, duracion)
+
+        if duracion >= UMBRAL_CONSULTA_LENTA:
+            trazador.registrar_lenta(
+                forma, duracion,
+                redactar_parametros(parameters, executemany),
+                ruta_actual.get()
+            )
+
+    al_terminar_consulta(engine, _registrar)
+
+
+class MiddlewareTrazaSQL:
+    """
+    Middleware ASGI que abre una traza por request y, al terminar,
+    informa las consultas repetidas (posibles N+1).
+    """
+
+    def __init__(self, app, trazador: TrazadorSQL = trazador_sql):
+        self.app = app
+        self.trazador = trazador
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ruta = f"{scope['method']} {resolver_ruta(scope)}"
+        traza = TrazaConsultas()
+        token_traza = traza_actual.set(traza)
+        token_ruta = ruta_actual.set(ruta)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            traza_actual.reset(token_traza)
+            ruta_actual.reset(token_ruta)
+            self.trazador.registrar_repeticiones(ruta, traza)
+
+
+@contextmanager
+def limitar_consultas(maximo: int, trazador: TrazadorSQL = trazador_sql):
+    """
+    Helper para tests: cuenta todas las consultas ejecutadas dentro
+    del bloque (en cualquier thread) y falla si superan `maximo`.
+
+    Ejemplo:
+        with limitar_consultas(3):
+            client.get("/bonos/calcular", params={...})
+    """
+    traza = TrazaConsultas()
+    trazador._contadores.append(traza)
+    try:
+        yield traza
+    finally:
+        trazador._contadores.remove(traza)
+    assert traza.total <= maximo, (
+        f"Se ejecutaron {traza.total} consultas (máximo {maximo}):\n{traza.resumen()}"
+    )
@@ -0,0 +1,87 @@
+"""
+Versión de los datos de mercado.
+
+Cada scraper o carga de CSV incrementa, en la misma transacción en la
+que reemplaza su tabla, la versión de su fuente en
+datos_financieros.versiones_mercado. Los caches de resultados
+(ej. /bonos/calcular) incluyen estas versiones en su clave, así que
+una recarga de datos los invalida sin tener que avisarles.
+
+Las versiones se leen con una sola consulta y se cachean
+SEGUNDOS_CACHE_VERSIONES, que es lo máximo que un resultado viejo
+puede seguir sirviéndose después de una recarga.
+"""
+
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from utils.conexion_db import engine
+from utils.cache_lru import CacheLRU
+
+FUENTES = ("dolar", "plazos_fijos", "bonos", "letras", "bandas_cambiarias")
+SEGUNDOS_CACHE_VERSIONES = 5
+
+_cache_versiones = CacheLRU(1, ttl=SEGUNDOS_CACHE_VERSIONES, nombre="versiones_mercado")
+
+CREAR_TABLA_VERSIONES = text("""
+    CREATE TABLE IF NOT EXISTS datos_financieros.versiones_mercado (
+        fuente TEXT PRIMARY KEY,
+        version BIGINT NOT NULL,
+        actualizado TIMESTAMPTZ
+    )
+""")
+
+
+def incrementar_version(conn, fuente: str):
+    """
+    Incrementa la versión de una fuente. Se llama con la conexión de
+    la transacción que reemplaza los datos, así la versión nueva se
+    ve recién cuando los datos nuevos están confirmados.
+
+    :param conn: conexión abierta con engine.begin()
+    :param fuente: una de FUENTES
+    """
+    if fuente not in FUENTES:
+        raise ValueError(f"Fuente de mercado desconocida: {fuente}")
+    conn.execute(CREAR_TABLA_VERSIONES)
+    conn.execute(text("""
+        INSERT INTO datos_financieros.versiones_mercado (fuente, version, actualizado)
+        VALUES (:fuente, 1, NOW())
+        ON CONFLICT (fuente) DO UPDATE
+        SET version = versiones_mercado.version + 1, actualizado = NOW()
+    """), {"fuente": fuente})
+
+
+def obtener_versiones() -> dict[str, tuple[int, datetime | None]]:
+    """
+    Devuelve {fuente: (version, actualizado)} de todas las fuentes.
+    Las que nunca se cargaron no aparecen. Si la tabla todavía no
+    existe devuelve un dict vacío.
+    """
+    versiones = _cache_versiones.obtener("versiones")
+    if versiones is None:
+        versiones = _consultar_versiones()
+        _cache_versiones.guardar("versiones", versiones)
+    return versiones
+
+
+def obtener_version(fuente: str) -> tuple[int, datetime | None]:
+    """Versión y fecha de actualización de una fuente ((0, None) si no hay)."""
+    return obtener_versiones().get(fuente, (0, None))
+
+
+def limpiar_cache_versiones():
+    """Olvida las versiones cacheadas (las próximas lecturas van a la base)."""
+    _cache_versiones.limpiar()
+
+
+def _consultar_versiones() -> dict[str, tuple[int, datetime | None]]:
+    try:
+        with engine.connect() as conn:
+            filas = conn.execute(text(
+                "SELECT fuente, version, actualizado FROM datos_financieros.versiones_mercado"
+            )).fetchall()
+    except SQLAlchemyError as e:
+        print(f"[ERROR versiones_mercado] {e}")
+        return {}
+    return {fuente: (int(version), actualizado) for fuente, version, actualizado in filas}